@@ -0,0 +1,113 @@
+"""CI log scanning and percentile sketches
+
+Writes a synthetic timestamped Jenkins console log of about `mb`
+megabytes (seven stages, mostly build output) and times
+`cilogs.parse_jenkins_log` (mmap plus a marker search) against reading
+the log line by line, then a warm read through `ParseCache`. Then checks
+`QuantileSketch` percentiles of `values` log-normal durations against
+the exact ones.
+
+    python benchmarks/bench_cilogs.py [mb] [values]
+"""
+
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cicd_doc import cilogs  # noqa: E402
+from cicd_doc.filecache import ParseCache  # noqa: E402
+from cicd_doc.sketch import QuantileSketch  # noqa: E402
+
+STAGES = ['Checkout', 'Pre-flight Check', 'Setup Environment', 'Build Images', 'Start Services',
+          'Verify Services', 'Success']
+
+
+def write_log(path, mb):
+    lines_per_stage = mb * (1 << 20) // 90 // len(STAGES)
+    seconds = 36000.0
+    with open(path, 'w') as f:
+        def line(text):
+            h, rest = divmod(seconds, 3600)
+            f.write('[2026-01-05T%02d:%02d:%06.3fZ] %s\n' % (h, rest // 60, rest % 60, text))
+
+        for stage in STAGES:
+            line('[Pipeline] stage')
+            line('[Pipeline] { (%s)' % stage)
+            for i in range(lines_per_stage):
+                seconds += 0.0004
+                line('#12 %d.%03d npm http fetch GET 200 https://registry.npmjs.org/pkg-%d 42ms' % (i, i % 1000, i))
+            line('[Pipeline] }')
+            line('[Pipeline] // stage')
+        line('Finished: SUCCESS')
+
+
+def line_by_line(path):
+    stamp = re.compile(rb'\[(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d\.\d+)Z\] ')
+    mark = re.compile(rb'\[Pipeline\] (?:\{ \((.*)\)$|// stage)')
+    stack, parts = [], []
+    with open(path, 'rb') as f:
+        for line in f:
+            found = mark.search(line.rstrip(b'\n'))
+            if found is None:
+                continue
+            h, m, s = stamp.match(line).groups()[3:]
+            at = int(h) * 3600 + int(m) * 60 + float(s)
+            if found.group(1) is not None:
+                stack.append((found.group(1).decode(), at))
+            else:
+                name, started = stack.pop()
+                parts.append([name, round(at - started, 3)])
+    return parts
+
+
+def sketch_error(count):
+    rng = random.Random(0)
+    values = [rng.lognormvariate(4, 1) for _ in range(count)]
+    sketch = QuantileSketch()
+    start = time.perf_counter()
+    for value in values:
+        sketch.add(value)
+    seconds = time.perf_counter() - start
+    values.sort()
+    worst = max(abs(sketch.quantile(q) - values[round(q * (count - 1))]) / values[round(q * (count - 1))]
+                for q in cilogs.PERCENTILES)
+    return seconds, len(sketch.bins), worst
+
+
+def main(mb=200, count=1000000):
+    with tempfile.TemporaryDirectory(prefix='bench_cilogs_') as scratch:
+        path = os.path.join(scratch, 'console.log')
+        write_log(path, mb)
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        naive = line_by_line(path)
+        naive_s = time.perf_counter() - start
+        start = time.perf_counter()
+        runs = cilogs.parse_jenkins_log(path)
+        mmap_s = time.perf_counter() - start
+        if runs[0]['parts'] != naive:
+            raise SystemExit('mmap scan and line-by-line scan disagree')
+
+        cache = ParseCache(os.path.join(scratch, 'cache'))
+        cilogs.collect_runs([path], cache)
+        start = time.perf_counter()
+        cilogs.collect_runs([path], ParseCache(os.path.join(scratch, 'cache')))
+        warm_s = time.perf_counter() - start
+
+    sketch_s, bins, worst = sketch_error(count)
+    print('%.0f MB Jenkins log, %d stages' % (size / 1e6, len(naive)))
+    print('line by line     %7.3fs  %7.0f MB/s' % (naive_s, size / 1e6 / naive_s))
+    print('mmap + markers   %7.3fs  %7.0f MB/s  (%.1fx)' % (mmap_s, size / 1e6 / mmap_s, naive_s / mmap_s))
+    print('warm ParseCache  %7.4fs' % warm_s)
+    print('sketch: %d values in %.3fs, %d bins, worst p50/p95/p99 error %.2f%%'
+          % (count, sketch_s, bins, worst * 100))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,132 @@
+"""Docker image archives: header-only mmap walk against the tarfile module
+
+Writes two synthetic `docker save` archives in the classic layout, backend
+and frontend images sharing their base image's layers. Each image has
+`files` small files and a few large ones (`large_mb` each). The benchmark
+reads both archives with `dockerimage.collect`: cold, so every layer is
+walked, and warm, so each layer comes from the digest cache. It compares
+the cold read with listing the same layers through `tarfile`. It also
+checks that both give the same sizes and file counts.
+
+    python benchmarks/bench_dockerimage.py [files] [large_mb]
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cicd_doc import dockerimage  # noqa: E402
+
+
+def _add(archive, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    archive.addfile(info, io.BytesIO(data))
+
+
+def write_layer(path, files, large_mb, seed):
+    """A layer tar of `files` small files plus `large_mb`-sized ones; returns its diff_id"""
+    with tarfile.open(path, 'w', format=tarfile.PAX_FORMAT) as layer:
+        for i in range(files):
+            directory = 'usr/lib/node_modules/pkg%d/%s' % (i // 50, 'lib/deep/nested/path' * (i % 7 == 0))
+            _add(layer, '%s/file-%d-%d.js' % (directory, seed, i), b'x' * (100 + (i * seed) % 4000))
+        for i in range(3):
+            _add(layer, 'opt/blob-%d-%d.bin' % (seed, i), bytes(large_mb << 20))
+        _add(layer, 'var/lib/apt/lists/.wh.partial', b'')
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return 'sha256:' + digest.hexdigest()
+
+
+def write_archive(path, tag, base_layers, own_layers):
+    """A classic-layout docker save archive of one image from (layer path, diff_id) pairs"""
+    layers = base_layers + own_layers
+    history = [{'created_by': '/bin/sh -c #(nop) ADD file:abc in / '}] * len(base_layers)
+    history += [{'created_by': '/bin/sh -c #(nop)  CMD ["bash"]', 'empty_layer': True}]
+    history += [{'created_by': 'RUN /bin/sh -c npm install --legacy-peer-deps # buildkit'}] * len(own_layers)
+    history += [{'created_by': 'CMD ["node" "index.js"]', 'empty_layer': True}]
+    config = json.dumps({'rootfs': {'type': 'layers', 'diff_ids': [digest for _, digest in layers]},
+                         'history': history}).encode()
+    config_name = hashlib.sha256(config).hexdigest() + '.json'
+    with tarfile.open(path, 'w') as archive:
+        names = []
+        for layer_path, digest in layers:
+            name = digest.split(':')[1] + '/layer.tar'
+            archive.add(layer_path, name)
+            names.append(name)
+        _add(archive, config_name, config)
+        manifest = [{'Config': config_name, 'RepoTags': [tag], 'Layers': names}]
+        _add(archive, 'manifest.json', json.dumps(manifest).encode())
+
+
+def dockerfile(own_layers):
+    steps = [['RUN', 'npm install']] * own_layers + [['CMD', 'node index.js']]
+    return {'stages': [{'base': 'node:20-slim', 'name': '', 'steps': steps, 'expose': [], 'cmd': '',
+                        'image_steps': len(steps)}]}
+
+
+def with_tarfile(paths):
+    """(size, files) per layer, listed with the tarfile module"""
+    found = []
+    for path in paths:
+        with tarfile.open(path) as archive:
+            manifest = json.load(archive.extractfile('manifest.json'))
+            for entry in manifest:
+                for name in entry['Layers']:
+                    with tarfile.open(fileobj=archive.extractfile(name)) as layer:
+                        members = [info for info in layer if info.isreg() and not info.name.rsplit('/', 1)[-1]
+                                   .startswith('.wh.')]
+                    found.append((sum(info.size for info in members), len(members)))
+    return found
+
+
+def main(files=100000, large_mb=64):
+    with tempfile.TemporaryDirectory(prefix='bench_dockerimage_') as scratch:
+        def layer(name, count, seed):
+            path = os.path.join(scratch, name)
+            return path, write_layer(path, count, large_mb, seed)
+
+        base = [layer('base1.tar', files // 2, 1), layer('base2.tar', files // 10, 2)]
+        paths = []
+        for seed, service in ((3, 'backend'), (4, 'frontend')):
+            own = [layer('%s1.tar' % service, files // 4, seed), layer('%s2.tar' % service, files // 10, seed + 10)]
+            paths.append(os.path.join(scratch, 'soundplus-%s.tar' % service))
+            write_archive(paths[-1], 'soundplus-%s:latest' % service, base, own)
+        dockerfiles = {'backend': dockerfile(2), 'frontend': dockerfile(2)}
+
+        cache_dir = os.path.join(scratch, 'cache')
+        start = time.perf_counter()
+        images = dockerimage.collect(paths, dockerfiles, cache_dir)
+        cold = time.perf_counter() - start
+        dockerimage._layers.clear()
+        start = time.perf_counter()
+        dockerimage.collect(paths, dockerfiles, cache_dir)
+        warm = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = with_tarfile(paths)
+        slow = time.perf_counter() - start
+        found = [(layer['size'], layer['files']) for image in images for layer in image['layers']]
+        if found != expected:
+            raise SystemExit('layer sizes differ from tarfile: %r != %r' % (found, expected))
+
+        print('2 images, %.0f MB of archives, %d files per image'
+              % (sum(os.path.getsize(path) for path in paths) / 1e6,
+                 sum(layer['files'] for layer in images[0]['layers'])))
+        print('mmap header walk %7.3fs  (shared base layers read once)' % cold)
+        print('tarfile          %7.3fs  (%.1fx slower)' % (slow, slow / cold))
+        print('warm layer cache %7.4fs' % warm)
+        for row in dockerimage.image_rows(images)[0]:
+            print('  ' + '  '.join(row))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,216 @@
+"""Timings and peak memory of the generator's hot paths
+
+Each case runs in its own interpreter so its peak RSS is its own, on
+synthetic data shaped like the project's manifests (package name, semver,
+one-line purpose). Times are the best of several repeats. Results are
+compared against generator_baseline.json; a case fails when its time or
+peak RSS grows by more than the baseline's tolerance.
+
+    python benchmarks/bench_generator.py [--baseline FILE] [--json] [--update-baseline] [CASE ...]
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+HEADERS = ['Package', 'Version', 'Purpose']
+
+
+def synthetic_rows(count):
+    return [('@scope/package-%d' % i, '%d.%d.%d' % (i % 20, i % 11, i % 7),
+             'Runtime dependency used by feature %d of the storefront' % (i % 97))
+            for i in range(count)]
+
+
+def table_case(count):
+    def case():
+        from docx import Document
+        from generate_cicd_doc import create_table_with_header
+
+        rows = synthetic_rows(count)
+        doc = Document()
+        start = time.perf_counter()
+        create_table_with_header(doc, HEADERS, rows)
+        return time.perf_counter() - start, count
+    return case
+
+
+def shading_case(cells=5000):
+    def case():
+        from docx import Document
+        from generate_cicd_doc import set_cell_shading
+
+        doc = Document()
+        table = doc.add_table(rows=cells // 5, cols=5)
+        targets = [cell for row in table.rows for cell in row.cells]
+        start = time.perf_counter()
+        for cell in targets:
+            set_cell_shading(cell, '2E86AB')
+        return time.perf_counter() - start, len(targets)
+    return case
+
+
+def diagram_case(copies=25):
+    def case():
+        from docx import Document
+        from generate_cicd_doc import DEFAULT_DATA, add_diagram
+
+        texts = [DEFAULT_DATA['diagram%d_text' % n] for n in range(1, 5)]
+        doc = Document()
+        start = time.perf_counter()
+        for _ in range(copies):
+            for text in texts:
+                add_diagram(doc, text)
+        return time.perf_counter() - start, copies * len(texts)
+    return case
+
+
+def build_case():
+    from generate_cicd_doc import build_document
+    from cicd_doc.config import BuildConfig
+
+    start = time.perf_counter()
+    build_document(BuildConfig(ingest=False, cache_dir=None))
+    return time.perf_counter() - start, 1
+
+
+def save_case():
+    from generate_cicd_doc import build_document
+    from cicd_doc.config import BuildConfig
+
+    doc = build_document(BuildConfig(ingest=False, cache_dir=None))
+    out = io.BytesIO()
+    start = time.perf_counter()
+    doc.save(out)
+    return time.perf_counter() - start, out.tell()
+
+
+# name: (case, repeats, unit)
+CASES = {
+    'table_10': (table_case(10), 200, 'rows'),
+    'table_1000': (table_case(1000), 20, 'rows'),
+    'table_50000': (table_case(50000), 3, 'rows'),
+    'cell_shading': (shading_case(), 5, 'cells'),
+    'diagrams': (diagram_case(), 10, 'paragraphs'),
+    'build': (build_case, 10, 'documents'),
+    'save': (save_case, 10, 'bytes'),
+}
+
+
+def run_case(name):
+    """Run one case in this process: best and median seconds, throughput and peak RSS"""
+    case, repeats, unit = CASES[name]
+    case()  # warm up imports and caches
+    samples = []
+    for _ in range(repeats):
+        samples.append(case())
+        # Documents hold reference cycles; without this, repeats pile up in RSS
+        gc.collect()
+    seconds = min(elapsed for elapsed, _ in samples)
+    units = samples[0][1]
+    return {
+        'seconds': seconds,
+        'median_seconds': statistics.median(elapsed for elapsed, _ in samples),
+        'per_second': units / seconds if seconds else None,
+        'unit': unit,
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def measure(name):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--case', name],
+                          capture_output=True, text=True, cwd=HERE)
+    if proc.returncode != 0:
+        raise SystemExit('%s failed:\n%s' % (name, proc.stderr[-2000:]))
+    return json.loads(proc.stdout)
+
+
+# Allowed growth over the baseline, per metric; timings vary more between runs than memory
+DEFAULT_TOLERANCE = {'seconds': 1.0, 'peak_rss_kb': 0.25}
+
+
+def compare(results, baseline):
+    tolerance = dict(DEFAULT_TOLERANCE, **baseline.get('tolerance', {}))
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get('cases', {}).get(name)
+        if expected is None:
+            continue
+        for metric, allowed in tolerance.items():
+            if result[metric] > expected[metric] * (1 + allowed):
+                failures.append('%s: %s %.4g over baseline %.4g (+%d%% allowed)'
+                                % (name, metric, result[metric], expected[metric], allowed * 100))
+    return failures
+
+
+def write_baseline(path, baseline):
+    """One line per case, like startup_budget.json"""
+    lines = ['{', '  "tolerance": %s,' % json.dumps(baseline['tolerance'], sort_keys=True), '  "cases": {']
+    cases = sorted(baseline['cases'].items())
+    for i, (name, values) in enumerate(cases):
+        lines.append('    %s: %s%s' % (json.dumps(name), json.dumps(values, sort_keys=True),
+                                       ',' if i < len(cases) - 1 else ''))
+    lines += ['  }', '}']
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('cases', nargs='*', help='cases to run (default: all of %s)' % ', '.join(CASES))
+    parser.add_argument('--baseline', default=os.path.join(HERE, 'generator_baseline.json'))
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store these results as the new baseline instead of comparing')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case)))
+        return 0
+
+    unknown = sorted(set(args.cases) - set(CASES))
+    if unknown:
+        parser.error('unknown cases: %s' % ', '.join(unknown))
+    results = {name: measure(name) for name in args.cases or CASES}
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {'tolerance': DEFAULT_TOLERANCE, 'cases': {}}
+
+    if args.update_baseline:
+        baseline['cases'].update({name: {'seconds': round(result['seconds'], 6),
+                                         'peak_rss_kb': result['peak_rss_kb']}
+                                  for name, result in results.items()})
+        write_baseline(args.baseline, baseline)
+        failures = []
+    else:
+        failures = compare(results, baseline)
+
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    else:
+        for name, result in results.items():
+            print('%-14s %10.4f s  %12.0f %s/s  %8d KiB peak'
+                  % (name, result['seconds'], result['per_second'] or 0, result['unit'],
+                     result['peak_rss_kb']))
+    for failure in failures:
+        print('FAIL ' + failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Cold and warm image preparation, in-process against the process pool
+
+Writes `count` synthetic 3000x2000 JPEGs (every tenth one a duplicate)
+to a scratch directory and times `images.prepare_images` with one worker,
+with the pool, and again with a warm thumbnail cache. Needs Pillow.
+
+    python benchmarks/bench_images.py [count] [workers]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cicd_doc import images  # noqa: E402
+
+
+def write_sources(directory, count):
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(0)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, 'product-%03d.jpg' % i)
+        if i % 10 == 9:
+            with open(paths[-1], 'rb') as src, open(path, 'wb') as dst:
+                dst.write(src.read())
+        else:
+            image = Image.new('RGB', (3000, 2000), tuple(rng.randrange(256) for _ in range(3)))
+            draw = ImageDraw.Draw(image)
+            for _ in range(50):
+                x, y = rng.randrange(2800), rng.randrange(1800)
+                draw.ellipse((x, y, x + rng.randrange(200), y + rng.randrange(200)),
+                             fill=tuple(rng.randrange(256) for _ in range(3)))
+            image.save(path, quality=92)
+        paths.append(path)
+    return paths
+
+
+def timed(paths, cache_dir, workers):
+    images._prepared.clear()
+    images.cache_dir = cache_dir
+    images.workers = workers
+    start = time.perf_counter()
+    prepared = images.prepare_images(paths)
+    return time.perf_counter() - start, prepared
+
+
+def main(count=40, workers=None):
+    if images._pillow() is None:
+        raise SystemExit('Pillow is not installed')
+    with tempfile.TemporaryDirectory(prefix='bench_images_') as scratch:
+        paths = write_sources(scratch, count)
+        source_bytes = sum(os.path.getsize(path) for path in paths)
+        serial, _ = timed(paths, os.path.join(scratch, 'serial'), 1)
+        pooled, prepared = timed(paths, os.path.join(scratch, 'pooled'), workers)
+        warm, _ = timed(paths, os.path.join(scratch, 'pooled'), workers)
+    distinct = {id(image): image for image in prepared}.values()
+    print('%d images (%d distinct), %.1f MB -> %.1f MB, %d CPUs'
+          % (count, len(distinct), source_bytes / 1e6, sum(len(image.blob) for image in distinct) / 1e6,
+             os.cpu_count()))
+    print('cold, 1 worker   %7.3fs' % serial)
+    print('cold, pool       %7.3fs  (%.1fx)' % (pooled, serial / pooled))
+    print('warm cache       %7.3fs' % warm)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,99 @@
+"""Load-test result parsing: k6 JSON and CSV with millions of samples
+
+Writes synthetic k6 `--out json` and `--out csv` files for `samples`
+requests to the backend's endpoints. Each request also logs the other
+timing metrics k6 records, so only one line in five is a duration. The
+benchmark times `loadtest.parse_result_file` on both files and a warm read
+through `ParseCache`, and checks p50/p90/p99 against the exact values.
+Each parse's peak memory comes from a second, traced run. NumPy is used
+when installed.
+
+    python benchmarks/bench_loadtest.py [samples]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cicd_doc import loadtest  # noqa: E402
+from cicd_doc.filecache import ParseCache  # noqa: E402
+from cicd_doc.sketch import QuantileSketch, _numpy  # noqa: E402
+
+ENDPOINTS = [('GET', '/products', 20), ('GET', '/products/42', 15), ('POST', '/orders', 60),
+             ('GET', '/admin/stats', 120), ('GET', '/health', 2)]
+OTHER_METRICS = ('http_req_waiting', 'http_req_sending', 'http_req_receiving', 'http_reqs')
+
+
+def write_k6(directory, count, seed=0):
+    """(json path, csv path, {endpoint: sorted durations})"""
+    rng = random.Random(seed)
+    exact = {}
+    json_path = os.path.join(directory, 'k6.json')
+    csv_path = os.path.join(directory, 'k6.csv')
+    with open(json_path, 'w') as out_json, open(csv_path, 'w') as out_csv:
+        out_json.write('{"type":"Metric","data":{"type":"trend","contains":"time","thresholds":[],'
+                       '"submetrics":null},"metric":"http_req_duration"}\n')
+        out_csv.write('metric_name,timestamp,metric_value,check,error,error_code,expected_response,group,method,'
+                      'name,proto,scenario,service,status,subproto,tls_version,url,extra_tags,metadata\n')
+        for i in range(count):
+            method, path, median = ENDPOINTS[i % len(ENDPOINTS)]
+            value = rng.lognormvariate(0, 0.6) * median
+            status = '500' if rng.random() < 0.002 else '200'
+            exact.setdefault('%s %s' % (method, path), []).append(value)
+            second = 1767607200 + i // 2000
+            stamp = '2026-01-05T10:%02d:%02d.%06d+00:00' % (i // 2000 // 60 % 60, i // 2000 % 60, i % 1000000)
+            url = 'http://localhost:5000%s' % path
+            tags = ('"tags":{"expected_response":"true","group":"","method":"%s","name":"%s","proto":"HTTP/1.1",'
+                    '"scenario":"default","status":"%s","url":"%s"}' % (method, url, status, url))
+            for metric in ('http_req_duration',) + OTHER_METRICS:
+                metric_value = value if metric == 'http_req_duration' else value / 3
+                out_json.write('{"type":"Point","data":{"time":"%s","value":%.6f,%s},"metric":"%s"}\n'
+                               % (stamp, metric_value, tags, metric))
+                out_csv.write('%s,%d,%.6f,,,,true,,%s,%s,HTTP/1.1,default,,%s,,,%s,,\n'
+                              % (metric, second, metric_value, method, url, status, url))
+    return json_path, csv_path, {name: sorted(values) for name, values in exact.items()}
+
+
+def worst_error(results, exact):
+    worst = 0.0
+    for result in results:
+        sketch = QuantileSketch.from_json(result['sketch'])
+        values = exact['%s %s' % (result['method'], result['path'])]
+        for q in loadtest.PERCENTILES:
+            true = values[round(q * (len(values) - 1))]
+            worst = max(worst, abs(sketch.quantile(q) - true) / true)
+    return worst
+
+
+def main(count=500000):
+    with tempfile.TemporaryDirectory(prefix='bench_loadtest_') as scratch:
+        json_path, csv_path, exact = write_k6(scratch, count)
+        print('%d samples, %d lines; k6 JSON %.0f MB, CSV %.0f MB; NumPy %s'
+              % (count, count * (1 + len(OTHER_METRICS)), os.path.getsize(json_path) / 1e6,
+                 os.path.getsize(csv_path) / 1e6, 'yes' if _numpy() else 'no'))
+        for label, path in (('k6 JSON', json_path), ('k6 CSV', csv_path)):
+            start = time.perf_counter()
+            results = loadtest.parse_result_file(path)
+            seconds = time.perf_counter() - start
+            # Traced separately: tracemalloc slows every allocation down several times over
+            tracemalloc.start()
+            loadtest.parse_result_file(path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('%-8s %7.3fs  %6.2f M samples/s  peak %5.1f MB  worst percentile error %.2f%%'
+                  % (label, seconds, count / seconds / 1e6, peak / 1e6, worst_error(results, exact) * 100))
+
+        cache_dir = os.path.join(scratch, 'cache')
+        loadtest.collect([json_path], ParseCache(cache_dir))
+        start = time.perf_counter()
+        loadtest.collect([json_path], ParseCache(cache_dir))
+        print('warm ParseCache %.4fs' % (time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,125 @@
+"""Lockfile dependency graphs: streamed parse and memoized closures at npm scale
+
+Writes a synthetic version 3 package-lock.json with `packages` entries:
+hoisted packages, nested duplicate versions and dependency cycles. The
+benchmark times `parse_lockfile` against `json.load` of the whole file
+followed by the same graph build, each with its peak memory, and
+`project_rows`, which computes the closure of every direct dependency,
+against a breadth-first search per direct dependency, plus a warm
+`ParseCache` read. It also checks that the graphs and transitive counts
+agree.
+
+    python benchmarks/bench_lockfile.py [packages] [direct]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cicd_doc import lockfile  # noqa: E402
+from cicd_doc.filecache import ParseCache  # noqa: E402
+
+LICENSES = ['MIT'] * 20 + ['ISC'] * 4 + ['Apache-2.0'] * 2 + ['BSD-3-Clause', 'BSD-2-Clause', '0BSD', None]
+
+
+def write_lockfile(path, count, direct, seed=0):
+    rng = random.Random(seed)
+    names = ['pkg-%d' % i if i % 9 else '@scope%d/pkg-%d' % (i % 40, i) for i in range(count)]
+    packages = {'': {'name': 'synthetic', 'version': '1.0.0',
+                     'dependencies': {name: '^1.0.0' for name in names[:direct]},
+                     'devDependencies': {name: '^1.0.0' for name in names[direct:direct + direct // 2]}}}
+    for i, name in enumerate(names):
+        # Mostly dependencies further down the list, some back up it to form cycles
+        wanted = {names[min(count - 1, i + 1 + int(rng.expovariate(1 / 40)))] for _ in range(rng.randint(0, 6))}
+        if rng.random() < 0.02:
+            wanted.add(names[rng.randrange(count)])
+        wanted.discard(name)
+        entry = {'version': '1.%d.%d' % (i % 5, i % 3), 'resolved': 'https://registry.npmjs.org/%s/-/x.tgz' % name,
+                 'integrity': 'sha512-' + 'A' * 86 + '==', 'license': rng.choice(LICENSES),
+                 'dependencies': {dep: '^1.0.0' for dep in sorted(wanted)}}
+        if i >= direct:
+            entry['dev'] = i % 3 == 0
+        packages['node_modules/' + name] = entry
+        if i % 25 == 0 and wanted:
+            # A second version of one of its dependencies, nested under it
+            dep = sorted(wanted)[0]
+            packages['node_modules/%s/node_modules/%s' % (name, dep)] = dict(entry, version='2.0.0', dependencies={})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'name': 'synthetic', 'version': '1.0.0', 'lockfileVersion': 3, 'requires': True,
+                   'packages': packages}, f, indent=2)
+
+
+def breadth_first(graph, start):
+    seen = {start}
+    queue = [start]
+    for node in queue:
+        for child in graph.dependencies(node):
+            if child not in seen:
+                seen.add(child)
+                queue.append(child)
+    return len(seen) - 1
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    # Traced separately: tracemalloc slows every allocation down
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main(count=30000, direct=40):
+    with tempfile.TemporaryDirectory(prefix='bench_lockfile_') as scratch:
+        path = os.path.join(scratch, 'package-lock.json')
+        write_lockfile(path, count, direct)
+
+        def load(path):
+            with open(path, encoding='utf-8') as f:
+                packages = json.load(f)['packages']
+            builder = lockfile._Builder()
+            for key, entry in packages.items():
+                builder.add(key, entry)
+            return builder.graph()
+
+        parsed, parse_seconds, parse_peak = timed(lockfile.parse_lockfile, path)
+        loaded, load_seconds, load_peak = timed(load, path)
+        if loaded != parsed:
+            raise SystemExit('streamed graph differs from json.load')
+        cache_dir = os.path.join(scratch, 'cache')
+        ParseCache(cache_dir).load(path, lockfile.parse_lockfile, from_path=True)
+        start = time.perf_counter()
+        ParseCache(cache_dir).load(path, lockfile.parse_lockfile, from_path=True)
+        warm = time.perf_counter() - start
+        graph = lockfile.DependencyGraph(parsed)
+        start = time.perf_counter()
+        _, direct_rows, duplicate_rows, _ = lockfile.project_rows('Synthetic', graph)
+        rows_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = {graph.package(i)[0]: breadth_first(graph, i) for i, _ in graph.direct()}
+        search_seconds = time.perf_counter() - start
+        found = {row[1]: int(row[4]) for row in direct_rows}
+        if found != expected:
+            raise SystemExit('transitive counts differ from breadth-first search')
+
+        print('%d packages, %d edges, %.1f MB lockfile'
+              % (len(graph), len(graph.targets), os.path.getsize(path) / 1e6))
+        print('parse_lockfile  %7.3fs  peak %6.1f MB' % (parse_seconds, parse_peak / 1e6))
+        print('json.load+build %7.3fs  peak %6.1f MB' % (load_seconds, load_peak / 1e6))
+        print('project_rows    %7.3fs  (%d direct closures, %d duplicated names listed)'
+              % (rows_seconds, len(direct_rows), len(duplicate_rows)))
+        print('BFS per direct  %7.3fs' % search_seconds)
+        print('warm ParseCache %7.3fs' % warm)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
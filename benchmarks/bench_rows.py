@@ -0,0 +1,97 @@
+"""Memory and time of table row sources: list of tuples, ColumnarRows, LazyRows
+
+For each source, reports the memory the rows hold once built, then the
+peak RSS and time of writing a table from them, either into a python-docx
+`Document` (every row ends up in the XML tree) or through `render_sections`
+into a `StreamingDocument` (rows are written out chunk by chunk). Each case
+runs in its own interpreter so its peak RSS is its own. The rows imitate a
+transitive dependency inventory: unique names, a few hundred distinct
+versions and a handful of purposes.
+
+    python benchmarks/bench_rows.py [rows ...]
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cicd_doc.rows import ColumnarRows, LazyRows  # noqa: E402
+
+HEADERS = ['Package', 'Version', 'Purpose']
+PURPOSES = ['Runtime dependency', 'Development dependency', 'Optional dependency', 'Peer dependency']
+
+
+def inventory(count):
+    # Values are built per row, as a parser would, so equal strings are separate objects
+    for i in range(count):
+        yield ('package-%d' % i, '%d.%d.%d' % (i % 20, i % 7, i % 3), '%s' % PURPOSES[i % 7 % 4])
+
+
+SOURCES = {
+    'list': lambda count: list(inventory(count)),
+    'columnar': lambda count: ColumnarRows(len(HEADERS), inventory(count)),
+    'lazy': lambda count: LazyRows(inventory, count, key=count),
+}
+
+
+def write_document(rows, scratch):
+    from docx import Document
+    from cicd_doc.tables import build_table
+    doc = Document()
+    build_table(doc, HEADERS, rows)
+    doc.save(os.path.join(scratch, 'table.docx'))
+
+
+def write_streaming(rows, scratch):
+    from cicd_doc.sections import Section, render_sections
+    from cicd_doc.streaming import StreamingDocument
+
+    def table(model, rows):
+        model.add_table(HEADERS, rows)
+
+    doc = StreamingDocument(os.path.join(scratch, 'table.docx'))
+    render_sections(doc, [Section('table', table, {'rows': rows})])
+    doc.save()
+
+
+TARGETS = {'document': write_document, 'streaming': write_streaming}
+
+
+def run_case(source, target, count):
+    """Held bytes of the rows, then seconds and peak RSS of writing them out"""
+    tracemalloc.start()
+    rows = SOURCES[source](count)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    with tempfile.TemporaryDirectory(prefix='bench_rows_') as scratch:
+        start = time.perf_counter()
+        TARGETS[target](rows, scratch)
+        seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    return {'held': held, 'seconds': seconds, 'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def main(sizes):
+    print('%8s  %-9s  %-9s  %8s  %12s  %8s' % ('rows', 'source', 'target', 'held MB', 'peak RSS MB', 'write s'))
+    for count in sizes:
+        for target in TARGETS:
+            for source in SOURCES:
+                proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--case', source, target, str(count)],
+                                      capture_output=True, text=True, check=True)
+                result = json.loads(proc.stdout)
+                print('%8d  %-9s  %-9s  %8.1f  %12.1f  %8.3f' % (count, source, target, result['held'] / 1e6,
+                                                                 result['peak_rss_kb'] / 1024, result['seconds']))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--case']:
+        print(json.dumps(run_case(sys.argv[2], sys.argv[3], int(sys.argv[4]))))
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
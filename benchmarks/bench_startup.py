@@ -0,0 +1,88 @@
+"""Cold-start budget for the generator's light modes
+
+Runs generate_cicd_doc.py under `python -X importtime` for every mode in
+startup_budget.json, and fails when the import time or wall time of a mode
+goes over its budget, or when a mode loads a forbidden module (python-docx
+or lxml).
+
+    python benchmarks/bench_startup.py [--budget FILE] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, '..', 'generate_cicd_doc.py')
+
+
+def parse_importtime(stderr):
+    """{module: self microseconds} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(self_us)
+    return modules
+
+
+def run_once(args):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', SCRIPT] + args,
+                          capture_output=True, text=True, cwd=HERE)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise SystemExit('%s failed:\n%s' % (' '.join(args), proc.stderr[-2000:]))
+    return wall, parse_importtime(proc.stderr)
+
+
+def measure(mode, runs):
+    walls, imports = [], []
+    loaded = set()
+    for _ in range(runs):
+        wall, modules = run_once(mode['args'])
+        walls.append(wall * 1000)
+        imports.append(sum(modules.values()) / 1000)
+        loaded.update(modules)
+    return {'wall_ms': statistics.median(walls), 'import_ms': statistics.median(imports), 'modules': loaded}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', default=os.path.join(HERE, 'startup_budget.json'))
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+
+    failures = []
+    results = {}
+    for name, mode in budget['modes'].items():
+        result = measure(mode, budget.get('runs', 5))
+        forbidden = sorted(module for module in result.pop('modules')
+                           if module.split('.')[0] in budget.get('forbidden_modules', []))
+        results[name] = dict(result, forbidden=forbidden)
+        if forbidden:
+            failures.append('%s imported %s' % (name, ', '.join(forbidden[:5])))
+        for metric in ('import_ms', 'wall_ms'):
+            if metric in mode and result[metric] > mode[metric]:
+                failures.append('%s: %s %.1f over budget %.1f' % (name, metric, result[metric], mode[metric]))
+
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    else:
+        for name, result in results.items():
+            print('%-16s import %7.1f ms   wall %7.1f ms' % (name, result['import_ms'], result['wall_ms']))
+    for failure in failures:
+        print('FAIL ' + failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
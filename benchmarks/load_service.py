@@ -0,0 +1,121 @@
+"""Load test for the document service (generate_cicd_doc.py --serve)
+
+Starts a server on a free port (or uses --url), sends --requests render
+requests from --concurrency clients over keep-alive connections, cycling
+through --variants distinct configs, and prints throughput, latency
+percentiles, how requests were served (built, coalesced, cache hit) and the
+server's own /stats.
+
+    python benchmarks/load_service.py [--url URL] [--requests N] [--concurrency C]
+                                      [--variants K] [--format docx|html|md]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, '..', 'generate_cicd_doc.py')
+
+
+def variant_body(index, output_format):
+    data = {'repo_rows': [('Variant', 'load-test-%d' % index)]}
+    return json.dumps({'format': output_format, 'data': data}).encode()
+
+
+async def request(reader, writer, host, method, path, body=b''):
+    writer.write(('%s %s HTTP/1.1\r\nHost: %s\r\nContent-Length: %d\r\n\r\n'
+                  % (method, path, host, len(body))).encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    payload = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, payload
+
+
+async def client(host, port, bodies, latencies, outcomes):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            status, headers, _ = await request(reader, writer, host, 'POST', '/render', body)
+            latencies.append(time.perf_counter() - start)
+            outcomes[headers.get('x-cache', 'error %d' % status)] += 1
+    finally:
+        writer.close()
+
+
+async def run(host, port, total, concurrency, variants, output_format):
+    bodies = [variant_body(i % variants, output_format) for i in range(total)]
+    latencies, outcomes = [], Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, bodies[i::concurrency], latencies, outcomes)
+                           for i in range(concurrency)))
+    wall = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection(host, port)
+    _, _, stats = await request(reader, writer, host, 'GET', '/stats')
+    writer.close()
+    return wall, sorted(latencies), outcomes, json.loads(stats)
+
+
+def start_server(jobs):
+    args = [sys.executable, SCRIPT, '--serve', '0']
+    if jobs:
+        args += ['--jobs', str(jobs)]
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, text=True, cwd=os.path.join(HERE, '..'))
+    line = proc.stdout.readline()
+    if not line.startswith('Serving on '):
+        proc.kill()
+        raise SystemExit('server did not start: %r' % line)
+    return proc, line.split()[2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='running service to test (default: start one)')
+    parser.add_argument('--jobs', type=int, help='worker processes for the started server')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--variants', type=int, default=4)
+    parser.add_argument('--format', default='docx', choices=('docx', 'html', 'md'))
+    args = parser.parse_args()
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = start_server(args.jobs)
+    try:
+        parts = urlsplit(url)
+        wall, latencies, outcomes, stats = asyncio.run(run(
+            parts.hostname, parts.port, args.requests, args.concurrency, args.variants, args.format))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    print('%d requests, %d clients, %d variants (%s) in %.3fs: %.1f req/s'
+          % (args.requests, args.concurrency, args.variants, args.format, wall, args.requests / wall))
+    print('latency ms: p50 %.2f  p90 %.2f  p99 %.2f  max %.2f'
+          % (percentile(0.5), percentile(0.9), percentile(0.99), latencies[-1] * 1000))
+    print('served: %s' % ', '.join('%s %d' % item for item in sorted(outcomes.items())))
+    print('server stats: %s' % json.dumps(stats, sort_keys=True))
+    return 0 if set(outcomes) <= {'built', 'coalesced', 'hit'} else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Support library for generate_cicd_doc.py"""
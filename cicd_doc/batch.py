@@ -0,0 +1,129 @@
+"""Render several document variants in parallel
+
+A variant is the base document data with some tables replaced (env vars,
+URLs, repository details ...). Sections whose inputs are the same for
+every variant are rendered once in the parent process and stored in the
+fragment cache; the workers then only build their variant-specific
+sections and splice the shared ones in. Every variant is written with the
+same build options (streaming, deterministic output, compression, page
+estimates) as a single document; once all are done, fragments of those
+sections that no variant uses any more are pruned from the cache.
+"""
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from docx import Document
+
+from .config import BuildConfig
+from .docx_writer import new_document, save_document
+from .sections import FragmentCache, render_section, render_sections
+
+
+class Variant:
+    """A named set of data overrides written to its own .docx"""
+
+    def __init__(self, name, output, data=None):
+        self.name = name
+        self.output = output
+        self.data = data or {}
+
+    def __repr__(self):
+        return 'Variant(%r)' % self.name
+
+
+class VariantResult:
+    def __init__(self, name, output, seconds, rebuilt, cached):
+        self.name = name
+        self.output = output
+        self.seconds = seconds
+        self.rebuilt = rebuilt
+        self.cached = cached
+
+
+def load_variants(path, known_keys, output_pattern='SoundPlus_CICD_Documentation_%s.docx'):
+    """Read variants from a JSON file: a list, or {"variants": [...]}
+
+    Each entry has a `name`, an optional `output` path (relative to the
+    config file) and a `data` object overriding tables by their data key.
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    entries = config['variants'] if isinstance(config, dict) else config
+    base = os.path.dirname(os.path.abspath(path))
+
+    variants = []
+    for entry in entries:
+        name = entry['name']
+        data = entry.get('data', {})
+        unknown = sorted(set(data) - set(known_keys))
+        if unknown:
+            raise ValueError('variant %r overrides unknown data: %s' % (name, ', '.join(unknown)))
+        output = os.path.join(base, entry.get('output', output_pattern % name))
+        variants.append(Variant(name, output, data))
+    return variants
+
+
+def _render_variant(job):
+    make_sections, variant, data, config, redactor = job
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(variant.output) or '.', exist_ok=True)
+    doc, date_time = new_document(variant.output, config)
+    report = render_sections(doc, make_sections(data), FragmentCache(config.cache_dir, prune=False),
+                             config.estimate_pages, redactor)
+    save_document(doc, variant.output, config, date_time)
+    if config.deterministic:
+        from .reproducible import write_digest
+
+        write_digest(variant.output)
+    return VariantResult(variant.name, variant.output, time.perf_counter() - start,
+                         len(report.rebuilt), len(report.cached))
+
+
+def shared_sections(section_lists):
+    """Sections whose key is identical in every variant"""
+    first, rest = section_lists[0], section_lists[1:]
+    return [section for i, section in enumerate(first)
+            if all(sections[i].key == section.key for sections in rest)]
+
+
+def run_batch(variants, base_data, make_sections, config=None, workers=None, redactor=None):
+    """Render every variant with the build options of `config`; returns one VariantResult per variant, in order"""
+    config = config or BuildConfig()
+    if config.cache_dir is None:
+        scratch = tempfile.TemporaryDirectory(prefix='cicd_doc_batch_')
+        config = config.replace(cache_dir=scratch.name)
+    else:
+        scratch = None
+
+    try:
+        variant_data = [dict(base_data, **variant.data) for variant in variants]
+        section_lists = [make_sections(data) for data in variant_data]
+        cache = FragmentCache(config.cache_dir, prune=False)
+        scratch_doc = Document()
+        for section in shared_sections(section_lists):
+            render_section(scratch_doc, section, cache, redactor)
+
+        jobs = [(make_sections, variant, data, config, redactor)
+                for variant, data in zip(variants, variant_data)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_variant, jobs))
+        if scratch is None:
+            cache.retain([section for sections in section_lists for section in sections if section.cacheable],
+                         redactor)
+        return results
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+
+
+def summary(results, wall_seconds):
+    lines = ['%-20s %8s %8s %8s  %s' % ('variant', 'seconds', 'rebuilt', 'cached', 'output')]
+    for result in results:
+        lines.append('%-20s %8.3f %8d %8d  %s' % (result.name, result.seconds, result.rebuilt,
+                                                  result.cached, result.output))
+    lines.append('%d variants in %.3fs wall time' % (len(results), wall_seconds))
+    return '\n'.join(lines)
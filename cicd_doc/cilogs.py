@@ -0,0 +1,322 @@
+"""Pipeline run times read from Jenkins console logs and GitHub Actions log archives
+
+Logs can run to gigabytes, so neither kind is read into memory:
+
+- A Jenkins console log is mapped with mmap and searched for the
+  `[Pipeline] { (Stage)` / `[Pipeline] // stage` markers, and its tail
+  for the `Finished: RESULT` line; only those lines' timestamps are parsed.
+  Timestamps come from the Timestamper plugin (`[2026-01-05T10:00:00.123Z]`
+  or `10:00:00` at the start of each line). A `build.xml` next to a build
+  directory's `log` supplies the start time, duration and result when the
+  lines carry no dates.
+- A GitHub Actions log archive (the zip the "Download log archive" button
+  and the REST API return) is decompressed member by member; a job's
+  duration is the span between its first and last timestamp, so only the
+  head and a bounded tail of each job log are kept.
+
+Each log becomes a list of small JSON-compatible run records, read through
+`ParseCache`, so a log is only scanned again when it changes. The records
+are folded into quantile sketches (see `sketch`), which hold per-stage and per-week
+duration distributions in bounded memory however many runs there are.
+"""
+
+import calendar
+import datetime
+import mmap
+import os
+import re
+import sys
+import zipfile
+
+from .sketch import QuantileSketch
+
+JENKINS = 'Jenkins'
+ACTIONS = 'GitHub Actions'
+PIPELINES = (JENKINS, ACTIONS)
+
+PERCENTILES = (0.5, 0.95, 0.99)
+# Weeks shown in the trend table, most recent last
+TREND_WEEKS = 12
+
+LOG_SUFFIXES = ('.log', '.txt')
+
+# Bytes read from each end of a log when looking for its first and last timestamp
+_EDGE = 1 << 16
+_CHUNK = 1 << 20
+
+# Optional BOM, then an ISO date-time or a time of day, optionally bracketed
+_STAMP = re.compile(rb'(?:\xef\xbb\xbf)?\[?(?:(\d{4})-(\d\d)-(\d\d)[T ])?(\d\d):(\d\d):(\d\d)(?:[.,](\d+))?Z?\]?[ \t]')
+# One literal prefix, so the search skips from marker to marker instead of trying
+# every line. The stage name runs to the last ')' on the line, as names may
+# contain parentheses.
+_JENKINS_MARK = re.compile(rb'\[Pipeline\] (?:\{ \(([^\r\n]*)\)|// stage)')
+_JENKINS_RESULT = re.compile(rb'Finished: ([A-Z_]+)')
+_BUILD_XML = {name: re.compile(r'<%s>([^<]*)</%s>' % (name, name)) for name in ('startTime', 'duration', 'result')}
+_ACTIONS_ERROR = b'##[error]'
+_JOB_FILE = re.compile(r'^\d+_(.+)\.txt$')
+
+
+class _Clock:
+    """Line timestamps as seconds on one timeline
+
+    Dated stamps are seconds since the epoch. Times of day are seconds
+    since the first midnight, rolling over whenever the time goes backwards.
+    """
+
+    __slots__ = ('dated', '_days', '_last')
+
+    def __init__(self):
+        self.dated = False
+        self._days = 0
+        self._last = None
+
+    def read(self, line):
+        match = _STAMP.match(line)
+        if match is None:
+            return None
+        year, month, day, hours, minutes, seconds, fraction = match.groups()
+        value = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+        if fraction:
+            value += float(b'0.' + fraction)
+        if year is not None:
+            self.dated = True
+            return calendar.timegm((int(year), int(month), int(day), 0, 0, 0)) + value
+        if self._last is not None and value + self._days * 86400 < self._last:
+            self._days += 1
+        value += self._days * 86400
+        self._last = value
+        return value
+
+
+def _first_stamp(clock, lines):
+    for line in lines:
+        value = clock.read(line)
+        if value is not None:
+            return value
+    return None
+
+
+def _line_at(data, pos):
+    """The start of the line holding `pos`, up to `pos`"""
+    return data[data.rfind(b'\n', 0, pos) + 1:pos]
+
+
+def _build_xml(log_path):
+    """startTime (s), duration (s) and result from the build.xml next to a build's `log`"""
+    if os.path.basename(log_path) != 'log':
+        return {}
+    try:
+        with open(os.path.join(os.path.dirname(log_path), 'build.xml'), encoding='utf-8') as f:
+            text = f.read()
+    except (OSError, UnicodeDecodeError):
+        return {}
+    found = {name: pattern.search(text) for name, pattern in _BUILD_XML.items()}
+    build = {name: match.group(1).strip() for name, match in found.items() if match}
+    for name in ('startTime', 'duration'):
+        if name in build:
+            build[name] = int(build[name]) / 1000 if build[name].isdigit() else None
+    return build
+
+
+def parse_jenkins_log(path):
+    """[run record] for one Jenkins console log; empty when it is not a pipeline log"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        clock = _Clock()
+        first = _first_stamp(clock, data[:_EDGE].split(b'\n'))
+        stack, parts = [], []
+        for match in _JENKINS_MARK.finditer(data):
+            name = match.group(1)
+            at = clock.read(_line_at(data, match.start()).lstrip())
+            if name is not None:
+                # Parallel branches close with a bare '}', not '// stage'
+                if not name.startswith(b'Branch: '):
+                    stack.append((name.decode('utf-8', 'replace'), at))
+            elif stack:
+                name, started = stack.pop()
+                if started is not None and at is not None:
+                    parts.append([name, round(at - started, 3)])
+        tail = data[-_EDGE:]
+        last = _first_stamp(clock, reversed(tail.split(b'\n')))
+        # Jenkins writes the result as the log's last line
+        results = _JENKINS_RESULT.findall(tail)
+        result = results[-1].decode('ascii') if results else ''
+    finally:
+        data.close()
+
+    build = _build_xml(path)
+    duration = build.get('duration')
+    if duration is None and first is not None and last is not None:
+        duration = round(last - first, 3)
+    start = build.get('startTime')
+    if start is None and clock.dated:
+        start = first
+    if start is None and duration is not None:
+        # Undated stamps: the log was last written when the build finished
+        start = os.stat(path).st_mtime - duration
+    if not parts and duration is None:
+        return []
+    return [{'pipeline': JENKINS, 'start': start, 'duration': duration,
+             'result': result or build.get('result', ''), 'parts': parts}]
+
+
+def _member_span(stream):
+    """(first stamp, last stamp, whether an error was logged) of one streamed Actions job log"""
+    clock = _Clock()
+    first = None
+    for _ in range(64):
+        line = stream.readline()
+        if not line:
+            break
+        first = clock.read(line)
+        if first is not None:
+            break
+    failed = False
+    tail = b''
+    for chunk in iter(lambda: stream.read(_CHUNK), b''):
+        failed = failed or _ACTIONS_ERROR in tail[-len(_ACTIONS_ERROR):] + chunk
+        tail = (tail + chunk)[-_EDGE:]
+    lines = tail.split(b'\n')
+    if len(tail) == _EDGE:
+        # The first line may have been cut short
+        lines = lines[1:]
+    last = _first_stamp(clock, reversed(lines))
+    return first, last if last is not None else first, failed
+
+
+def parse_actions_archive(path):
+    """[run record] for one GitHub Actions log archive"""
+    spans = {}
+    with zipfile.ZipFile(path) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir() and info.filename.endswith('.txt')]
+        # Top-level '<n>_<job>.txt' files hold a job's whole log; the per-step
+        # files under '<job>/' are only read for jobs without one
+        whole = {}
+        for info in members:
+            match = _JOB_FILE.match(info.filename)
+            if match and '/' not in info.filename:
+                whole[match.group(1)] = info
+        for info in members:
+            if '/' in info.filename:
+                job = info.filename.split('/', 1)[0]
+                if job in whole:
+                    continue
+            else:
+                match = _JOB_FILE.match(info.filename)
+                if match is None:
+                    continue
+                job = match.group(1)
+            with archive.open(info) as stream:
+                first, last, failed = _member_span(stream)
+            if first is None:
+                continue
+            if job in spans:
+                before = spans[job]
+                first, last, failed = min(first, before[0]), max(last, before[1]), failed or before[2]
+            spans[job] = (first, last, failed)
+    if not spans:
+        return []
+    jobs = sorted(spans.items(), key=lambda item: item[1][0])
+    start = min(first for first, _, _ in spans.values())
+    end = max(last for _, last, _ in spans.values())
+    return [{'pipeline': ACTIONS, 'start': start, 'duration': round(end - start, 3),
+             'result': 'FAILURE' if any(failed for _, _, failed in spans.values()) else 'SUCCESS',
+             'parts': [[job, round(last - first, 3)] for job, (first, last, _) in jobs]}]
+
+
+def log_files(paths):
+    """Log files under `paths` (files or directories), sorted within each directory"""
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for directory, subdirs, names in os.walk(path):
+            subdirs[:] = sorted(name for name in subdirs if not name.startswith('.'))
+            found.extend(os.path.join(directory, name) for name in sorted(names)
+                         if name == 'log' or name.endswith(LOG_SUFFIXES + ('.zip',)))
+    return found
+
+
+def collect_runs(paths, cache=None):
+    """Run records of every log under `paths`, read through an optional ParseCache"""
+    runs = []
+    for path in log_files(paths):
+        parser = parse_actions_archive if path.endswith('.zip') else parse_jenkins_log
+        try:
+            if cache is not None:
+                runs.extend(cache.load(path, parser, from_path=True))
+            else:
+                runs.extend(parser(path))
+        except (OSError, ValueError, zipfile.BadZipFile) as exc:
+            print('warning: not reading CI log %s: %s' % (path, exc), file=sys.stderr)
+    return runs
+
+
+def format_duration(seconds):
+    """850 ms, 42.1 s, 3 m 05 s, 1 h 02 m"""
+    if seconds is None:
+        return '-'
+    if seconds < 1:
+        return '%d ms' % round(seconds * 1000)
+    if seconds < 60:
+        return '%.1f s' % seconds
+    seconds = round(seconds)
+    if seconds < 3600:
+        return '%d m %02d s' % divmod(seconds, 60)
+    return '%d h %02d m' % (seconds // 3600, seconds % 3600 // 60)
+
+
+def _week(epoch):
+    year, week, _ = datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).isocalendar()
+    return '%d-W%02d' % (year, week)
+
+
+def _order(pipeline):
+    return PIPELINES.index(pipeline) if pipeline in PIPELINES else len(PIPELINES)
+
+
+def performance_rows(runs, weeks=TREND_WEEKS):
+    """(stage rows, trend rows) for the pipeline performance section
+
+    Stage rows are (pipeline, stage or job, runs, p50, p95, p99), in
+    pipeline order and then in the order stages first ran. Trend rows are
+    (ISO week, pipeline, runs, failed, p50, p95) of whole-run durations for
+    the last `weeks` weeks with runs.
+    """
+    runs = sorted(runs, key=lambda run: (_order(run['pipeline']), run['start'] is None, run['start'] or 0))
+    stages = {}
+    trend = {}
+    for run in runs:
+        for name, seconds in run['parts']:
+            key = (run['pipeline'], name)
+            if key not in stages:
+                stages[key] = QuantileSketch()
+            stages[key].add(seconds)
+        if run['start'] is None or run['duration'] is None:
+            continue
+        key = (_week(run['start']), run['pipeline'])
+        if key not in trend:
+            trend[key] = [QuantileSketch(), 0]
+        trend[key][0].add(run['duration'])
+        trend[key][1] += run['result'] not in ('', 'SUCCESS')
+
+    stage_rows = [(pipeline, name, str(len(sketch)))
+                  + tuple(format_duration(sketch.quantile(q)) for q in PERCENTILES)
+                  for (pipeline, name), sketch in stages.items()]
+    recent = sorted({week for week, _ in trend})[-weeks:] if weeks else []
+    trend_rows = [(week, pipeline, str(len(sketch)), str(failed),
+                   format_duration(sketch.quantile(0.5)), format_duration(sketch.quantile(0.95)))
+                  for (week, pipeline), (sketch, failed)
+                  in sorted(trend.items(), key=lambda item: (item[0][0], _order(item[0][1])))
+                  if week in recent]
+    return stage_rows, trend_rows
+
+
+def pipeline_performance(paths, cache=None):
+    """Section data for the logs under `paths`: `perf_stage_rows` and `perf_trend_rows`"""
+    stage_rows, trend_rows = performance_rows(collect_runs(paths, cache))
+    return {'perf_stage_rows': stage_rows, 'perf_trend_rows': trend_rows}
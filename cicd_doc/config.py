@@ -0,0 +1,62 @@
+"""Build configuration shared by the library API, the CLI and batch mode"""
+
+from .sections import DEFAULT_CACHE_DIR
+
+
+class BuildConfig:
+    """What to build: data overrides plus where sources and caches live
+
+    `data` replaces section data by key (e.g. `backend_env_rows`).
+    `source_root` is the checkout to ingest manifests from (None for the
+    generator's own checkout); `cache_dir=None` disables both caches.
+    `estimate_pages=False` leaves the table of contents page numbers to Word.
+    `update=True` patches an existing output file, rewriting only the
+    package parts that changed (not with `stream`). `deterministic=True`
+    makes the output byte-identical for identical inputs and writes its
+    SHA-256 next to it; `compresslevel` (0-9) is the deflate level.
+    `redact=False` leaves secrets (see `redact`) in the output.
+    `ci_logs` are Jenkins console logs and GitHub Actions log archives
+    (files or directories) to measure for the pipeline performance section.
+    `load_tests` are k6 or autocannon result files (or directories) for the
+    backend latency section, compared against the `latency_baseline` JSON
+    file when one is given. `docker_images` are `docker save` archives (or
+    directories of them) whose layers the Docker images section measures.
+    """
+
+    fields = ('data', 'source_root', 'ingest', 'cache_dir', 'stream', 'estimate_pages', 'update',
+              'deterministic', 'compresslevel', 'redact', 'ci_logs', 'load_tests', 'latency_baseline', 'docker_images')
+
+    def __init__(self, data=None, source_root=None, ingest=True, cache_dir=DEFAULT_CACHE_DIR,
+                 stream=False, estimate_pages=True, update=False, deterministic=False, compresslevel=None,
+                 redact=True, ci_logs=(), load_tests=(), latency_baseline=None,
+                 docker_images=()):
+        self.data = data or {}
+        self.source_root = source_root
+        self.ingest = ingest
+        self.cache_dir = cache_dir
+        self.stream = stream
+        self.estimate_pages = estimate_pages
+        self.update = update
+        self.deterministic = deterministic
+        self.compresslevel = compresslevel
+        self.redact = redact
+        self.ci_logs = tuple(ci_logs)
+        self.load_tests = tuple(load_tests)
+        self.latency_baseline = latency_baseline
+        self.docker_images = tuple(docker_images)
+
+    def __repr__(self):
+        return 'BuildConfig(%s)' % ', '.join('%s=%r' % (name, getattr(self, name)) for name in self.fields)
+
+    @classmethod
+    def from_dict(cls, values):
+        unknown = sorted(set(values) - set(cls.fields))
+        if unknown:
+            raise ValueError('unknown build options: %s' % ', '.join(unknown))
+        return cls(**values)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.fields}
+
+    def replace(self, **changes):
+        return self.from_dict(dict(self.to_dict(), **changes))
@@ -0,0 +1,175 @@
+"""ASCII diagrams: loaded from `cicd_doc/diagrams/*.txt`, rendered once
+
+A diagram is a single centered Courier New run. Its paragraph XML is built
+once per (text, font, size) and cached by content hash; every use deep
+copies the cached element, so a diagram shared by several sections or
+variants costs one parse per process.
+
+`diagram_png` rasterizes a diagram with a built-in 5x7 bitmap font and a
+small PNG encoder (no imaging library needed), caching the file on disk
+under the same content hash in `png_cache_dir`.
+"""
+
+import copy
+import functools
+import hashlib
+import os
+import struct
+import zlib
+
+from .sections import DEFAULT_CACHE_DIR
+
+DIAGRAM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'diagrams')
+
+FONT_NAME = 'Courier New'
+FONT_SIZE = 8
+
+# Glyph cell in pixels, before scaling: 5x7 glyph, 1px column gap, 2px line gap
+CELL_WIDTH = 6
+CELL_HEIGHT = 9
+PNG_SCALE = 2
+# Widest picture the default page margins fit, in EMU (6.5")
+MAX_PICTURE_WIDTH = 5943600
+
+# Where rasterized diagrams are kept; builds point this at their cache directory
+png_cache_dir = DEFAULT_CACHE_DIR
+
+# Printable ASCII from ' ' to '~', 7 rows per glyph, one base-32 digit per 5-pixel row
+_FONT = (
+    '00000004444404AAA0000AAVAVAA4FKE5U4OP248J3CIK8LID448000024888428422248'
+    '04LEL40044V4400000C48000V00000000CC01248G0EHJLPHE4C4444EEH1248VV2421HE'
+    '26AIV22VGU11HE68GUHHEV124888EHHEHHEEHHF12C0CC0CC00CC0C48248G84200V0V00'
+    '8421248EH12404EH1DLLEEHHVHHHUHHUHHUEHGGGHESIHHHISVGGUGGVVGGUGGGEHGNHHF'
+    'HHHVHHHE44444E72222ICHIKOKIHGGGGGGVHRLLHHHHHPLJHHEHHHHHEUHHUGGGEHHHLID'
+    'UHHUKIHFGGE11UV444444HHHHHHEHHHHHA4HHHLLLAHHA4AHHHHHA444V1248GVE88888E'
+    '0G84210E22222E4AH0000000000V842000000E1FHFGGMPHHU00EGGHE11DJHHF00EHVGE'
+    '698S8880FHHF1EGGMPHHH40C444E20622ICGGIKOKIC44444E00QLLHH00MPHHH00EHHHE'
+    '00UHUGG00DJF1100MPGGG00EGE1U88S889600HHHJD00HHHA400HHLLA00HA4AH00HHF1E'
+    '00V248V244844244444448442448008L200'
+)
+
+
+def load_diagram(name):
+    """Text of `cicd_doc/diagrams/<name>.txt`, exactly as stored"""
+    with open(os.path.join(DIAGRAM_DIR, name + '.txt'), encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def diagram_key(text, *params):
+    digest = hashlib.sha256(text.encode('utf-8'))
+    for param in params:
+        digest.update(b'\0' + str(param).encode())
+    return digest.hexdigest()
+
+
+_templates = {}
+
+
+def paragraph_template(text, font=FONT_NAME, size=FONT_SIZE):
+    """Parsed `w:p` for a diagram; shared, so callers must copy it"""
+    key = diagram_key(text, font, size)
+    template = _templates.get(key)
+    if template is None:
+        from xml.sax.saxutils import quoteattr
+
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import nsdecls
+
+        from .tables import run_content_xml
+
+        template = _templates[key] = parse_xml(
+            '<w:p %s><w:pPr><w:jc w:val="center"/></w:pPr><w:r><w:rPr>'
+            '<w:rFonts w:ascii=%s w:hAnsi=%s/><w:sz w:val="%d"/></w:rPr>%s</w:r></w:p>'
+            % (nsdecls('w'), quoteattr(font), quoteattr(font), round(size * 2), run_content_xml(text))
+        )
+    return template
+
+
+def add_diagram(doc, text, font=FONT_NAME, size=FONT_SIZE):
+    """Add a centered diagram paragraph; the XML is the same as setting the run's font by hand"""
+    paragraph = doc.add_paragraph()
+    paragraph._p.extend(copy.deepcopy(child) for child in paragraph_template(text, font, size))
+    return paragraph
+
+
+@functools.lru_cache(maxsize=None)
+def _glyph_rows(char, scale):
+    """Pixel rows of one character cell, each an int `CELL_WIDTH * scale` bits wide"""
+    code = ord(char) - 32
+    if not 0 <= code < len(_FONT) // 7:
+        code = ord('?') - 32
+    rows = []
+    for digit in _FONT[code * 7:code * 7 + 7] + '00':
+        bits = int(digit, 32) << 1
+        row = 0
+        for i in range(CELL_WIDTH - 1, -1, -1):
+            pixel = (bits >> i) & 1
+            row = (row << scale) | (((1 << scale) - 1) if pixel else 0)
+        rows.extend([row] * scale)
+    return tuple(rows)
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def rasterize(text, scale=PNG_SCALE):
+    """Render `text` as a 1-bit black-on-white PNG"""
+    lines = text.expandtabs().split('\n')
+    columns = max(len(line) for line in lines) or 1
+    width = columns * CELL_WIDTH * scale
+    row_bytes = (width + 7) // 8
+    pad = row_bytes * 8 - width
+    # Bit 1 is white in a 1-bit grayscale PNG, so ink is inverted at the end
+    invert = (1 << (row_bytes * 8)) - 1
+
+    raw = bytearray()
+    for line in lines:
+        line = line.ljust(columns)
+        glyphs = [_glyph_rows(char, scale) for char in line]
+        for y in range(CELL_HEIGHT * scale):
+            row = 0
+            for rows in glyphs:
+                row = (row << (CELL_WIDTH * scale)) | rows[y]
+            raw.append(0)
+            raw += ((row << pad) ^ invert).to_bytes(row_bytes, 'big')
+
+    height = len(lines) * CELL_HEIGHT * scale
+    header = struct.pack('>IIBBBBB', width, height, 1, 0, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(bytes(raw), 9)) + _png_chunk(b'IEND', b''))
+
+
+def diagram_png(text, scale=PNG_SCALE, cache_dir=None):
+    """PNG bytes for `text`, read from `<png_cache_dir>/diagrams/` when already rasterized"""
+    cache_dir = cache_dir or png_cache_dir
+    if cache_dir is None:
+        return rasterize(text, scale)
+    path = os.path.join(cache_dir, 'diagrams', '%s.png' % diagram_key(text, scale)[:32])
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    png = rasterize(text, scale)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(png)
+    os.replace(tmp, path)
+    return png
+
+
+def add_diagram_picture(doc, text, scale=PNG_SCALE):
+    """Add a diagram as a centered picture, scaled down to the page width if needed"""
+    import io
+
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Emu
+
+    png = diagram_png(text, scale)
+    width = struct.unpack('>I', png[16:20])[0] * 914400 // 72
+    paragraph = doc.add_paragraph()
+    paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    paragraph.add_run().add_picture(io.BytesIO(png), width=Emu(min(width, MAX_PICTURE_WIDTH)))
+    return paragraph
@@ -0,0 +1,365 @@
+"""Docker image layer sizes read from `docker save` archives
+
+A `docker save` archive is a tar holding `manifest.json`, each image's
+config JSON and one tar per layer: `<id>/layer.tar` in the classic layout
+and `blobs/sha256/<digest>` in the OCI layout Docker 25 writes. Nothing is
+extracted. The archive is memory-mapped and the outer tar and every layer
+tar are walked header by header, so only the 512-byte member headers are
+read and file contents are never paged in. A gzipped layer has to be
+decompressed as it is streamed instead.
+
+A layer's summary (its size, file count and largest files) is kept in
+memory and under `<cache_dir>/layers/`, keyed by the layer's digest, so a
+layer several images share, such as the base image's, is read once.
+
+A Dockerfile parsed by `ingest.parse_dockerfile` tells which layers come
+from the base image: every instruction the final stage builds on top of
+it adds one entry to the image's history, so the entries before those are
+the base's.
+"""
+
+import gzip
+import heapq
+import io
+import json
+import mmap
+import os
+import sys
+import tarfile
+
+from .filecache import parser_key
+
+# Largest files kept per layer, and listed per image
+TOP_FILES = 10
+# Characters of a layer's `created_by` command shown
+COMMAND_WIDTH = 70
+
+ARCHIVE_SUFFIXES = ('.tar',)
+
+_BLOCK = 512
+_REGULAR = (b'0', b'\0', b'7')
+_USTAR = b'ustar\x0000'
+_GZIP = b'\x1f\x8b'
+
+# digest -> layer summary, for the life of the process
+_layers = {}
+
+
+class DockerImageError(ValueError):
+    pass
+
+
+def _number(field):
+    """Numeric header field: octal text, or base-256 for values past 8 GiB"""
+    if field[0] & 0x80:
+        return int.from_bytes(field[1:], 'big')
+    field = field.split(b'\0', 1)[0].strip()
+    return int(field, 8) if field else 0
+
+
+def _pax(data):
+    records = {}
+    pos = 0
+    while pos < len(data):
+        space = data.find(b' ', pos)
+        if space < 0:
+            break
+        length = int(data[pos:space])
+        if length <= 0:
+            break
+        key, _, value = data[space + 1:pos + length - 1].partition(b'=')
+        records[key] = value
+        pos += length
+    return records
+
+
+def _text(name):
+    return name.decode('utf-8', 'replace')
+
+
+def tar_members(buf, start=0, end=None):
+    """(name, type, data offset, size, link target) of each member of the tar in `buf[start:end]`
+
+    Only the headers are read. pax and GNU long-name records are folded
+    into the member they describe.
+    """
+    end = len(buf) if end is None else end
+    pos = start
+    name = link = size = None
+    while pos + _BLOCK <= end:
+        header = buf[pos:pos + _BLOCK]
+        if not header[0]:
+            # Zero blocks end the archive
+            break
+        kind = header[156:157]
+        length = _number(header[124:136])
+        data = pos + _BLOCK
+        pos = data + (length + _BLOCK - 1) // _BLOCK * _BLOCK
+        if kind == b'x':
+            records = _pax(buf[data:data + length])
+            name = _text(records[b'path']) if b'path' in records else name
+            link = _text(records[b'linkpath']) if b'linkpath' in records else link
+            size = int(records[b'size']) if b'size' in records else size
+            continue
+        if kind == b'L':
+            name = _text(buf[data:data + length].rstrip(b'\0'))
+            continue
+        if kind == b'K':
+            link = _text(buf[data:data + length].rstrip(b'\0'))
+            continue
+        if kind == b'g':
+            continue
+        if name is None:
+            name = _text(header[:100].split(b'\0', 1)[0])
+            if header[257:265] == _USTAR and header[345]:
+                name = _text(header[345:500].split(b'\0', 1)[0]) + '/' + name
+        if link is None:
+            link = _text(header[157:257].split(b'\0', 1)[0])
+        yield name, kind, data, length if size is None else size, link
+        name = link = size = None
+
+
+class _Span(io.RawIOBase):
+    """Read-only file over `buf[start:end]`, for streaming a compressed member without copying it"""
+
+    def __init__(self, buf, start, end):
+        self.buf = buf
+        self.pos = start
+        self.end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        count = min(len(target), self.end - self.pos)
+        target[:count] = self.buf[self.pos:self.pos + count]
+        self.pos += count
+        return count
+
+
+def _gzip_members(buf, start, end):
+    with tarfile.open(fileobj=gzip.GzipFile(fileobj=io.BufferedReader(_Span(buf, start, end), 1 << 20)),
+                      mode='r|') as layer:
+        for info in layer:
+            yield info.name, info.type, None, info.size, info.linkname
+
+
+def summarize_layer(members):
+    """Size, file count, whiteouts and largest files of one layer's members"""
+    size = files = removed = 0
+    largest = []
+    for name, kind, _, length, _ in members:
+        if name.rpartition('/')[2].startswith('.wh.'):
+            removed += 1
+            continue
+        if kind not in _REGULAR:
+            continue
+        files += 1
+        size += length
+        if len(largest) < TOP_FILES:
+            heapq.heappush(largest, (length, name))
+        elif length > largest[0][0]:
+            heapq.heapreplace(largest, (length, name))
+    return {'size': size, 'files': files, 'removed': removed,
+            'largest': [[path[2:] if path.startswith('./') else path, length]
+                        for length, path in sorted(largest, reverse=True)]}
+
+
+def _cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, 'layers', digest.replace(':', '-') + '.json')
+
+
+def _layer(buf, start, end, digest, cache_dir):
+    """Summary of the layer tar in `buf[start:end]`, from the caches when its digest was seen"""
+    version = parser_key(summarize_layer)[1]
+    if digest is not None:
+        if digest in _layers:
+            return _layers[digest]
+        if cache_dir is not None:
+            try:
+                with open(_cache_path(cache_dir, digest), encoding='utf-8') as f:
+                    entry = json.load(f)
+                if entry['version'] == version:
+                    _layers[digest] = entry['summary']
+                    return entry['summary']
+            except (OSError, ValueError, KeyError):
+                pass
+    if buf[start:start + 2] == _GZIP:
+        summary = summarize_layer(_gzip_members(buf, start, end))
+    else:
+        summary = summarize_layer(tar_members(buf, start, end))
+    if digest is not None:
+        _layers[digest] = summary
+        if cache_dir is not None:
+            path = _cache_path(cache_dir, digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = '%s.%d.tmp' % (path, os.getpid())
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': version, 'summary': summary}, f)
+            os.replace(tmp, path)
+    return summary
+
+
+def _created_by(entry):
+    """'/bin/sh -c #(nop)  EXPOSE 5000' -> 'EXPOSE 5000'; 'RUN /bin/sh -c npm install # buildkit' -> 'RUN npm install'"""
+    command = ' '.join(entry.get('created_by', '').split())
+    command = command.replace('/bin/sh -c #(nop) ', '').replace('/bin/sh -c ', '')
+    if command.endswith(' # buildkit'):
+        command = command[:-len(' # buildkit')]
+    if len(command) > COMMAND_WIDTH:
+        command = command[:COMMAND_WIDTH - 3] + '...'
+    return command
+
+
+def _base_layers(config, dockerfile):
+    """How many of the image's layers come from its base image; None when that is unknown"""
+    if dockerfile is None:
+        return None
+    history = config.get('history') or []
+    own = dockerfile['stages'][-1]['image_steps']
+    if own > len(history):
+        return None
+    return sum(not entry.get('empty_layer') for entry in history[:len(history) - own])
+
+
+def read_archive(path, dockerfiles=None, cache_dir=None):
+    """[image record] for one `docker save` archive
+
+    `dockerfiles` maps a service name to its parsed Dockerfile; an image
+    whose repository name contains the service name is matched to it.
+    """
+    dockerfiles = dockerfiles or {}
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise DockerImageError('empty archive')
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if buf[:2] == _GZIP:
+            raise DockerImageError('compressed archive; docker save writes a plain tar')
+        members = {}
+        for name, kind, data, length, link in tar_members(buf):
+            name = os.path.normpath(name)
+            if kind in _REGULAR:
+                members[name] = (data, length)
+            elif kind in (b'1', b'2') and link:
+                # Layers shared within the archive are written once and linked
+                target = link if kind == b'1' else os.path.join(os.path.dirname(name), link)
+                members[name] = os.path.normpath(target)
+
+        def member(name):
+            found = members.get(os.path.normpath(name))
+            for _ in range(8):
+                if not isinstance(found, str):
+                    break
+                found = members.get(found)
+            if found is None:
+                raise DockerImageError('%s not in the archive' % name)
+            return found
+
+        def read_json(name):
+            data, length = member(name)
+            return json.loads(buf[data:data + length])
+
+        if 'manifest.json' not in members:
+            raise DockerImageError('no manifest.json: not a docker save archive')
+        images = []
+        for entry in read_json('manifest.json'):
+            config = read_json(entry['Config'])
+            tags = entry.get('RepoTags') or []
+            repository = tags[0].rsplit(':', 1)[0] if tags else ''
+            service = next((name for name in sorted(dockerfiles) if name in repository.rsplit('/', 1)[-1]), None)
+            dockerfile = dockerfiles.get(service)
+            diff_ids = (config.get('rootfs') or {}).get('diff_ids') or []
+            steps = [_created_by(step) for step in config.get('history') or [] if not step.get('empty_layer')]
+            layers = []
+            for i, name in enumerate(entry['Layers']):
+                if i < len(diff_ids):
+                    digest = diff_ids[i]
+                elif '/blobs/sha256/' in '/' + name:
+                    digest = 'sha256:' + name.rsplit('/', 1)[1]
+                else:
+                    digest = None
+                data, length = member(name)
+                layer = dict(_layer(buf, data, data + length, digest, cache_dir))
+                layer.update(digest=digest, archived=length, created_by=steps[i] if i < len(steps) else '')
+                layers.append(layer)
+            base = dockerfile['stages'][-1]['base'] if dockerfile else ''
+            labels = (config.get('config') or {}).get('Labels') or {}
+            images.append({
+                'name': tags[0] if tags else entry['Config'].rsplit('/', 1)[-1].split('.')[0][:12],
+                'service': service,
+                'base': base or labels.get('org.opencontainers.image.base.name', ''),
+                'base_layers': _base_layers(config, dockerfile),
+                'layers': layers,
+            })
+        return images
+    finally:
+        buf.close()
+
+
+def archive_files(paths):
+    """Archives under `paths` (files or directories), sorted within each directory"""
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for directory, subdirs, names in os.walk(path):
+            subdirs[:] = sorted(name for name in subdirs if not name.startswith('.'))
+            found.extend(os.path.join(directory, name) for name in sorted(names) if name.endswith(ARCHIVE_SUFFIXES))
+    return found
+
+
+def collect(paths, dockerfiles=None, cache_dir=None):
+    images = []
+    for path in archive_files(paths):
+        try:
+            images.extend(read_archive(path, dockerfiles, cache_dir))
+        except (OSError, ValueError, KeyError, TypeError, EOFError, tarfile.TarError) as exc:
+            print('warning: not reading image archive %s: %s' % (path, exc), file=sys.stderr)
+    return images
+
+
+def format_size(size):
+    """Decimal units, as `docker images` shows them"""
+    if size < 1000:
+        return '%d B' % size
+    for unit in ('kB', 'MB', 'GB'):
+        size /= 1000
+        if size < 1000 or unit == 'GB':
+            return '%.1f %s' % (size, unit)
+
+
+def image_rows(images):
+    """(image rows, layer rows, largest file rows)
+
+    Image rows are (image, base image, layers, size, from the base, added).
+    Layer rows are (image, layer, origin, created by, size, files). File rows
+    are (image, path, size, layer) for the image's largest files; a file
+    replaced or deleted in a later layer still ships in its own, so it is
+    listed once per layer holding it.
+    """
+    summary, layer_rows, file_rows = [], [], []
+    for image in images:
+        layers = image['layers']
+        total = sum(layer['size'] for layer in layers)
+        count = image['base_layers']
+        base_size = sum(layer['size'] for layer in layers[:count]) if count is not None else None
+        summary.append((image['name'], image['base'] or '-', str(len(layers)), format_size(total),
+                        '-' if base_size is None else format_size(base_size),
+                        '-' if base_size is None else format_size(total - base_size)))
+        for i, layer in enumerate(layers):
+            origin = '-' if count is None else 'Base image' if i < count else 'Dockerfile'
+            layer_rows.append((image['name'], str(i + 1), origin, layer['created_by'] or '-',
+                               format_size(layer['size']), str(layer['files'])))
+        largest = heapq.nlargest(TOP_FILES, ((length, path, i) for i, layer in enumerate(layers)
+                                             for path, length in layer['largest']))
+        file_rows.extend((image['name'], '/' + path.lstrip('/'), format_size(length), str(i + 1))
+                         for length, path, i in largest)
+    return summary, layer_rows, file_rows
+
+
+def image_data(paths, dockerfiles=None, cache_dir=None):
+    """Section data for the archives under `paths`: `image_rows`, `image_layer_rows` and `image_file_rows`"""
+    rows, layer_rows, file_rows = image_rows(collect(paths, dockerfiles, cache_dir))
+    return {'image_rows': rows, 'image_layer_rows': layer_rows, 'image_file_rows': file_rows}
@@ -0,0 +1,145 @@
+"""python-docx backend for the document model
+
+Emits exactly the XML the section builders used to produce by calling
+python-docx directly, so cached fragments and the reference output are
+unaffected by the model in between.
+"""
+
+import os
+
+from . import diagrams
+from .model import CENTER, Diagram, Heading, PageBreak, Paragraph, Picture, Table, TableOfContents
+from .trace import traced
+
+_EMU_PER_PX = 9525
+
+
+@traced('table')
+def write_table(doc, headers, rows):
+    from .tables import build_table
+
+    return build_table(doc, headers, rows)
+
+
+@traced('diagram')
+def write_diagram(doc, text, diagram_format='text'):
+    if diagram_format == 'png':
+        return diagrams.add_diagram_picture(doc, text)
+    return diagrams.add_diagram(doc, text)
+
+
+@traced('picture')
+def write_picture(doc, path, caption=None):
+    """Add a centered picture at 96 dpi, no wider than the page, and its caption"""
+    import io
+
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Emu
+
+    from .images import prepared
+
+    image = prepared(path)
+    paragraph = doc.add_paragraph()
+    paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    width = min(image.width * _EMU_PER_PX, diagrams.MAX_PICTURE_WIDTH)
+    paragraph.add_run().add_picture(io.BytesIO(image.blob), width=Emu(width))
+    if caption:
+        doc.add_paragraph(caption, style='Caption')
+    return paragraph
+
+
+def _format(paragraph, block):
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt
+
+    for run, source in zip(paragraph.runs, block.runs):
+        if source.bold is not None:
+            run.bold = source.bold
+        if source.italic is not None:
+            run.italic = source.italic
+        if source.size is not None:
+            run.font.size = Pt(source.size)
+    if block.alignment == CENTER:
+        paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+
+def _write_paragraph(doc, block):
+    if isinstance(block, Heading):
+        paragraph = doc.add_heading('', block.level)
+    else:
+        paragraph = doc.add_paragraph(style=block.style)
+    for run in block.runs:
+        paragraph.add_run(run.text)
+    _format(paragraph, block)
+    return paragraph
+
+
+def write_block(doc, block):
+    """Add one model block to a python-docx (or streaming) document"""
+    if isinstance(block, Paragraph):
+        return _write_paragraph(doc, block)
+    if isinstance(block, Table):
+        return write_table(doc, block.headers, block.rows)
+    if isinstance(block, Diagram):
+        return write_diagram(doc, block.text, block.diagram_format)
+    if isinstance(block, Picture):
+        return write_picture(doc, block.path, block.caption)
+    if isinstance(block, PageBreak):
+        return doc.add_page_break()
+    if isinstance(block, TableOfContents):
+        from .toc import add_toc
+
+        doc.add_paragraph(block.title, style='TOC Heading')
+        return add_toc(doc, block.levels)
+    raise TypeError('cannot write %r to a .docx' % (block,))
+
+
+def write_blocks(doc, blocks):
+    pictures = [block.path for block in blocks if isinstance(block, Picture)]
+    if pictures:
+        from .images import prepare_images
+
+        # Decoded and resized together, in parallel, before any is embedded
+        prepare_images(pictures)
+    for block in blocks:
+        write_block(doc, block)
+
+
+def new_document(target, config):
+    """An empty document for `config` and the zip timestamp to save it with
+
+    Streamed straight to `target` when `config.stream` is set; core
+    properties are pinned when `config.deterministic` is.
+    """
+    from docx import Document
+
+    from .streaming import StreamingDocument
+
+    date_time = when = None
+    if config.deterministic:
+        from . import reproducible
+
+        when = reproducible.source_date()
+        date_time = reproducible.zip_date_time(when)
+    if config.stream:
+        doc = StreamingDocument(target, compresslevel=config.compresslevel, date_time=date_time)
+    else:
+        doc = Document()
+    if config.deterministic:
+        reproducible.pin_core_properties(doc, when)
+    return doc, date_time
+
+
+def save_document(doc, target, config, date_time=None):
+    """Save a document from `new_document`; returns the PatchResult when `config.update` patched `target`"""
+    if config.update and not config.stream and isinstance(target, (str, os.PathLike)):
+        from .patch import patch_docx
+
+        return patch_docx(doc, target, config.compresslevel, date_time)
+    if not config.stream and (date_time is not None or config.compresslevel is not None):
+        from .patch import write_package
+
+        write_package(doc, target, config.compresslevel, date_time)
+    else:
+        doc.save(target)
+    return None
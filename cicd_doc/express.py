@@ -0,0 +1,342 @@
+"""Express routes and Mongoose schemas read from the backend's JavaScript
+
+`scan_source` tokenizes one file (strings, template literals, comments and
+regex literals are skipped over correctly) and picks out:
+
+    <router>.<method>('<path>', middleware..., handler)
+    <router>.use('<prefix>', <router or require('./file')>)
+    const <name> = new mongoose.Schema({...})
+    mongoose.model('<Model>', <schema>)
+
+The result is JSON-compatible, so `scan_tree` reads every file through
+`ParseCache`: on a large codebase only the files whose contents changed
+are tokenized again.
+"""
+
+import bisect
+import os
+import re
+
+ROUTE_METHODS = ('get', 'post', 'put', 'patch', 'delete', 'all')
+UPLOAD_METHODS = ('single', 'array', 'fields', 'any', 'none')
+SKIP_DIRS = ('node_modules', 'uploads', 'dist', 'build', 'coverage')
+SOURCE_SUFFIXES = ('.js', '.cjs', '.mjs')
+
+_TOKEN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*")
+  | (?P<template>`(?:\\.|[^`\\])*`)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<number>\.?\d[\w.]*)
+  | (?P<punct>=>|\.\.\.|\?\.|[{}()\[\];,.:?=<>!+\-*%&|^~/@#])
+''', re.S | re.X)
+
+_REGEX = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*')
+
+# A '/' after one of these starts a regex literal rather than a division
+_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^') | {'=>', 'return', 'typeof', 'case', None}
+
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0'}
+
+
+class Token:
+    __slots__ = ('kind', 'value', 'pos')
+
+    def __init__(self, kind, value, pos):
+        self.kind = kind
+        self.value = value
+        self.pos = pos
+
+    def __repr__(self):
+        return 'Token(%s, %r)' % (self.kind, self.value)
+
+
+def _unquote(literal):
+    return re.sub(r'\\(.)', lambda match: _ESCAPES.get(match.group(1), match.group(1)), literal[1:-1])
+
+
+def tokenize(text):
+    """Significant tokens of a JavaScript source; strings come back unquoted"""
+    tokens = []
+    previous = None
+    pos = 0
+    end = len(text)
+    while pos < end:
+        if text[pos] == '/' and previous in _REGEX_AFTER:
+            match = _REGEX.match(text, pos)
+            if match:
+                tokens.append(Token('regex', match.group(), pos))
+                previous = 'regex'
+                pos = match.end()
+                continue
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            # Unknown character (e.g. non-ASCII identifier): skip it
+            pos += 1
+            continue
+        kind = match.lastgroup
+        value = match.group()
+        if kind == 'string' or kind == 'template':
+            tokens.append(Token('string', _unquote(value), pos))
+            previous = 'string'
+        elif kind == 'name' or kind == 'number' or kind == 'punct':
+            tokens.append(Token(kind, value, pos))
+            previous = value if kind != 'number' else 'number'
+        pos = match.end()
+    return tokens
+
+
+_OPEN = {'(': ')', '[': ']', '{': '}'}
+_CLOSE = set(_OPEN.values())
+
+
+def _closing(tokens, start):
+    """Index of the bracket closing the one at `start`"""
+    depth = 0
+    for i in range(start, len(tokens)):
+        token = tokens[i]
+        if token.kind != 'punct':
+            continue
+        if token.value in _OPEN:
+            depth += 1
+        elif token.value in _CLOSE:
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(tokens) - 1
+
+
+def _split(tokens, start, end, separator=','):
+    """Top-level comma-separated parts of tokens[start:end]"""
+    parts = []
+    depth = 0
+    first = start
+    for i in range(start, end):
+        token = tokens[i]
+        if token.kind == 'punct':
+            if token.value in _OPEN:
+                depth += 1
+            elif token.value in _CLOSE:
+                depth -= 1
+            elif token.value == separator and depth == 0:
+                parts.append(tokens[first:i])
+                first = i + 1
+    if first < end:
+        parts.append(tokens[first:end])
+    return [part for part in parts if part]
+
+
+def _arguments(tokens, open_paren):
+    close = _closing(tokens, open_paren)
+    return _split(tokens, open_paren + 1, close), close
+
+
+def _is(tokens, i, *values):
+    return all(i + n < len(tokens) and tokens[i + n].value == value and tokens[i + n].kind != 'string'
+               for n, value in enumerate(values))
+
+
+def _source(part):
+    return ''.join(token.value if token.kind != 'string' else repr(token.value) for token in part)
+
+
+def _dotted(part):
+    """'mongoose.Schema.Types.ObjectId' for a plain dotted name, else None"""
+    if len(part) % 2 == 0 or any(token.kind != 'name' for token in part[::2]) \
+            or any(token.value != '.' for token in part[1::2]):
+        return None
+    return ''.join(token.value for token in part)
+
+
+def _type_name(part):
+    dotted = _dotted(part)
+    if dotted is not None:
+        return dotted.rsplit('.', 1)[-1]
+    if part[0].value == '[':
+        inner = _split(part, 1, len(part) - 1)
+        return '[%s]' % (_type_name(inner[0]) if inner else '')
+    if part[0].value == '{':
+        return 'Object'
+    return _source(part)
+
+
+def _object_entries(part):
+    """(key, value tokens) of an object literal"""
+    entries = []
+    for entry in _split(part, 1, len(part) - 1):
+        if len(entry) >= 3 and entry[1].value == ':' and entry[0].kind in ('name', 'string', 'number'):
+            entries.append((entry[0].value, entry[2:]))
+    return entries
+
+
+def _schema_field(name, value):
+    field = {'name': name, 'type': _type_name(value)}
+    if value[0].value != '{':
+        return field
+    options = dict(_object_entries(value))
+    if 'type' not in options:
+        field['fields'] = sorted(options)
+        return field
+    field['type'] = _type_name(options['type'])
+    for flag in ('required', 'unique'):
+        if flag in options and _source(options[flag]) == 'true':
+            field[flag] = True
+    if 'ref' in options and options['ref'][0].kind == 'string':
+        field['ref'] = options['ref'][0].value
+    if 'enum' in options and options['enum'][0].value == '[':
+        field['enum'] = [token.value for token in options['enum'] if token.kind == 'string']
+    return field
+
+
+def pluralize(model):
+    """Collection name mongoose derives from a model name"""
+    name = model.lower()
+    if name.endswith('y') and name[-2:-1] not in ('a', 'e', 'i', 'o', 'u'):
+        return name[:-1] + 'ies'
+    if name.endswith(('s', 'x', 'z', 'ch', 'sh')):
+        return name + 'es'
+    return name + 's'
+
+
+def scan_source(text):
+    """Routes, router mounts, schemas and models defined in one source file"""
+    tokens = tokenize(text)
+    lines = [match.start() for match in re.finditer('\n', text)]
+    routers = {'app', 'router'}
+    uploaders = set()
+    requires = {}
+    routes, mounts, models = [], [], []
+    schemas = {}
+
+    for i, token in enumerate(tokens):
+        if token.kind != 'name':
+            continue
+        # const name = express() / express.Router() / Router() / multer(...) / require('./x')
+        if _is(tokens, i + 1, '=') and i + 2 < len(tokens):
+            target = tokens[i + 2:i + 7]
+            values = [t.value for t in target]
+            if values[:2] == ['express', '('] or values[:3] == ['express', '.', 'Router'] \
+                    or values[:2] == ['Router', '(']:
+                routers.add(token.value)
+            elif values[:2] == ['multer', '(']:
+                uploaders.add(token.value)
+            elif values[:2] == ['require', '('] and len(target) > 2 and target[2].kind == 'string' \
+                    and target[2].value.startswith('.'):
+                requires[token.value] = target[2].value
+            elif values[:2] == ['new', 'mongoose'] or values[:2] == ['new', 'Schema']:
+                start = i + 2 + values.index('(') if '(' in values else None
+                if start is not None:
+                    args, _ = _arguments(tokens, start)
+                    if args and args[0][0].value == '{':
+                        schemas[token.value] = [_schema_field(name, value)
+                                                for name, value in _object_entries(args[0])]
+            continue
+
+        if token.value in routers and _is(tokens, i + 1, '.') and i + 3 < len(tokens) \
+                and tokens[i + 3].value == '(':
+            method = tokens[i + 2].value
+            args, _ = _arguments(tokens, i + 3)
+            if not args or args[0][0].kind != 'string' or len(args[0]) != 1:
+                continue
+            path = args[0][0].value
+            if method == 'use' and len(args) == 2:
+                target = args[1]
+                if len(target) == 1 and target[0].value in routers:
+                    mounts.append({'prefix': path, 'router': target[0].value})
+                elif len(target) == 1 and target[0].value in requires:
+                    mounts.append({'prefix': path, 'file': requires[target[0].value]})
+                elif len(target) == 4 and target[0].value == 'require' and target[2].kind == 'string':
+                    mounts.append({'prefix': path, 'file': target[2].value})
+            elif method in ROUTE_METHODS and len(args) >= 2:
+                middleware, uploads = [], []
+                for arg in args[1:-1]:
+                    if len(arg) >= 4 and arg[0].value in uploaders and arg[1].value == '.' \
+                            and arg[2].value in UPLOAD_METHODS:
+                        fields = [t.value for t in arg[3:] if t.kind == 'string']
+                        uploads.append('%s (%s)' % (', '.join(fields) or 'files', arg[2].value))
+                    else:
+                        middleware.append(_source(arg))
+                routes.append({
+                    'method': method.upper(),
+                    'path': path,
+                    'router': token.value,
+                    'middleware': middleware,
+                    'uploads': uploads,
+                    'line': bisect.bisect(lines, token.pos) + 1,
+                })
+        elif token.value == 'mongoose' and _is(tokens, i + 1, '.', 'model', '('):
+            args, _ = _arguments(tokens, i + 3)
+            if args and args[0][0].kind == 'string':
+                model = {'model': args[0][0].value,
+                         'schema': _source(args[1]) if len(args) > 1 else None}
+                if len(args) > 2 and args[2][0].kind == 'string':
+                    model['collection'] = args[2][0].value
+                models.append(model)
+
+    return {'routes': routes, 'mounts': mounts, 'schemas': schemas, 'models': models}
+
+
+def source_files(root):
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith('.'))
+        for name in sorted(files):
+            if name.endswith(SOURCE_SUFFIXES):
+                yield os.path.join(directory, name)
+
+
+def _read(path, cache):
+    if cache is not None:
+        return cache.load(path, scan_source)
+    with open(path, encoding='utf-8') as f:
+        return scan_source(f.read())
+
+
+def _resolve(base, relative):
+    path = os.path.normpath(os.path.join(os.path.dirname(base), relative))
+    return path if path.endswith(SOURCE_SUFFIXES) else path + '.js'
+
+
+def scan_tree(root, cache=None):
+    """Routes (with mount prefixes applied) and models of every source file under `root`"""
+    scanned = {path: _read(path, cache) for path in source_files(root)}
+
+    prefixes = {}
+    for path, result in scanned.items():
+        for mount in result['mounts']:
+            key = (path, mount['router']) if 'router' in mount else (_resolve(path, mount['file']), None)
+            prefixes[key] = mount['prefix'].rstrip('/')
+
+    routes = []
+    for path, result in scanned.items():
+        for route in result['routes']:
+            prefix = prefixes.get((path, route['router']), prefixes.get((path, None), ''))
+            if prefix:
+                route = dict(route, path=prefix if route['path'] == '/' else prefix + route['path'])
+            routes.append(dict(route, file=os.path.relpath(path, root)))
+
+    all_schemas = {}
+    for result in scanned.values():
+        all_schemas.update(result['schemas'])
+    models = []
+    for result in scanned.values():
+        for model in result['models']:
+            fields = result['schemas'].get(model['schema'], all_schemas.get(model['schema'], []))
+            models.append({
+                'model': model['model'],
+                'collection': model.get('collection') or pluralize(model['model']),
+                'fields': fields,
+            })
+    return {'files': len(scanned), 'routes': routes, 'models': models}
+
+
+def endpoint_rows(api):
+    return [(route['method'], route['path'], ', '.join(route['middleware']) or '-',
+             ', '.join(route['uploads'])) for route in api['routes']]
+
+
+def collection_rows(api, known_rows):
+    known = {row[0]: row[2] for row in known_rows}
+    return [(model['collection'], ', '.join(field['name'] for field in model['fields']),
+             known.get(model['collection'], '%s documents' % model['model']))
+            for model in api['models']]
@@ -0,0 +1,121 @@
+"""Per-file parse cache
+
+Parsed results are stored as JSON, keyed by the parser and the source
+path. A lookup first compares the file's mtime and size against the stored
+entry and only hashes the contents when those changed, so unchanged
+manifests are neither read nor re-parsed.
+"""
+
+import functools
+import hashlib
+import json
+import os
+
+from .sections import DEFAULT_CACHE_DIR
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _last_line(code):
+    """Last source line `code` or any function nested in it runs"""
+    last = max((line for _, _, line in code.co_lines() if line is not None), default=code.co_firstlineno)
+    for const in code.co_consts:
+        if hasattr(const, 'co_lines'):
+            last = max(last, _last_line(const))
+    return last
+
+
+@functools.lru_cache(maxsize=None)
+def parser_key(parser):
+    """Identify a parser by name and source, so editing it invalidates its entries
+
+    The source lines are found from the code object and read through
+    linecache: `inspect` (with `ast` and `dis`) would double the import
+    time of the light modes that ingest, such as --list-sections.
+    """
+    import linecache
+
+    code = getattr(parser, '__code__', None)
+    source = ''
+    if code is not None:
+        lines = linecache.getlines(code.co_filename)
+        source = ''.join(lines[code.co_firstlineno - 1:_last_line(code)])
+    name = '%s.%s' % (parser.__module__, parser.__qualname__)
+    return name, hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+class ParseCache:
+    """Cache of `parser(text)` results for source files"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = os.path.join(directory, 'parsed')
+        self._memory = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, name, path):
+        token = hashlib.sha256(('%s\0%s' % (name, os.path.abspath(path))).encode()).hexdigest()[:32]
+        return os.path.join(self.directory, token + '.json')
+
+    def _read_entry(self, entry_path):
+        try:
+            with open(entry_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_entry(self, entry_path, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = '%s.%d.tmp' % (entry_path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp, entry_path)
+
+    def load(self, path, parser, from_path=False):
+        """Return `parser(contents of path)`, re-parsing only when the file changed
+
+        With `from_path=True` the parser is given the path instead, for
+        sources too large to read into memory at once.
+        """
+        name, version = parser_key(parser)
+        stat = os.stat(path)
+        entry_path = self._entry_path(name, path)
+
+        entry = self._memory.get(entry_path) or self._read_entry(entry_path)
+        if entry is not None and entry['version'] == version:
+            if entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                self._memory[entry_path] = entry
+                self.hits += 1
+                return entry['result']
+            digest = file_digest(path)
+            if entry['sha256'] == digest:
+                entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                self._write_entry(entry_path, entry)
+                self._memory[entry_path] = entry
+                self.hits += 1
+                return entry['result']
+        else:
+            digest = file_digest(path)
+
+        if from_path:
+            result = parser(path)
+        else:
+            with open(path, encoding='utf-8') as f:
+                result = parser(f.read())
+        entry = {
+            'version': version,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest,
+            'result': result,
+        }
+        self._write_entry(entry_path, entry)
+        self._memory[entry_path] = entry
+        self.misses += 1
+        return result
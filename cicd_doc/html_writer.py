@@ -0,0 +1,134 @@
+"""Standalone HTML backend for the document model
+
+Blocks are written out one at a time as they are converted; nothing
+besides the standard library (and `diagrams` and `images` for data URIs)
+is loaded.
+"""
+
+import base64
+from html import escape
+
+from .model import (CENTER, Diagram, Heading, PageBreak, Paragraph, Picture, Table, TableOfContents,
+                    heading_anchors)
+
+# Header colors match tables.HEADER_FILL / HEADER_COLOR
+STYLESHEET = '''\
+body { font-family: Calibri, Arial, sans-serif; max-width: 60em; margin: 2em auto; line-height: 1.4; }
+.center { text-align: center; }
+table { border-collapse: collapse; margin: 0.5em 0; }
+th, td { border: 1px solid #999; padding: 0.2em 0.5em; text-align: left; vertical-align: top; }
+th { background: #2E86AB; color: #FFFFFF; }
+pre.diagram { font-family: "Courier New", monospace; font-size: 8pt; line-height: 1.1; overflow-x: auto; }
+img.diagram { display: block; margin: 0 auto; max-width: 100%; }
+figure { margin: 1em 0; text-align: center; }
+figure img { max-width: 100%; }
+figcaption { font-size: 0.9em; font-style: italic; }
+.toc-heading { font-size: 1.4em; font-weight: bold; }
+.toc ul { list-style: none; padding-left: 0; }
+.toc .toc-2 { padding-left: 1.5em; }
+.page-break { break-after: page; }
+'''
+
+
+def _runs(paragraph):
+    parts = []
+    for run in paragraph.runs:
+        text = escape(run.text).replace('\n', '<br>\n')
+        if run.bold:
+            text = '<strong>%s</strong>' % text
+        if run.italic:
+            text = '<em>%s</em>' % text
+        if run.size is not None:
+            text = '<span style="font-size: %gpt">%s</span>' % (run.size, text)
+        parts.append(text)
+    return ''.join(parts)
+
+
+def _class(paragraph, *names):
+    names = list(names)
+    if paragraph.alignment == CENTER:
+        names.append('center')
+    return ' class="%s"' % ' '.join(names) if names else ''
+
+
+def _table(table):
+    yield '<table>\n<thead><tr>%s</tr></thead>\n<tbody>\n' % ''.join(
+        '<th>%s</th>' % escape(str(header)) for header in table.headers)
+    for cells in table.cells():
+        yield '<tr>%s</tr>\n' % ''.join('<td>%s</td>' % escape(cell).replace('\n', '<br>') for cell in cells)
+    yield '</tbody>\n</table>\n'
+
+
+def _diagram(diagram):
+    if diagram.diagram_format == 'png':
+        from .diagrams import diagram_png
+
+        return '<img class="diagram" alt="%s" src="data:image/png;base64,%s">\n' % (
+            escape(diagram.text), base64.b64encode(diagram_png(diagram.text)).decode('ascii'))
+    return '<pre class="diagram">%s</pre>\n' % escape(diagram.text)
+
+
+def _picture(picture, image):
+    caption = '<figcaption>%s</figcaption>' % escape(picture.caption) if picture.caption else ''
+    return '<figure><img alt="%s" width="%d" src="data:%s;base64,%s">%s</figure>\n' % (
+        escape(picture.caption or ''), image.width, image.content_type,
+        base64.b64encode(image.blob).decode('ascii'), caption)
+
+
+def _toc(toc, model, anchors):
+    yield '<nav class="toc">\n<p class="toc-heading">%s</p>\n<ul>\n' % escape(toc.title)
+    top = min(toc.levels)
+    for heading in model.headings(toc.levels):
+        yield '<li class="toc-%d"><a href="#%s">%s</a></li>\n' % (
+            heading.level - top + 1, anchors[id(heading)], escape(heading.text))
+    yield '</ul>\n</nav>\n'
+
+
+def iter_html(model):
+    """The document as a sequence of HTML chunks"""
+    anchors = heading_anchors(model)
+    pictures = model.pictures()
+    if pictures:
+        from .images import prepare_images
+
+        images = dict(zip(map(id, pictures), prepare_images([picture.path for picture in pictures])))
+    yield ('<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+           '<title>%s</title>\n<style>\n%s</style>\n</head>\n<body>\n'
+           % (escape(model.title), STYLESHEET))
+    starts = {start: name for name, start in model.sections}
+    open_section = False
+    for index, block in enumerate(model.blocks):
+        if index in starts:
+            if open_section:
+                yield '</section>\n'
+            yield '<section id="section-%s">\n' % escape(starts[index])
+            open_section = True
+        if isinstance(block, Heading):
+            tag = 'h%d' % min(block.level + 1, 6)
+            yield '<%s id="%s"%s>%s</%s>\n' % (
+                tag, anchors[id(block)], _class(block, *(['title'] if block.level == 0 else [])),
+                _runs(block), tag)
+        elif isinstance(block, Paragraph):
+            if block.runs:
+                yield '<p%s>%s</p>\n' % (_class(block), _runs(block))
+        elif isinstance(block, Table):
+            yield from _table(block)
+        elif isinstance(block, Diagram):
+            yield _diagram(block)
+        elif isinstance(block, TableOfContents):
+            yield from _toc(block, model, anchors)
+        elif isinstance(block, Picture):
+            yield _picture(block, images[id(block)])
+        elif isinstance(block, PageBreak):
+            yield '<div class="page-break"></div>\n'
+        else:
+            raise TypeError('cannot write %r as HTML' % (block,))
+    if open_section:
+        yield '</section>\n'
+    yield '</body>\n</html>\n'
+
+
+def write_html(model, stream):
+    """Write the document to a text stream"""
+    for chunk in iter_html(model):
+        stream.write(chunk)
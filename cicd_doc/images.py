@@ -0,0 +1,215 @@
+"""Images for the document: decoded, resized and recompressed once, in parallel
+
+`prepare_images` reads each source, hashes it, and processes every
+distinct image once, however many paths point at the same bytes. With
+Pillow installed, an image is scaled down to `MAX_WIDTH` pixels and
+recompressed (PNG for screenshots and transparent images, JPEG for
+everything else) in a process pool. Results are kept on disk under
+`<cache_dir>/images/`, keyed by the source's hash and the target size, so
+repeat builds only hash their sources.
+
+Without Pillow, images Word can show natively (PNG, JPEG, GIF, BMP) are
+embedded as they are; other formats are rejected.
+
+Identical processed images are the same bytes, which python-docx stores as
+a single media part however often they are added.
+"""
+
+import io
+import os
+import struct
+
+from .filecache import file_digest
+from .sections import DEFAULT_CACHE_DIR
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.tif', '.tiff')
+# Formats embedded as they are when Pillow is not installed
+NATIVE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+MAX_WIDTH = 1600
+JPEG_QUALITY = 85
+
+# Where processed images are kept; builds point this at their cache directory
+cache_dir = DEFAULT_CACHE_DIR
+# Process pool size for cold images; None uses every core, 1 processes in-process
+workers = None
+
+_NATIVE = ('image/png', 'image/jpeg', 'image/gif', 'image/bmp')
+# JPEG start-of-frame markers (C4, C8 and CC are other segment types)
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# (path, mtime_ns, size, max_width, quality) -> PreparedImage, for the life of the process
+_prepared = {}
+
+
+class PreparedImage:
+    """Processed image bytes with their type and pixel size; `digest` is the source's SHA-256"""
+
+    __slots__ = ('digest', 'blob', 'content_type', 'width', 'height')
+
+    def __init__(self, digest, blob):
+        info = image_info(blob)
+        if info is None:
+            raise ValueError('not a PNG, JPEG, GIF or BMP image')
+        self.digest = digest
+        self.blob = blob
+        self.content_type, self.width, self.height = info
+
+    def __repr__(self):
+        return 'PreparedImage(%s, %dx%d)' % (self.content_type, self.width, self.height)
+
+
+def image_info(blob):
+    """(content type, width, height) read from the header of a PNG, GIF, BMP or JPEG, else None"""
+    if blob[:8] == b'\x89PNG\r\n\x1a\n' and len(blob) >= 24:
+        return ('image/png',) + struct.unpack('>II', blob[16:24])
+    if blob[:6] in (b'GIF87a', b'GIF89a') and len(blob) >= 10:
+        return ('image/gif',) + struct.unpack('<HH', blob[6:10])
+    if blob[:2] == b'BM' and len(blob) >= 26:
+        width, height = struct.unpack('<ii', blob[18:26])
+        return 'image/bmp', width, abs(height)
+    if blob[:2] == b'\xff\xd8':
+        offset = 2
+        while offset + 9 <= len(blob):
+            if blob[offset] != 0xFF:
+                return None
+            marker = blob[offset + 1]
+            if marker == 0xFF:
+                offset += 1
+                continue
+            if marker in _JPEG_SOF:
+                height, width = struct.unpack('>HH', blob[offset + 5:offset + 9])
+                return 'image/jpeg', width, height
+            offset += 2 + struct.unpack('>H', blob[offset + 2:offset + 4])[0]
+    return None
+
+
+def image_files(directory):
+    """Image files directly under `directory`, sorted by name; none when it does not exist"""
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names
+            if name.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(os.path.join(directory, name))]
+
+
+def can_embed(path):
+    """Whether `path`'s format can be embedded with the imaging support installed"""
+    return path.lower().endswith(NATIVE_EXTENSIONS) or _pillow() is not None
+
+
+def _pillow():
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def process(blob, max_width=MAX_WIDTH, quality=JPEG_QUALITY):
+    """Scale `blob` down to `max_width` pixels and recompress it; unchanged without Pillow"""
+    Image = _pillow()
+    if Image is None:
+        info = image_info(blob)
+        if info is None or info[0] not in _NATIVE:
+            raise ValueError('unsupported image format (install Pillow to convert it)')
+        return blob
+
+    from PIL import ImageOps
+
+    with Image.open(io.BytesIO(blob)) as source:
+        lossless = source.format in ('PNG', 'GIF', 'BMP')
+        image = ImageOps.exif_transpose(source)
+        if image.width > max_width:
+            height = max(1, round(image.height * max_width / image.width))
+            image = image.resize((max_width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        if lossless or image.mode in ('RGBA', 'LA', 'P', 'PA'):
+            image.save(out, 'PNG', optimize=True)
+        else:
+            image.convert('RGB').save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def _process_file(job):
+    path, max_width, quality = job
+    try:
+        with open(path, 'rb') as f:
+            return process(f.read(), max_width, quality)
+    except (OSError, ValueError) as exc:
+        raise ValueError('%s: %s' % (path, exc)) from None
+
+
+def _cache_path(directory, digest, max_width, quality):
+    return os.path.join(directory, 'images', '%s.%d.q%d' % (digest[:32], max_width, quality))
+
+
+def _read_cached(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_cached(path, blob):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(blob)
+    os.replace(tmp, path)
+
+
+def _memo_key(path, max_width, quality):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size, max_width, quality
+
+
+def prepare_images(paths, max_width=MAX_WIDTH, quality=JPEG_QUALITY):
+    """A PreparedImage per path, in order; identical sources share one PreparedImage
+
+    Sources not already processed, in this process or in `cache_dir`, are
+    processed in a pool of `workers` processes when Pillow is available.
+    """
+    keys = [_memo_key(path, max_width, quality) for path in paths]
+    # digest -> (a source path, memo keys with that content)
+    pending = {}
+    for path, key in zip(paths, keys):
+        if key not in _prepared:
+            digest = file_digest(path)
+            pending.setdefault(digest, (path, []))[1].append(key)
+
+    jobs = []
+    for digest, (path, memo_keys) in pending.items():
+        cached = None
+        if cache_dir is not None:
+            cached = _read_cached(_cache_path(cache_dir, digest, max_width, quality))
+        if cached is not None:
+            image = PreparedImage(digest, cached)
+            _prepared.update((key, image) for key in memo_keys)
+        else:
+            jobs.append((digest, path))
+
+    if jobs:
+        work = [(path, max_width, quality) for _, path in jobs]
+        if len(jobs) > 1 and workers != 1 and _pillow() is not None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                blobs = list(pool.map(_process_file, work))
+        else:
+            blobs = [_process_file(job) for job in work]
+        for (digest, _), blob in zip(jobs, blobs):
+            image = PreparedImage(digest, blob)
+            # Without Pillow the blob is the source itself, which is not worth a copy
+            if cache_dir is not None and _pillow() is not None:
+                _write_cached(_cache_path(cache_dir, digest, max_width, quality), blob)
+            _prepared.update((key, image) for key in pending[digest][1])
+
+    return [_prepared[key] for key in keys]
+
+
+def prepared(path, max_width=MAX_WIDTH, quality=JPEG_QUALITY):
+    """The PreparedImage for one path"""
+    return prepare_images([path], max_width, quality)[0]
@@ -0,0 +1,435 @@
+"""Table data read from the project's own manifests
+
+Parsers turn `package.json`, `docker-compose.yml`, the `Jenkinsfile`, the
+Dockerfiles, the lockfiles (see `lockfile`) and the GitHub Actions workflow
+into plain JSON-compatible structures (so they can go through
+`ParseCache`), and the `*_rows` functions turn those into table
+rows. Express routes and Mongoose models come from scanning the backend's
+JavaScript (see `express`). Hand-written rows are only used for descriptions the sources do not
+carry, and as a fallback when a source is missing. Images under
+`IMAGE_DIRS` are listed for the image appendix.
+"""
+
+import json
+import os
+import re
+import sys
+
+from . import express, lockfile
+from .images import can_embed, image_files
+from .redact import MASK, SECRET_NAME
+
+SOURCES = {
+    'backend_package': 'backend/package.json',
+    'frontend_package': 'frontend/package.json',
+    'compose': 'docker-compose.yml',
+    'jenkinsfile': 'Jenkinsfile',
+    'workflow': '.github/workflows/deploy.yml',
+    'backend_dockerfile': 'backend/Dockerfile',
+    'frontend_dockerfile': 'frontend/Dockerfile',
+    'backend_lockfile': 'backend/package-lock.json',
+    'frontend_lockfile': 'frontend/package-lock.json',
+    'backend_source': 'backend',
+}
+
+# Directories whose images go into the document's image appendix
+IMAGE_DIRS = ('backend/uploads',)
+
+_STAGE = re.compile(r'''stage\s*\(\s*(['"])(.+?)\1\s*\)''')
+_BANNER = re.compile(r'''echo\s+(['"])===\s*(.+?)\s*===\1''')
+_ENV_WRITE = re.compile(r'''echo\s+"(\w+)=([^"]*)"\s*>>?\s*(\S+)''')
+_DOCKER_VARIABLE = re.compile(r'\$\{?(\w+)\}?')
+_NODE_IMAGE = re.compile(r'^(?:[\w.-]+/)*node:(\d+)')
+
+
+class IngestError(RuntimeError):
+    pass
+
+
+def _load_yaml(text):
+    # Imported on first use: only docker-compose and workflow ingestion need it
+    try:
+        import yaml
+    except ImportError:
+        raise IngestError('PyYAML is required to read YAML sources') from None
+    return yaml.safe_load(text) or {}
+
+
+def parse_package_json(text):
+    manifest = json.loads(text)
+    return {
+        'name': manifest.get('name', ''),
+        'license': manifest.get('license', ''),
+        'dependencies': sorted(manifest.get('dependencies', {}).items()),
+        'devDependencies': sorted(manifest.get('devDependencies', {}).items()),
+    }
+
+
+def parse_jenkinsfile(text):
+    matches = list(_STAGE.finditer(text))
+    stages = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        banner = _BANNER.search(text, match.end(), end)
+        stages.append({'name': match.group(2), 'banner': banner.group(2) if banner else ''})
+    env_writes = [list(write) for write in _ENV_WRITE.findall(text)]
+    return {'stages': stages, 'env_writes': env_writes}
+
+
+def _dockerfile_instructions(text):
+    """(keyword, arguments) per instruction, continuation lines joined and comments dropped"""
+    instructions = []
+    pending = ''
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        if stripped.endswith('\\'):
+            pending += stripped[:-1] + ' '
+            continue
+        keyword, _, arguments = (pending + stripped).partition(' ')
+        instructions.append((keyword.upper(), ' '.join(arguments.split())))
+        pending = ''
+    if pending:
+        keyword, _, arguments = pending.partition(' ')
+        instructions.append((keyword.upper(), ' '.join(arguments.split())))
+    return instructions
+
+
+def _exec_form(arguments):
+    """'["node", "index.js"]' -> 'node index.js'; shell-form arguments are kept"""
+    if arguments.startswith('['):
+        try:
+            return ' '.join(str(part) for part in json.loads(arguments))
+        except ValueError:
+            pass
+    return arguments
+
+
+def parse_dockerfile(text):
+    """Build stages with their base image and the instructions after each FROM
+
+    A stage's `image_steps` counts the instructions its image holds on top
+    of the base image, its parent stages' included.
+    """
+    args = {}
+    stages = []
+    for keyword, arguments in _dockerfile_instructions(text):
+        if keyword == 'ARG' and not stages:
+            name, _, default = arguments.partition('=')
+            args[name] = default.strip('"\'')
+        elif keyword == 'FROM':
+            words = [word for word in arguments.split() if not word.startswith('--')]
+            base = _DOCKER_VARIABLE.sub(lambda match: args.get(match.group(1), match.group()), words[0])
+            name = words[2] if len(words) > 2 and words[1].upper() == 'AS' else ''
+            stages.append({'base': base, 'name': name, 'steps': [], 'expose': [], 'cmd': ''})
+        elif stages:
+            stage = stages[-1]
+            stage['steps'].append([keyword, arguments])
+            if keyword == 'EXPOSE':
+                stage['expose'].extend(arguments.split())
+            elif keyword in ('CMD', 'ENTRYPOINT'):
+                stage['cmd'] = _exec_form(arguments)
+    if not stages:
+        raise ValueError('no FROM instruction')
+    # A stage built FROM an earlier one runs on that stage's base image
+    named = {}
+    for stage in stages:
+        parent = named.get(stage['base'])
+        stage['image_steps'] = len(stage['steps'])
+        if parent is not None:
+            stage['base'] = parent['base']
+            stage['image_steps'] += parent['image_steps']
+        if stage['name']:
+            named[stage['name']] = stage
+    return {'stages': stages}
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def parse_workflow(text):
+    workflow = _load_yaml(text)
+    # PyYAML reads the bare `on:` key as boolean True
+    triggers = workflow.get('on', workflow.get(True)) or {}
+    jobs = []
+    for job_id, job in (workflow.get('jobs') or {}).items():
+        steps = job.get('steps') or []
+        node = ''
+        for step in steps:
+            if str(step.get('uses', '')).startswith('actions/setup-node'):
+                node = str((step.get('with') or {}).get('node-version', ''))
+        jobs.append({
+            'id': job_id,
+            'name': job.get('name', job_id),
+            'needs': [str(need) for need in _as_list(job.get('needs'))],
+            'conditional': 'if' in job,
+            'node': node,
+            'steps': [step.get('name') or step.get('uses') or 'run' for step in steps],
+        })
+    return {
+        'name': workflow.get('name', ''),
+        'triggers': sorted(triggers) if isinstance(triggers, dict) else [str(t) for t in _as_list(triggers)],
+        'jobs': jobs,
+    }
+
+
+def _environment_pairs(environment):
+    if isinstance(environment, dict):
+        return [[str(key), '' if value is None else str(value)] for key, value in environment.items()]
+    return [entry.split('=', 1) if '=' in entry else [entry, ''] for entry in _as_list(environment)]
+
+
+def parse_compose(text):
+    compose = _load_yaml(text)
+    services = []
+    for name, service in (compose.get('services') or {}).items():
+        services.append({
+            'name': name,
+            'container_name': service.get('container_name', name),
+            'ports': [str(port) for port in _as_list(service.get('ports'))],
+            'environment': _environment_pairs(service.get('environment')),
+        })
+    networks = [{'name': name, 'driver': (network or {}).get('driver', 'bridge')}
+                for name, network in (compose.get('networks') or {}).items()]
+    volumes = [{'name': name, 'driver': (volume or {}).get('driver', 'local')}
+               for name, volume in (compose.get('volumes') or {}).items()]
+    return {'services': services, 'networks': networks, 'volumes': volumes}
+
+
+def version_of(spec):
+    """'^18.3.1' -> '18.3.1'"""
+    return spec.lstrip('^~>=< ')
+
+
+def package_rows(manifest, known_rows, purposes=None):
+    known = {row[0]: row[2] for row in known_rows}
+    known.update(purposes or {})
+    rows = []
+    for name, spec in manifest['dependencies']:
+        rows.append((name, version_of(spec), known.get(name, 'Runtime dependency')))
+    for name, spec in manifest['devDependencies']:
+        rows.append((name, version_of(spec), known.get(name, 'Development dependency')))
+    return rows
+
+
+def dockerfile_node(dockerfiles):
+    """Node.js major version of the first official `node` base image, or ''"""
+    for dockerfile in dockerfiles:
+        match = _NODE_IMAGE.match(dockerfile['stages'][-1]['base'])
+        if match:
+            return match.group(1)
+    return ''
+
+
+def stack_rows(known_rows, frontend=None, backend=None, workflow=None, dockerfiles=()):
+    versions = {}
+    if frontend is not None:
+        deps = dict(frontend['dependencies'] + frontend['devDependencies'])
+        versions.update({'React': deps.get('react'), 'Vite': deps.get('vite')})
+    if backend is not None:
+        versions['Express.js'] = dict(backend['dependencies']).get('express')
+    # The runtime is what the containers run; CI's setup-node version only stands in for it
+    node = dockerfile_node(dockerfiles)
+    if not node and workflow:
+        node = next((job['node'] for job in workflow['jobs'] if job['node']), '')
+
+    rows = []
+    for layer, technology, version in known_rows:
+        if versions.get(technology):
+            version = version_of(versions[technology])
+        elif technology == 'Node.js' and node and not version.startswith(node + '.'):
+            version = node + '.x'
+        rows.append((layer, technology, version))
+    return rows
+
+
+def pipeline_rows(jenkins, known_rows):
+    known = {row[1]: row[2] for row in known_rows}
+    return [(str(i), stage['name'], known.get(stage['name'], stage['banner']))
+            for i, stage in enumerate(jenkins['stages'], 1)]
+
+
+def ga_rows(workflow, known_rows):
+    known = {row[0]: row[1:] for row in known_rows}
+    rows = []
+    for job in workflow['jobs']:
+        kind, description = known.get(job['id'], (job['name'].split()[0], 'Runs ' + ', '.join(job['steps'])))
+        rows.append((job['id'], kind, description))
+    return rows
+
+
+def docker_rows(compose, known_rows):
+    known = {row[1]: row[2] for row in known_rows}
+    rows = []
+    for service in compose['services']:
+        ports = ', '.join(port.split(':')[0] for port in service['ports'])
+        rows.append(('%s Container' % service['name'].title(), service['container_name'],
+                     'Port %s' % ports if ports else 'No published ports'))
+    for network in compose['networks']:
+        rows.append(('Network', network['name'], '%s driver' % network['driver'].capitalize()))
+    for volume in compose['volumes']:
+        description = known.get(volume['name'], '%s volume' % volume['driver'].capitalize())
+        rows.append(('Volume', volume['name'], description))
+    return rows
+
+
+def dockerfile_rows(dockerfiles):
+    """(service, base image, layer steps, ports, command) per {service: parsed Dockerfile}"""
+    rows = []
+    for service, dockerfile in dockerfiles.items():
+        stage = dockerfile['stages'][-1]
+        base = stage['base']
+        if len(dockerfile['stages']) > 1:
+            base += ' (%d build stages)' % len(dockerfile['stages'])
+        layers = [keyword for keyword, _ in stage['steps'] if keyword in ('RUN', 'COPY', 'ADD')]
+        rows.append((service.title(), base, '%d (%s)' % (len(layers), ', '.join(layers)) if layers else '0',
+                     ', '.join(stage['expose']) or '-', stage['cmd'] or '-'))
+    return rows
+
+
+def env_rows(jenkins, env_file, known_rows):
+    """Variables the pipeline writes to `env_file`; values of unknown secrets are masked"""
+    known = {row[0]: row[1:] for row in known_rows}
+    rows = []
+    seen = set()
+    for key, value, target in jenkins['env_writes']:
+        if target != env_file or key in seen:
+            continue
+        seen.add(key)
+        if key in known:
+            rows.append((key,) + tuple(known[key]))
+        else:
+            rows.append((key, MASK if SECRET_NAME.search(key) else value, ''))
+    return rows
+
+
+class Sources:
+    """Parsed project sources under `root`, read through an optional ParseCache"""
+
+    parsers = {
+        'backend_package': parse_package_json,
+        'frontend_package': parse_package_json,
+        'compose': parse_compose,
+        'jenkinsfile': parse_jenkinsfile,
+        'workflow': parse_workflow,
+        'backend_dockerfile': parse_dockerfile,
+        'frontend_dockerfile': parse_dockerfile,
+        'backend_lockfile': lockfile.parse_lockfile,
+        'frontend_lockfile': lockfile.parse_lockfile,
+    }
+    # Parsers given the path, to stream sources too large to read at once
+    path_parsers = ('backend_lockfile', 'frontend_lockfile')
+
+    def __init__(self, root, cache=None):
+        self.root = root
+        self.cache = cache
+        self.missing = []
+        self._parsed = {}
+
+    def path(self, name):
+        return os.path.join(self.root, SOURCES[name])
+
+    def get(self, name):
+        """Parsed source, or None when it is missing or cannot be read"""
+        if name not in self._parsed:
+            path = self.path(name)
+            parser = self.parsers[name]
+            try:
+                from_path = name in self.path_parsers
+                if self.cache is not None:
+                    self._parsed[name] = self.cache.load(path, parser, from_path)
+                elif from_path:
+                    self._parsed[name] = parser(path)
+                else:
+                    with open(path, encoding='utf-8') as f:
+                        self._parsed[name] = parser(f.read())
+            except (OSError, ValueError, IngestError) as exc:
+                print('warning: not reading %s: %s' % (SOURCES[name], exc), file=sys.stderr)
+                self.missing.append(name)
+                self._parsed[name] = None
+        return self._parsed[name]
+
+    def _per_service(self, kind):
+        found = {}
+        for name in SOURCES:
+            if name.endswith('_' + kind):
+                parsed = self.get(name)
+                if parsed is not None:
+                    found[name[:-len(kind) - 1]] = parsed
+        return found
+
+    def dockerfiles(self):
+        """{service: parsed Dockerfile} for the readable Dockerfiles"""
+        return self._per_service('dockerfile')
+
+    def lockfiles(self):
+        """{service: (DependencyGraph, installed sizes or None)} for the readable lockfiles"""
+        return {service: (lockfile.DependencyGraph(parsed),
+                          lockfile.project_sizes(self.path(service + '_lockfile'), self.cache))
+                for service, parsed in self._per_service('lockfile').items()}
+
+    def api(self):
+        """Routes and models scanned from the backend sources, or None when there are none"""
+        name = 'backend_source'
+        if name not in self._parsed:
+            try:
+                api = express.scan_tree(self.path(name), self.cache)
+            except (OSError, ValueError) as exc:
+                print('warning: not scanning %s: %s' % (SOURCES[name], exc), file=sys.stderr)
+                api = None
+            if api is None or not api['files']:
+                self.missing.append(name)
+                api = None
+            self._parsed[name] = api
+        return self._parsed[name]
+
+
+def ingest(data, root, cache=None, purposes=None):
+    """Return a copy of `data` with every table that has a readable source refreshed"""
+    sources = Sources(root, cache)
+    data = dict(data)
+    frontend = sources.get('frontend_package')
+    backend = sources.get('backend_package')
+    compose = sources.get('compose')
+    jenkins = sources.get('jenkinsfile')
+    workflow = sources.get('workflow')
+    dockerfiles = sources.dockerfiles()
+    lockfiles = sources.lockfiles()
+    api = sources.api()
+
+    data['stack_rows'] = stack_rows(data['stack_rows'], frontend, backend, workflow, dockerfiles.values())
+    if frontend is not None:
+        data['frontend_rows'] = package_rows(frontend, data['frontend_rows'], purposes)
+    if backend is not None:
+        data['backend_rows'] = package_rows(backend, data['backend_rows'], purposes)
+    if jenkins is not None:
+        data['pipeline_rows'] = pipeline_rows(jenkins, data['pipeline_rows'])
+        data['backend_env_rows'] = env_rows(jenkins, 'backend/.env', data['backend_env_rows'])
+        data['frontend_env_rows'] = env_rows(jenkins, 'frontend/.env', data['frontend_env_rows'])
+    if workflow is not None:
+        data['ga_rows'] = ga_rows(workflow, data['ga_rows'])
+    if compose is not None:
+        data['docker_rows'] = docker_rows(compose, data['docker_rows'])
+    if dockerfiles:
+        data['dockerfile_rows'] = dockerfile_rows(dockerfiles)
+    if lockfiles:
+        data.update(lockfile.dependency_data([(service.title(), graph, sizes)
+                                              for service, (graph, sizes) in lockfiles.items()]))
+    if api is not None:
+        if api['routes']:
+            data['endpoint_rows'] = express.endpoint_rows(api)
+        if api['models']:
+            data['collections_rows'] = express.collection_rows(api, data['collections_rows'])
+    found = [path for directory in IMAGE_DIRS for path in image_files(os.path.join(root, directory))]
+    skipped = [path for path in found if not can_embed(path)]
+    if skipped:
+        print('warning: not embedding %s: converting them needs Pillow'
+              % ', '.join(os.path.relpath(path, root) for path in skipped), file=sys.stderr)
+    found = [path for path in found if path not in skipped]
+    if found:
+        data['image_paths'] = found
+    return data, sources
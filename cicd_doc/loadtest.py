@@ -0,0 +1,511 @@
+"""Backend latency and throughput from load-test result files
+
+Three formats are read, told apart by their contents:
+
+- k6 `--out json=` output: one JSON object per line. Only the
+  `http_req_duration` points are used, found with a literal search over
+  large blocks so the other metrics' lines are skipped without being split
+  or decoded.
+- k6 `--out csv=` output, filtered the same way.
+- autocannon `--json` results: one summary object (or a list of them) per
+  file, with the percentiles autocannon computed.
+
+Either k6 format, optionally gzipped, can run to millions of samples.
+Each one is streamed in blocks, and an endpoint's durations go into a
+`QuantileSketch` in batches, so memory stays bounded by the number of
+endpoints. NumPy, when installed, buckets each batch in one vectorized
+pass. A file's result is JSON-compatible and read through `ParseCache`,
+so unchanged files are not read again.
+
+Durations are in milliseconds. An endpoint is `METHOD path`. Its samples
+are combined across files. autocannon summaries cannot be combined, so
+the last file with one wins.
+"""
+
+import csv
+import datetime
+import gzip
+import json
+import os
+import re
+import sys
+from urllib.parse import urlsplit
+
+from .sketch import QuantileSketch
+
+PERCENTILES = (0.5, 0.9, 0.99)
+# autocannon's keys for those quantiles and the maximum (1)
+_SUMMARY_KEYS = {0.5: 'p50', 0.9: 'p90', 0.99: 'p99', 1: 'max'}
+RESULT_SUFFIXES = ('.json', '.ndjson', '.jsonl', '.csv')
+# A p99 this much higher, or a request rate this much lower, than the baseline is a regression
+REGRESSION = 0.10
+
+CHART_WIDTH = 30
+
+# Samples buffered per endpoint before they are added to its sketch
+_BATCH = 1 << 16
+# Distinct raw tag sets remembered while reading a file
+_TAG_MEMO = 4096
+_BLOCK = 8 << 20
+
+# k6 writes one compact JSON object per line, `{"type":"Point","data":{"time":
+# ...,"value":...,"tags":{...}},"metric":"http_req_duration"}`. The search
+# jumps from one duration suffix to the next and slices the value and the
+# raw tag object out; lines in any other layout are parsed as JSON.
+_K6_DURATION_END = b'},"metric":"http_req_duration"}'
+_K6_POINT_START = b'{"type":"Point","data":{"time":"'
+_K6_VALUE_AT = b'","value":'
+_K6_TAGS_AT = b',"tags":'
+_K6_DURATION = re.compile(rb'"metric":\s*"http_req_duration"')
+_K6_TYPE = re.compile(rb'"type":"(?:Metric|Point)"')
+_K6_CSV_ROW = re.compile(rb'\nhttp_req_duration,([^\r\n]*)')
+_ISO = re.compile(r'(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(\.\d+)?(Z|[+-]\d\d:?\d\d)?')
+
+
+class LoadTestError(ValueError):
+    pass
+
+
+def _open(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def _blocks(stream):
+    """Blocks of whole lines"""
+    rest = b''
+    for chunk in iter(lambda: stream.read(_BLOCK), b''):
+        chunk = rest + chunk
+        cut = chunk.rfind(b'\n') + 1
+        rest = chunk[cut:]
+        if cut:
+            yield chunk[:cut]
+    if rest:
+        yield rest + b'\n'
+
+
+def endpoint_path(url):
+    """'http://localhost:5000/products?page=2' -> '/products'; names that are not URLs are kept"""
+    if '://' in url:
+        return urlsplit(url).path or '/'
+    return url
+
+
+def _iso_seconds(text):
+    match = _ISO.match(text)
+    if match is None:
+        raise LoadTestError('unreadable timestamp %r' % text)
+    stamp, fraction, zone = match.groups()
+    zone = '+00:00' if zone in (None, 'Z') else zone
+    stamp = datetime.datetime.fromisoformat(stamp + (fraction or '')[:7] + zone)
+    return stamp.timestamp()
+
+
+def _is_error(status):
+    """A status outside 1xx-3xx, or none at all: the request failed"""
+    return len(status) != 3 or status[:1] not in '123'
+
+
+class _Pending:
+    """One endpoint's sketch, error count and the samples not yet added to the sketch"""
+
+    __slots__ = ('sketch', 'values', 'errors')
+
+    def __init__(self):
+        self.sketch = QuantileSketch()
+        self.values = []
+        self.errors = 0
+
+    def add(self, value, error):
+        self.values.append(value)
+        self.errors += error
+        if len(self.values) >= _BATCH:
+            self.flush()
+
+    def flush(self):
+        self.sketch.add_many(self.values)
+        self.values.clear()
+
+
+class _Samples:
+    """Per-endpoint sketches, filled in batches
+
+    `tagged` maps the raw bytes that identify a sample's endpoint and
+    status (k6's tag object, or CSV fields) to its endpoint once, so
+    repeated requests skip decoding them.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self._tagged = {}
+
+    def endpoint(self, method, url):
+        key = (method or 'GET', endpoint_path(url))
+        pending = self.endpoints.get(key)
+        if pending is None:
+            pending = self.endpoints[key] = _Pending()
+        return pending
+
+    def tagged(self, raw, read):
+        """(endpoint, failed) for `raw`, read with `read(raw)` -> (method, url, status) the first time"""
+        hit = self._tagged.get(raw)
+        if hit is None:
+            if len(self._tagged) >= _TAG_MEMO:
+                # Tags unique to each request (ids, error messages) must not grow this forever
+                self._tagged.clear()
+            method, url, status = read(raw)
+            hit = self._tagged[raw] = (self.endpoint(method, url), _is_error(status))
+        return hit
+
+    def result(self, seconds):
+        endpoints = []
+        for (method, path), pending in self.endpoints.items():
+            pending.flush()
+            endpoints.append({'method': method, 'path': path, 'requests': pending.sketch.count,
+                              'errors': pending.errors, 'seconds': seconds,
+                              'sketch': pending.sketch.to_json(), 'percentiles': None})
+        return endpoints
+
+
+def _k6_tags(raw):
+    tags = json.loads(raw) or {}
+    return tags.get('method', 'GET'), tags.get('name') or tags.get('url', ''), str(tags.get('status', ''))
+
+
+def _k6_line(line, samples):
+    """Add one duration point read with a JSON parser; returns its time, or None when it is not a point"""
+    try:
+        point = json.loads(line)
+    except ValueError:
+        return None
+    data = point.get('data') or {}
+    if point.get('type') != 'Point' or 'value' not in data:
+        return None
+    tags = data.get('tags') or {}
+    pending = samples.endpoint(tags.get('method', 'GET'), tags.get('name') or tags.get('url', ''))
+    pending.add(float(data['value']), _is_error(str(tags.get('status', ''))))
+    return data.get('time')
+
+
+def _k6_block(block, samples):
+    """Add a block's duration points; returns the (first, last) point times"""
+    find, rfind, startswith = block.find, block.rfind, block.startswith
+    tagged = samples.tagged
+    first = last = None
+    pos = find(_K6_DURATION_END)
+    while pos >= 0:
+        start = rfind(b'\n', 0, pos) + 1
+        value = find(_K6_VALUE_AT, start, pos) if startswith(_K6_POINT_START, start) else -1
+        tags = find(_K6_TAGS_AT, value, pos) if value >= 0 else -1
+        if tags >= 0:
+            pending, failed = tagged(block[tags + len(_K6_TAGS_AT):pos], _k6_tags)
+            pending.add(float(block[value + len(_K6_VALUE_AT):tags]), failed)
+            stamp = block[start + len(_K6_POINT_START):value]
+        else:
+            # Metric declarations, and points laid out some other way
+            stamp = _k6_line(block[start:find(b'\n', pos)], samples)
+        if stamp is not None:
+            first = first or stamp
+            last = stamp
+        pos = find(_K6_DURATION_END, pos + len(_K6_DURATION_END))
+    return first, last
+
+
+def parse_k6_json(stream):
+    samples = _Samples()
+    first = last = None
+    for block in _blocks(stream):
+        if _K6_DURATION_END in block:
+            span = _k6_block(block, samples)
+        else:
+            # Not k6's compact layout (re-serialized output): every duration line is parsed as JSON
+            span = (None, None)
+            for match in _K6_DURATION.finditer(block):
+                start = block.rfind(b'\n', 0, match.start()) + 1
+                stamp = _k6_line(block[start:block.find(b'\n', match.end())], samples)
+                if stamp is not None:
+                    span = (span[0] or stamp, stamp)
+        first = first or span[0]
+        last = span[1] or last
+    seconds = None
+    if first is not None:
+        seconds = _iso_seconds(_text(last)) - _iso_seconds(_text(first))
+    return samples.result(seconds if seconds else None)
+
+
+def _text(value):
+    return value.decode('ascii') if isinstance(value, bytes) else value
+
+
+def _csv_tags(raw):
+    return tuple(field.decode('utf-8', 'replace') for field in raw)
+
+
+def parse_k6_csv(stream):
+    header = stream.readline().decode('utf-8-sig').strip()
+    columns = header.split(',')
+    try:
+        time_at, value_at = columns.index('timestamp'), columns.index('metric_value')
+    except ValueError:
+        raise LoadTestError('not a k6 CSV file: no timestamp/metric_value columns') from None
+    # Every row but the metric name, which the row pattern consumes
+    time_at, value_at = time_at - 1, value_at - 1
+    method_at = columns.index('method') - 1 if 'method' in columns else None
+    name_at = columns.index('name') - 1 if 'name' in columns else columns.index('url') - 1
+    status_at = columns.index('status') - 1 if 'status' in columns else None
+
+    samples = _Samples()
+    tagged = samples.tagged
+    first = last = None
+    for block in _blocks(stream):
+        rows = _K6_CSV_ROW.findall(b'\n' + block)
+        for row in rows:
+            if b'"' in row:
+                fields = [field.encode('utf-8') for field in next(csv.reader([row.decode('utf-8')]))]
+            else:
+                fields = row.split(b',')
+            pending, failed = tagged((fields[method_at] if method_at is not None else b'GET', fields[name_at],
+                                      fields[status_at] if status_at is not None else b'200'), _csv_tags)
+            pending.add(float(fields[value_at]), failed)
+        if rows:
+            first = first or rows[0].split(b',')[time_at]
+            last = rows[-1].split(b',')[time_at]
+    seconds = float(last) - float(first) if first is not None else 0
+    return samples.result(seconds if seconds > 0 else None)
+
+
+def parse_autocannon(data):
+    results = data if isinstance(data, list) else [data]
+    endpoints = []
+    for result in results:
+        if not isinstance(result, dict) or 'latency' not in result or 'requests' not in result:
+            raise LoadTestError('not an autocannon result')
+        latency = result['latency']
+        requests = result['requests'].get('total', 0)
+        endpoints.append({
+            'method': result.get('method', 'GET'),
+            'path': endpoint_path(result.get('url', '')),
+            'requests': requests,
+            'errors': result.get('errors', 0) + result.get('timeouts', 0) + result.get('non2xx', 0),
+            'seconds': result.get('duration') or None,
+            'sketch': None,
+            'percentiles': {key: latency[key] for key in _SUMMARY_KEYS.values()},
+        })
+    return endpoints
+
+
+def parse_result_file(path):
+    """Endpoint results of one load-test file (see the module docstring for the formats)"""
+    with _open(path) as stream:
+        head = stream.peek(1 << 12).lstrip(b'\xef\xbb\xbf \t\r\n')
+        if head.startswith(b'metric_name,'):
+            return parse_k6_csv(stream)
+        if _K6_TYPE.search(head.split(b'\n', 1)[0]):
+            return parse_k6_json(stream)
+        if head.startswith((b'{', b'[')):
+            try:
+                return parse_autocannon(json.loads(stream.read()))
+            except ValueError as exc:
+                raise LoadTestError('not a k6 or autocannon result: %s' % exc) from None
+    raise LoadTestError('not a k6 or autocannon result')
+
+
+def result_files(paths):
+    """Result files under `paths` (files or directories), sorted within each directory"""
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for directory, subdirs, names in os.walk(path):
+            subdirs[:] = sorted(name for name in subdirs if not name.startswith('.'))
+            found.extend(os.path.join(directory, name) for name in sorted(names)
+                         if name.endswith(RESULT_SUFFIXES)
+                         or (name.endswith('.gz') and name[:-3].endswith(RESULT_SUFFIXES)))
+    return found
+
+
+class Endpoint:
+    """Combined results of one endpoint"""
+
+    __slots__ = ('method', 'path', 'requests', 'errors', 'seconds', 'sketch', 'percentiles')
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.sketch = None
+        self.percentiles = None
+
+    def __repr__(self):
+        return 'Endpoint(%s %s, %d requests)' % (self.method, self.path, self.requests)
+
+    @property
+    def name(self):
+        return '%s %s' % (self.method, self.path)
+
+    def add(self, result):
+        if result['sketch'] is None:
+            # A summary replaces what came before: percentiles do not combine
+            self.requests, self.errors, self.seconds = result['requests'], result['errors'], 0.0
+            self.sketch, self.percentiles = None, result['percentiles']
+        else:
+            sketch = QuantileSketch.from_json(result['sketch'])
+            if self.sketch is None:
+                self.sketch, self.percentiles = sketch, None
+                self.requests = self.errors = 0
+                self.seconds = 0.0
+            else:
+                self.sketch.merge(sketch)
+            self.requests += result['requests']
+            self.errors += result['errors']
+        if result['seconds']:
+            self.seconds += result['seconds']
+
+    def latency(self, q):
+        """Latency (ms) at quantile `q`, 1 for the maximum"""
+        if self.sketch is not None:
+            return self.sketch.max if q == 1 else self.sketch.quantile(q)
+        return self.percentiles[_SUMMARY_KEYS[q]]
+
+    @property
+    def rate(self):
+        """Requests per second, None when the test duration is unknown"""
+        return self.requests / self.seconds if self.seconds else None
+
+
+def collect(paths, cache=None):
+    """Endpoints measured by the result files under `paths`, in the order they first appear"""
+    endpoints = {}
+    for path in result_files(paths):
+        try:
+            if cache is not None:
+                results = cache.load(path, parse_result_file, from_path=True)
+            else:
+                results = parse_result_file(path)
+        except (OSError, ValueError, EOFError) as exc:
+            print('warning: not reading load-test result %s: %s' % (path, exc), file=sys.stderr)
+            continue
+        for result in results:
+            key = (result['method'], result['path'])
+            if key not in endpoints:
+                endpoints[key] = Endpoint(*key)
+            endpoints[key].add(result)
+    return list(endpoints.values())
+
+
+def baseline_entry(endpoint):
+    return {'p50': endpoint.latency(0.5), 'p90': endpoint.latency(0.9), 'p99': endpoint.latency(0.99),
+            'rate': endpoint.rate, 'requests': endpoint.requests, 'errors': endpoint.errors}
+
+
+def load_baseline(path):
+    """{'METHOD path': entry} from a baseline file; empty when there is none"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['endpoints']
+    except FileNotFoundError:
+        return {}
+    except (ValueError, KeyError, TypeError) as exc:
+        raise LoadTestError('unreadable latency baseline %s: %s' % (path, exc)) from None
+
+
+def save_baseline(path, endpoints):
+    baseline = {'endpoints': {endpoint.name: baseline_entry(endpoint) for endpoint in endpoints}}
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def format_ms(ms):
+    if ms is None:
+        return '-'
+    if ms < 1000:
+        return '%.1f ms' % ms
+    return '%.2f s' % (ms / 1000)
+
+
+def format_rate(rate):
+    return '-' if rate is None else '%.1f' % rate
+
+
+def _change(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before
+
+
+def _format_change(change):
+    return '-' if change is None else '%+.1f%%' % (change * 100)
+
+
+def comparison_rows(endpoints, baseline):
+    """(method, path, baseline p99, p99, p99 change, req/s change, verdict) per endpoint"""
+    rows = []
+    for endpoint in endpoints:
+        before = baseline.get(endpoint.name)
+        if before is None:
+            rows.append((endpoint.method, endpoint.path, '-', format_ms(endpoint.latency(0.99)), '-', '-', 'New'))
+            continue
+        slower = _change(before.get('p99'), endpoint.latency(0.99))
+        rate = _change(before.get('rate'), endpoint.rate)
+        if (slower or 0) > REGRESSION or (rate or 0) < -REGRESSION:
+            verdict = 'Regressed'
+        elif (slower or 0) < -REGRESSION or (rate or 0) > REGRESSION:
+            verdict = 'Improved'
+        else:
+            verdict = 'Unchanged'
+        rows.append((endpoint.method, endpoint.path, format_ms(before.get('p99')),
+                     format_ms(endpoint.latency(0.99)), _format_change(slower), _format_change(rate), verdict))
+    return rows
+
+
+def _bar_chart(title, legend, labels, bars, values, width=CHART_WIDTH):
+    """ASCII horizontal bar chart; each bar is [(length in `values` units, fill character)]"""
+    top = max([value for bar in bars for value, _ in bar] + [0]) or 1
+    label_width = max(len(label) for label in labels)
+    lines = [title, legend, '']
+    for label, bar, value in zip(labels, bars, values):
+        drawn = ''
+        for length, fill in sorted(bar):
+            cells = round(length / top * width)
+            drawn += fill * max(0, cells - len(drawn))
+        lines.append('%-*s |%-*s| %s' % (label_width, label, width, drawn, value))
+    return '\n'.join(lines) + '\n'
+
+
+def latency_chart(endpoints):
+    """Latency and throughput bar charts as ASCII text, for a diagram"""
+    labels = [endpoint.name for endpoint in endpoints]
+    latency = _bar_chart(
+        'LATENCY BY ENDPOINT', '  # = p50   = = p90   - = p99', labels,
+        [[(endpoint.latency(0.5), '#'), (endpoint.latency(0.9), '='), (endpoint.latency(0.99), '-')]
+         for endpoint in endpoints],
+        ['%s / %s' % (format_ms(endpoint.latency(0.5)), format_ms(endpoint.latency(0.99))) for endpoint in endpoints])
+    rated = [endpoint for endpoint in endpoints if endpoint.rate is not None]
+    if not rated:
+        return latency
+    throughput = _bar_chart(
+        'THROUGHPUT BY ENDPOINT', '  * = requests per second', [endpoint.name for endpoint in rated],
+        [[(endpoint.rate, '*')] for endpoint in rated], ['%s req/s' % format_rate(endpoint.rate) for endpoint in rated])
+    return latency + '\n' + throughput
+
+
+def latency_data(paths, cache=None, baseline=None):
+    """Section data for the results under `paths`, compared against the `baseline` file if given"""
+    endpoints = collect(paths, cache)
+    data = {
+        'latency_rows': [(endpoint.method, endpoint.path) + tuple(format_ms(endpoint.latency(q))
+                                                                  for q in PERCENTILES + (1,))
+                         for endpoint in endpoints],
+        'throughput_rows': [(endpoint.method, endpoint.path, str(endpoint.requests), format_rate(endpoint.rate),
+                             '%d (%.2f%%)' % (endpoint.errors, 100 * endpoint.errors / endpoint.requests)
+                             if endpoint.requests else '0')
+                            for endpoint in endpoints],
+        'latency_baseline_rows': comparison_rows(endpoints, load_baseline(baseline)) if baseline else [],
+        'latency_chart': latency_chart(endpoints) if endpoints else '',
+    }
+    return data
@@ -0,0 +1,486 @@
+"""Dependency graphs read from npm's package-lock.json
+
+`parse_lockfile` never builds the lockfile's JSON tree. It reads the file
+in blocks, walks the top-level object itself and decodes one `packages`
+entry at a time with the C decoder, keeping only what the graph needs. A
+legacy `dependencies` section, which duplicates `packages` in version 2
+lockfiles, is not read at all. Version 1 lockfiles, which have only the
+nested `dependencies` tree, are decoded whole.
+
+The graph is integer-indexed. Names, versions and licenses are indices
+into one string pool, and the edges are one flat list with per-package
+offsets. Each dependency is resolved the way Node does it: the nearest
+`node_modules/<name>` walking up from the dependent package. The graph is
+JSON-compatible, so a lockfile is read through `ParseCache` and only
+parsed again when it changes.
+
+Transitive dependency sets are bitsets (Python ints). They are computed
+once per strongly connected component, in the order Tarjan's algorithm
+finishes them, so every component reuses its dependencies' sets. A set is
+dropped once the last component that needs it has been built.
+
+Install sizes are only known for an installed tree. They are measured
+from `node_modules` when it is present, through the cache keyed by
+`node_modules/.package-lock.json`, which npm rewrites on every install.
+"""
+
+import json
+import os
+import re
+import sys
+from array import array
+from collections import Counter
+from itertools import compress
+
+# Rows in the duplicate-versions table
+DUPLICATE_ROWS = 25
+
+DEV = 1
+OPTIONAL = 2
+
+_BLOCK = 1 << 20
+_WS = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+_NODE_MODULES = 'node_modules/'
+
+
+class LockfileError(ValueError):
+    pass
+
+
+class _Reader:
+    """JSON text read in blocks; one value decoded at a time"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def _more(self):
+        if self.eof:
+            return False
+        block = self.stream.read(_BLOCK)
+        if not block:
+            self.eof = True
+            return False
+        self.text = self.text[self.pos:] + block
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """The next character that is not whitespace"""
+        while True:
+            self.pos = _WS.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self._more():
+                raise LockfileError('unexpected end of lockfile')
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise LockfileError('expected %r at offset %d' % (char, self.pos))
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as exc:
+                # The value runs past the end of the block
+                if self._more():
+                    continue
+                raise LockfileError(str(exc)) from None
+            # A number at the very end may continue in the next block
+            if end == len(self.text) and not isinstance(value, (dict, list, str)) and self._more():
+                continue
+            self.pos = end
+            return value
+
+    def members(self):
+        """(key, reader positioned at its value) of an object, without decoding the values"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise LockfileError('expected "," or "}" at offset %d' % (self.pos - 1))
+
+
+class _Builder:
+    """Packages added by path, resolved into the compact graph once all are in"""
+
+    def __init__(self):
+        self.strings = ['']
+        self._string_index = {'': 0}
+        self.paths = []
+        self.index = {}
+        self.columns = {'name': [], 'version': [], 'license': [], 'flags': []}
+        self.wanted = []
+        self.links = {}
+        self.dev_direct = set()
+
+    def _string(self, value):
+        value = value if isinstance(value, str) else '' if value is None else str(value)
+        found = self._string_index.get(value)
+        if found is None:
+            found = self._string_index[value] = len(self.strings)
+            self.strings.append(value)
+        return found
+
+    def add(self, path, entry):
+        if entry.get('link'):
+            self.links[path] = entry.get('resolved', '')
+            return
+        name = entry.get('name') or (path.rpartition(_NODE_MODULES)[2] if _NODE_MODULES in path else path)
+        self.index[path] = len(self.paths)
+        self.paths.append(path)
+        self.columns['name'].append(self._string(name))
+        self.columns['version'].append(self._string(entry.get('version', '')))
+        license = entry.get('license', '')
+        if isinstance(license, dict):
+            license = license.get('type', '')
+        self.columns['license'].append(self._string(license))
+        self.columns['flags'].append((DEV if entry.get('dev') or entry.get('devOptional') else 0)
+                                     | (OPTIONAL if entry.get('optional') else 0))
+        wanted = []
+        for key in ('dependencies', 'optionalDependencies', 'peerDependencies'):
+            wanted.extend(entry.get(key) or ())
+        if path == '':
+            dev = list(entry.get('devDependencies') or ())
+            self.dev_direct = set(dev)
+            wanted.extend(dev)
+        self.wanted.append(wanted)
+
+    def _resolve(self, path, name):
+        """Index of the package `require(name)` finds from `path`, or None"""
+        base = path
+        while True:
+            found = self.index.get('%s/%s%s' % (base, _NODE_MODULES, name) if base else _NODE_MODULES + name)
+            if found is not None:
+                return found
+            if not base:
+                return None
+            cut = base.rfind('/' + _NODE_MODULES)
+            base = base[:cut] if cut >= 0 else ''
+
+    def graph(self):
+        # Workspace links point at the package that holds the linked folder
+        for link, target in self.links.items():
+            if target in self.index:
+                self.index[link] = self.index[target]
+        offsets, targets = [0], []
+        dev_direct = []
+        for i, (path, wanted) in enumerate(zip(self.paths, self.wanted)):
+            seen = set()
+            for name in wanted:
+                found = self._resolve(path, name)
+                if found is not None and found != i and found not in seen:
+                    seen.add(found)
+                    targets.append(found)
+                    if i == 0 and name in self.dev_direct:
+                        dev_direct.append(found)
+            offsets.append(len(targets))
+        return dict(self.columns, strings=self.strings, paths=self.paths, offsets=offsets, targets=targets,
+                    dev_direct=dev_direct)
+
+
+def _v1_packages(builder, tree, prefix=''):
+    for name, entry in (tree or {}).items():
+        path = '%s%s%s' % (prefix + '/' if prefix else '', _NODE_MODULES, name)
+        builder.add(path, {'version': entry.get('version'), 'dev': entry.get('dev'),
+                           'optional': entry.get('optional'), 'dependencies': entry.get('requires')})
+        _v1_packages(builder, entry.get('dependencies'), path)
+
+
+def parse_lockfile(path):
+    """Compact dependency graph of one package-lock.json (JSON-compatible)"""
+    builder = _Builder()
+    with open(path, encoding='utf-8') as f:
+        reader = _Reader(f)
+        root = {}
+        legacy = None
+        for key in reader.members():
+            if key == 'packages':
+                for package in reader.members():
+                    builder.add(package, reader.value())
+                if builder.paths:
+                    # Everything after `packages` is the version 1 tree again
+                    break
+            elif key == 'dependencies':
+                legacy = reader.value()
+            else:
+                root[key] = reader.value()
+    if not builder.paths:
+        if legacy is None:
+            raise LockfileError('no packages: not a package-lock.json')
+        builder.add('', {'name': root.get('name'), 'version': root.get('version'),
+                         'dependencies': {name: '' for name, entry in legacy.items() if not entry.get('dev')},
+                         'devDependencies': {name: '' for name, entry in legacy.items() if entry.get('dev')}})
+        _v1_packages(builder, legacy)
+    if '' not in builder.index:
+        raise LockfileError('no root package entry')
+    return builder.graph()
+
+
+class DependencyGraph:
+    """A parsed lockfile's packages, package 0 being the project itself"""
+
+    __slots__ = ('strings', 'paths', 'name', 'version', 'license', 'flags', 'offsets', 'targets', 'dev_direct')
+
+    def __init__(self, parsed):
+        self.strings = parsed['strings']
+        self.paths = parsed['paths']
+        for column in ('name', 'version', 'license', 'offsets', 'targets'):
+            setattr(self, column, array('I', parsed[column]))
+        self.flags = array('B', parsed['flags'])
+        self.dev_direct = frozenset(parsed['dev_direct'])
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __repr__(self):
+        return 'DependencyGraph(%d packages, %d edges)' % (len(self), len(self.targets))
+
+    def dependencies(self, i):
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def package(self, i):
+        return self.strings[self.name[i]], self.strings[self.version[i]]
+
+    def direct(self):
+        """(index, is a dev dependency) of the project's own dependencies"""
+        return [(i, i in self.dev_direct) for i in self.dependencies(0)]
+
+    def components(self):
+        """Strongly connected components reachable from the project, each after the ones it depends on"""
+        offsets, targets = self.offsets, self.targets
+        position = {0: 0}
+        low = [0]
+        stack, on_stack = [0], {0}
+        work = [(0, offsets[0])]
+        components = []
+        while work:
+            node, edge = work[-1]
+            if edge < offsets[node + 1]:
+                work[-1] = (node, edge + 1)
+                child = targets[edge]
+                if child not in position:
+                    position[child] = len(low)
+                    low.append(len(low))
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, offsets[child]))
+                elif child in on_stack:
+                    low[position[node]] = min(low[position[node]], position[child])
+                continue
+            work.pop()
+            at = position[node]
+            if work:
+                parent = position[work[-1][0]]
+                low[parent] = min(low[parent], low[at])
+            if low[at] == at:
+                # `node` roots a finished component: its members are the stack above it
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    members.append(member)
+                    if member == node:
+                        break
+                components.append(members)
+        return components
+
+    def closures(self, wanted):
+        """({i: bitset of every package i needs, i included} for i in `wanted`, bit -> package index)
+
+        Each component's set is the union of its dependencies' sets, which
+        are finished before it, and is dropped once every component that
+        depends on it has been built. A component's members take the bits
+        after those of everything it depends on, so sets low in the graph
+        are short ints.
+        """
+        components = self.components()
+        component_of = {}
+        order = []
+        for component, members in enumerate(components):
+            for member in members:
+                component_of[member] = component
+            order.extend(members)
+        children = []
+        for component, members in enumerate(components):
+            found = {component_of[child] for member in members for child in self.dependencies(member)}
+            found.discard(component)
+            children.append(found)
+        parents = Counter(child for found in children for child in found)
+        keep = {component_of[i] for i in wanted if i in component_of}
+
+        sets, results = {}, {}
+        start = 0
+        for component, members in enumerate(components):
+            bits = ((1 << len(members)) - 1) << start
+            start += len(members)
+            for child in children[component]:
+                bits |= sets[child]
+                parents[child] -= 1
+                if not parents[child] and child not in keep:
+                    del sets[child]
+            if parents[component] or component in keep:
+                sets[component] = bits
+        for i in wanted:
+            if i in component_of:
+                results[i] = sets[component_of[i]]
+        return results, order
+
+
+def _bits(bitset):
+    """Bytes of 0 and 1, one per bit of `bitset` from bit 0, for itertools.compress"""
+    return bin(bitset)[:1:-1].encode('ascii').translate(_BIT_BYTES)
+
+
+_BIT_BYTES = bytes.maketrans(b'01', b'\0\1')
+
+
+def installed_sizes(node_modules):
+    """{lockfile package path: bytes of its own files} for an installed `node_modules` directory"""
+    sizes = {}
+    project = os.path.dirname(node_modules.rstrip(os.sep))
+
+    def walk(directory):
+        total = 0
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return 0
+        for entry in entries:
+            if entry.is_symlink():
+                continue
+            if entry.is_dir():
+                if entry.name == 'node_modules':
+                    packages(entry.path)
+                else:
+                    total += walk(entry.path)
+            elif entry.is_file():
+                total += entry.stat().st_size
+        return total
+
+    def packages(directory):
+        for entry in os.scandir(directory):
+            if not entry.is_dir() or entry.is_symlink() or entry.name.startswith('.'):
+                continue
+            if entry.name.startswith('@'):
+                packages(entry.path)
+                continue
+            path = os.path.relpath(entry.path, project).replace(os.sep, '/')
+            sizes[path] = walk(entry.path)
+
+    packages(node_modules)
+    return sizes
+
+
+def measure_installed(hidden_lockfile):
+    """`installed_sizes` of the node_modules holding npm's hidden lockfile"""
+    return installed_sizes(os.path.dirname(hidden_lockfile))
+
+
+def project_sizes(lockfile_path, cache=None):
+    """Installed sizes next to a lockfile, read through an optional ParseCache; None when nothing is installed"""
+    hidden = os.path.join(os.path.dirname(lockfile_path), 'node_modules', '.package-lock.json')
+    if not os.path.exists(hidden):
+        return None
+    try:
+        if cache is not None:
+            return cache.load(hidden, measure_installed, from_path=True)
+        return measure_installed(hidden)
+    except OSError as exc:
+        print('warning: not measuring %s: %s' % (os.path.dirname(hidden), exc), file=sys.stderr)
+        return None
+
+
+def _count(bitset):
+    return bin(bitset).count('1')
+
+
+def _version_key(version):
+    """'1.10.0' after '1.9.2'; pre-release and odd versions compare by their text"""
+    core, _, rest = version.partition('-')
+    parts = core.split('.')
+    if all(part.isdigit() for part in parts):
+        return (0, [int(part) for part in parts], rest)
+    return (1, [], version)
+
+
+def _size(size):
+    if size is None:
+        return '-'
+    # Imported here: ingestion loads this module, and the archive reader's imports are not needed for it
+    from .dockerimage import format_size
+
+    return format_size(size)
+
+
+def project_rows(project, graph, sizes=None):
+    """(summary row, direct rows, duplicate rows, license rows) of one project's graph"""
+    direct = graph.direct()
+    closures, order = graph.closures([0] + [i for i, _ in direct])
+    if sizes is not None:
+        ordered = [sizes.get(graph.paths[i], 0) for i in order]
+
+        def closure_size(bitset):
+            return sum(compress(ordered, _bits(bitset)))
+    else:
+        def closure_size(bitset):
+            return None
+
+    production = 0
+    for i, dev in direct:
+        if not dev:
+            production |= closures[i]
+    everything = closures[0] & ~(1 << order.index(0))
+
+    versions = {}
+    for i in range(1, len(graph)):
+        versions.setdefault(graph.name[i], []).append(graph.version[i])
+    duplicated = {name: found for name, found in versions.items() if len(set(found)) > 1}
+    licenses = Counter(graph.license[i] for i in range(1, len(graph)))
+    strings = graph.strings
+
+    summary = (project, str(len(graph) - 1),
+               '%d (%d dev)' % (len(direct), sum(dev for _, dev in direct)),
+               str(_count(production)), str(_count(everything) - _count(production)), str(len(duplicated)),
+               _size(sum(sizes.values()) if sizes is not None else None))
+    direct_rows = []
+    for i, dev in direct:
+        name, version = graph.package(i)
+        direct_rows.append((dev, -_count(closures[i]), name, (
+            project, name, version, 'Development' if dev else 'Runtime', str(_count(closures[i]) - 1),
+            _size(closure_size(closures[i])), strings[graph.license[i]] or 'UNKNOWN')))
+    duplicate_rows = sorted(duplicated.items(),
+                            key=lambda item: (-len(set(item[1])), -len(item[1]), strings[item[0]]))
+    duplicate_rows = [(project, strings[name], ', '.join(sorted({strings[v] for v in found}, key=_version_key)),
+                       str(len(found))) for name, found in duplicate_rows[:DUPLICATE_ROWS]]
+    total = sum(licenses.values()) or 1
+    license_rows = [(project, strings[license] or 'UNKNOWN', str(count), '%.1f%%' % (100 * count / total))
+                    for license, count in sorted(licenses.items(), key=lambda item: (-item[1], strings[item[0]]))]
+    return summary, [row for *_, row in sorted(direct_rows)], duplicate_rows, license_rows
+
+
+def dependency_data(projects):
+    """Section data for [(project, DependencyGraph, installed sizes or None)]"""
+    data = {'lock_summary_rows': [], 'lock_direct_rows': [], 'lock_duplicate_rows': [], 'lock_license_rows': []}
+    for project, graph, sizes in projects:
+        summary, direct_rows, duplicate_rows, license_rows = project_rows(project, graph, sizes)
+        data['lock_summary_rows'].append(summary)
+        data['lock_direct_rows'].extend(direct_rows)
+        data['lock_duplicate_rows'].extend(duplicate_rows)
+        data['lock_license_rows'].extend(license_rows)
+    return data
@@ -0,0 +1,97 @@
+"""Markdown backend for the document model (GitHub-flavoured tables and anchors)
+
+Page breaks and empty spacer paragraphs have no Markdown equivalent and
+are dropped; diagrams are always fenced code blocks, since a Markdown file
+has no package to carry a picture in. Pictures link to their source file.
+"""
+
+import re
+
+from .model import Diagram, Heading, PageBreak, Paragraph, Picture, Table, TableOfContents, heading_anchors
+
+_SPECIAL = re.compile(r'([\\`*_\[\]<>])')
+_BACKTICKS = re.compile(r'`+')
+
+
+def escape(text):
+    return _SPECIAL.sub(r'\\\1', text)
+
+
+def _emphasis(text, run):
+    if not text.strip():
+        return text
+    if run.bold:
+        text = '**%s**' % text
+    if run.italic:
+        text = '*%s*' % text
+    return text
+
+
+def _runs(paragraph):
+    """Paragraph text with hard line breaks; emphasis is applied per line so it never spans one"""
+    lines = ['']
+    for run in paragraph.runs:
+        pieces = run.text.split('\n')
+        lines[-1] += _emphasis(escape(pieces[0]), run)
+        lines.extend(_emphasis(escape(piece), run) for piece in pieces[1:])
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    while lines and not lines[-1].strip():
+        lines.pop()
+    return '  \n'.join(lines)
+
+
+def _cell(text):
+    return escape(text).replace('|', '\\|').replace('\n', '<br>')
+
+
+def _table(table):
+    yield '| %s |\n' % ' | '.join(_cell(str(header)) for header in table.headers)
+    yield '|%s\n' % (' --- |' * len(table.headers))
+    for cells in table.cells():
+        yield '| %s |\n' % ' | '.join(_cell(cell) for cell in cells)
+    yield '\n'
+
+
+def _diagram(diagram):
+    longest = max((len(run) for run in _BACKTICKS.findall(diagram.text)), default=0)
+    fence = '`' * max(3, longest + 1)
+    return '%s\n%s\n%s\n\n' % (fence, diagram.text.rstrip('\n'), fence)
+
+
+def _toc(toc, model, anchors):
+    yield '**%s**\n\n' % escape(toc.title)
+    top = min(toc.levels)
+    for heading in model.headings(toc.levels):
+        yield '%s- [%s](#%s)\n' % ('  ' * (heading.level - top), escape(heading.text), anchors[id(heading)])
+    yield '\n'
+
+
+def iter_markdown(model):
+    """The document as a sequence of Markdown chunks"""
+    anchors = heading_anchors(model)
+    for block in model.blocks:
+        if isinstance(block, Heading):
+            yield '%s %s\n\n' % ('#' * min(block.level + 1, 6), escape(block.text))
+        elif isinstance(block, Paragraph):
+            text = _runs(block)
+            if text:
+                yield text + '\n\n'
+        elif isinstance(block, Table):
+            yield from _table(block)
+        elif isinstance(block, Diagram):
+            yield _diagram(block)
+        elif isinstance(block, Picture):
+            yield '![%s](<%s>)\n\n' % (escape(block.caption or ''), block.path.replace('>', '%3E'))
+            if block.caption:
+                yield '*%s*\n\n' % escape(block.caption)
+        elif isinstance(block, TableOfContents):
+            yield from _toc(block, model, anchors)
+        elif not isinstance(block, PageBreak):
+            raise TypeError('cannot write %r as Markdown' % (block,))
+
+
+def write_markdown(model, stream):
+    """Write the document to a text stream"""
+    for chunk in iter_markdown(model):
+        stream.write(chunk)
@@ -0,0 +1,215 @@
+"""Intermediate document model: headings, paragraphs, tables, diagrams and pictures
+
+Section builders write into a `DocumentModel` through a small subset of
+python-docx's Document API (`add_heading`, `add_paragraph`, `add_run`,
+`add_page_break`, `add_picture`) plus `add_table`, `add_diagram` and
+`add_toc`. The model is plain Python objects; `docx_writer` turns it into
+a python-docx document, `html_writer` and `markdown_writer` stream it as
+text without importing python-docx at all.
+"""
+
+import re
+
+CENTER = 'center'
+
+_SLUG_DROP = re.compile(r'[^\w\- ]')
+
+
+class Run:
+    """A piece of paragraph text with its character formatting; `size` is in points"""
+
+    __slots__ = ('text', 'bold', 'italic', 'size')
+
+    def __init__(self, text='', bold=None, italic=None, size=None):
+        self.text = text
+        self.bold = bold
+        self.italic = italic
+        self.size = size
+
+    def __repr__(self):
+        return 'Run(%r)' % self.text
+
+
+class Paragraph:
+    __slots__ = ('runs', 'style', 'alignment')
+
+    def __init__(self, text='', style=None):
+        self.runs = []
+        self.style = style
+        self.alignment = None
+        if text:
+            self.add_run(text)
+
+    def __repr__(self):
+        return 'Paragraph(%r)' % self.text
+
+    def add_run(self, text='', bold=None, italic=None, size=None):
+        run = Run(text, bold, italic, size)
+        self.runs.append(run)
+        return run
+
+    @property
+    def text(self):
+        return ''.join(run.text for run in self.runs)
+
+
+class Heading(Paragraph):
+    """A paragraph in the Title (level 0) or Heading<level> style"""
+
+    __slots__ = ('level',)
+
+    def __init__(self, text='', level=1):
+        super().__init__(text)
+        self.level = level
+
+    def __repr__(self):
+        return 'Heading(%r, %d)' % (self.text, self.level)
+
+
+class Table:
+    """A header row plus data rows; short rows are padded with empty cells"""
+
+    __slots__ = ('headers', 'rows')
+
+    def __init__(self, headers, rows):
+        self.headers = list(headers)
+        self.rows = rows
+
+    def __repr__(self):
+        return 'Table(%r)' % self.headers
+
+    def cells(self):
+        """Each data row as a list of `len(headers)` strings; rows are read once"""
+        cols = len(self.headers)
+        for values in self.rows:
+            if len(values) > cols:
+                raise IndexError('row has %d values but the table has %d columns' % (len(values), cols))
+            yield [str(value) for value in values] + [''] * (cols - len(values))
+
+
+class Diagram:
+    """Preformatted ASCII art, rendered as text or as a picture (`diagram_format='png'`)"""
+
+    __slots__ = ('text', 'diagram_format')
+
+    def __init__(self, text, diagram_format='text'):
+        self.text = text
+        self.diagram_format = diagram_format
+
+    def __repr__(self):
+        return 'Diagram(%d lines)' % (self.text.count('\n') + 1)
+
+
+class Picture:
+    """An image file shown centered at its own size (capped at the page width), with an optional caption"""
+
+    __slots__ = ('path', 'caption')
+
+    def __init__(self, path, caption=None):
+        self.path = path
+        self.caption = caption
+
+    def __repr__(self):
+        return 'Picture(%r)' % self.path
+
+
+class TableOfContents:
+    """Listing of the headings at `levels`, under a `title` paragraph"""
+
+    __slots__ = ('title', 'levels')
+
+    def __init__(self, title, levels=(1, 2)):
+        self.title = title
+        self.levels = tuple(levels)
+
+    def __repr__(self):
+        return 'TableOfContents(%r)' % self.title
+
+
+class PageBreak:
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'PageBreak()'
+
+
+class DocumentModel:
+    """Blocks in document order, grouped by the section that added them"""
+
+    def __init__(self):
+        self.blocks = []
+        # (section name, index of its first block)
+        self.sections = []
+
+    def __repr__(self):
+        return 'DocumentModel(%d blocks)' % len(self.blocks)
+
+    def _add(self, block):
+        self.blocks.append(block)
+        return block
+
+    def start_section(self, name):
+        self.sections.append((name, len(self.blocks)))
+
+    def add_heading(self, text='', level=1):
+        return self._add(Heading(text, level))
+
+    def add_paragraph(self, text='', style=None):
+        return self._add(Paragraph(text, style))
+
+    def add_page_break(self):
+        return self._add(PageBreak())
+
+    def add_table(self, headers, rows):
+        return self._add(Table(headers, rows))
+
+    def add_diagram(self, text, diagram_format='text'):
+        return self._add(Diagram(text, diagram_format))
+
+    def add_picture(self, path, caption=None):
+        return self._add(Picture(path, caption))
+
+    def add_toc(self, title, levels=(1, 2)):
+        return self._add(TableOfContents(title, levels))
+
+    @property
+    def title(self):
+        """Text of the first Title heading, if any"""
+        return next((block.text for block in self.blocks
+                     if isinstance(block, Heading) and block.level == 0), '')
+
+    def headings(self, levels=None):
+        return [block for block in self.blocks
+                if isinstance(block, Heading) and (levels is None or block.level in levels)]
+
+    def pictures(self):
+        return [block for block in self.blocks if isinstance(block, Picture)]
+
+
+def slugify(text):
+    """GitHub-style heading anchor: lowercase, punctuation dropped, spaces to hyphens"""
+    return _SLUG_DROP.sub('', text.strip().lower()).replace(' ', '-')
+
+
+def heading_anchors(model):
+    """Unique anchor per heading, keyed by `id(heading)`; repeats get -1, -2, ..."""
+    anchors = {}
+    seen = {}
+    for heading in model.headings():
+        slug = slugify(heading.text) or 'section'
+        count = seen.get(slug, 0)
+        seen[slug] = count + 1
+        anchors[id(heading)] = slug if count == 0 else '%s-%d' % (slug, count)
+    return anchors
+
+
+def build_model(sections):
+    """Record every section into one DocumentModel"""
+    from . import trace
+
+    model = DocumentModel()
+    for section in sections:
+        with trace.span(section.name, 'section'):
+            model.start_section(section.name)
+            section.record(model)
+    return model
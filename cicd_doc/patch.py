@@ -0,0 +1,155 @@
+"""Update a previously written .docx by rewriting only the parts that changed
+
+The new document's package parts are serialized in memory and compared
+with the old zip's central directory (uncompressed size and CRC-32). A
+part that matches is copied across as its raw compressed bytes, without
+being decompressed or recompressed; only changed parts, usually just
+`word/document.xml`, go through deflate. The result replaces the old file
+atomically.
+
+`write_package` writes a fresh package the same way; given a `date_time`
+every member gets that timestamp and fixed attributes, which together with
+the fixed member order makes the zip reproducible.
+"""
+
+import os
+import shutil
+import struct
+import time
+import zipfile
+import zlib
+
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+
+# Local file header: fixed 30 bytes, then the name and extra field
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+_DATA_DESCRIPTOR = 0x08
+_COPY_CHUNK = 1 << 20
+
+
+class PatchResult:
+    """Members rewritten from the new document and members copied raw from the old file"""
+
+    def __init__(self, path, rewritten, copied):
+        self.path = path
+        self.rewritten = rewritten
+        self.copied = copied
+
+    def __repr__(self):
+        return 'PatchResult(%d rewritten, %d copied)' % (len(self.rewritten), len(self.copied))
+
+    def summary(self):
+        return '%d package parts rewritten (%s), %d copied unchanged' % (
+            len(self.rewritten), ', '.join(self.rewritten) or 'none', len(self.copied))
+
+
+def package_members(doc):
+    """(member name, bytes) for every part of `doc`: `[Content_Types].xml` first, then by name"""
+    package = doc.part.package
+    parts = list(package.parts)
+    for part in parts:
+        part.before_marshal()
+    yield CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob
+    members = [(PACKAGE_URI.rels_uri.membername, package.rels.xml)]
+    for part in parts:
+        members.append((part.partname.membername, part.blob))
+        if len(part.rels):
+            members.append((part.partname.rels_uri.membername, part.rels.xml))
+    yield from sorted(members)
+
+
+def zip_entry(name, date_time=None):
+    """ZipInfo for a deflated member; with `date_time`, its metadata is platform independent"""
+    if date_time is None:
+        entry = zipfile.ZipInfo(name, time.localtime()[:6])
+        entry.external_attr = 0o600 << 16
+    else:
+        entry = zipfile.ZipInfo(name, date_time)
+        entry.create_system = 3
+        entry.external_attr = 0o644 << 16
+    entry.compress_type = zipfile.ZIP_DEFLATED
+    return entry
+
+
+def _copy_raw(src, info, dst, date_time=None):
+    """Append `info`'s member from the open file `src` to the ZipFile `dst` as stored
+
+    zipfile has no public raw-copy API, so this writes the local header and
+    the compressed bytes itself and registers the entry the way
+    `ZipFile.writestr` does.
+    """
+    src.seek(info.header_offset)
+    fields = _LOCAL_HEADER.unpack(src.read(_LOCAL_HEADER.size))
+    src.seek(info.header_offset + _LOCAL_HEADER.size + fields[-2] + fields[-1])
+
+    if date_time is None:
+        entry = zipfile.ZipInfo(info.filename, info.date_time)
+        entry.external_attr = info.external_attr
+        entry.create_system = info.create_system
+    else:
+        entry = zip_entry(info.filename, date_time)
+    entry.compress_type = info.compress_type
+    # Sizes and CRC go in the local header, so no data descriptor follows
+    entry.flag_bits = info.flag_bits & ~_DATA_DESCRIPTOR
+    entry.CRC = info.CRC
+    entry.compress_size = info.compress_size
+    entry.file_size = info.file_size
+    entry.header_offset = dst.fp.tell()
+    dst.fp.write(entry.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        chunk = src.read(min(remaining, _COPY_CHUNK))
+        if not chunk:
+            raise zipfile.BadZipFile('%s is truncated' % info.filename)
+        dst.fp.write(chunk)
+        remaining -= len(chunk)
+    dst.filelist.append(entry)
+    dst.NameToInfo[entry.filename] = entry
+    dst.start_dir = dst.fp.tell()
+    dst._didModify = True
+
+
+def write_package(doc, target, compresslevel=None, date_time=None):
+    """Save `doc` to a path or binary file object; returns the member names written"""
+    names = []
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for name, blob in package_members(doc):
+            dst.writestr(zip_entry(name, date_time), blob, compresslevel=compresslevel)
+            names.append(name)
+    return names
+
+
+def patch_docx(doc, path, compresslevel=None, date_time=None):
+    """Save `doc` over the .docx at `path`, reusing the compressed bytes of unchanged parts
+
+    Falls back to a full write when there is no readable previous file.
+    """
+    try:
+        old = zipfile.ZipFile(path)
+    except (FileNotFoundError, zipfile.BadZipFile):
+        return PatchResult(path, write_package(doc, path, compresslevel, date_time), [])
+
+    rewritten, copied = [], []
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        with old, open(path, 'rb') as src, \
+                zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for name, blob in package_members(doc):
+                try:
+                    info = old.getinfo(name)
+                except KeyError:
+                    info = None
+                if info is not None and info.file_size == len(blob) and info.CRC == zlib.crc32(blob):
+                    _copy_raw(src, info, dst, date_time)
+                    copied.append(name)
+                else:
+                    dst.writestr(zip_entry(name, date_time), blob, compresslevel=compresslevel)
+                    rewritten.append(name)
+        shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return PatchResult(path, rewritten, copied)
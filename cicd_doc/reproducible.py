@@ -0,0 +1,55 @@
+"""Reproducible output: identical inputs give a byte-identical .docx
+
+Zip members are written in a fixed order with a fixed timestamp and
+attributes (`patch.zip_entry`), and the core properties that would
+otherwise record when or by whom the file was made are pinned. The
+timestamp is SOURCE_DATE_EPOCH when it is set (the reproducible-builds
+convention), else the earliest date a zip can hold.
+
+`write_digest` stores the file's SHA-256 next to it, in `sha256sum`
+format, so a publishing step can skip unchanged documents.
+"""
+
+import datetime
+import os
+
+from .filecache import file_digest
+
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+def source_date():
+    """SOURCE_DATE_EPOCH as a naive UTC datetime, or None when unset"""
+    value = os.environ.get('SOURCE_DATE_EPOCH')
+    if not value:
+        return None
+    try:
+        seconds = int(value)
+    except ValueError:
+        raise ValueError('SOURCE_DATE_EPOCH must be an integer, not %r' % value) from None
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).replace(tzinfo=None)
+
+
+def zip_date_time(when=None):
+    """Zip timestamp for `when`, clamped to the zip format's 1980 epoch"""
+    if when is None:
+        return ZIP_EPOCH
+    return max(ZIP_EPOCH, when.timetuple()[:6])
+
+
+def pin_core_properties(doc, when=None):
+    """Fix the core properties a save could vary: dates (when given), revision and last editor"""
+    props = doc.core_properties
+    if when is not None:
+        props.created = when
+        props.modified = when
+    props.revision = 1
+    props.last_modified_by = ''
+
+
+def write_digest(path):
+    """Write `<path>.sha256` and return the digest"""
+    digest = file_digest(path)
+    with open(path + '.sha256', 'w', encoding='utf-8', newline='\n') as f:
+        f.write('%s  %s\n' % (digest, os.path.basename(path)))
+    return digest
@@ -0,0 +1,182 @@
+"""Compact row sources for large tables
+
+Table inputs are normally lists of tuples of strings. That is fine for
+the hand-written tables but wasteful for inventories of 100k+ rows, where
+every tuple and every repeated version or description string is a
+separate object.
+
+`ColumnarRows` stores a table column by column as `array('I')` indices
+into one pool of interned strings, so a repeated value costs four bytes
+per cell. `LazyRows` holds no rows at all: it calls a generator function
+each time it is iterated, so a table can be streamed straight from its
+source through the table writer into a streaming document. Both are re-iterable, iterate as tuples of
+strings, and hash their content (`digest`) for the section key without
+materializing the rows.
+"""
+
+import hashlib
+from array import array
+from itertools import islice
+
+CHUNK_ROWS = 4096
+
+
+def chunked(rows, size=CHUNK_ROWS):
+    """Lists of up to `size` rows from any iterable"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def rows_digest(rows):
+    """SHA-256 of the rows' cell text, read in one pass"""
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update('\x1f'.join(map(str, row)).encode('utf-8', 'surrogatepass'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+class ColumnarRows:
+    """Rows of a fixed width stored as columns of indices into an interned string pool
+
+    Short rows are padded with empty cells when they are added; values are
+    converted with `str()` once, on the way in. The string -> index map used
+    for interning is dropped once the rows passed to the constructor or
+    `from_chunks` are in, and rebuilt if more rows are appended later.
+    """
+
+    __slots__ = ('width', '_strings', '_index', '_columns', '_digest')
+
+    def __init__(self, width, rows=()):
+        self.width = width
+        self._strings = ['']
+        self._index = {'': 0}
+        self._columns = [array('I') for _ in range(width)]
+        self._digest = None
+        self.extend(rows)
+        self._index = None
+
+    @classmethod
+    def from_chunks(cls, width, chunks):
+        """Build from an iterable of row lists, e.g. pages of a paginated source"""
+        table = cls(width)
+        for chunk in chunks:
+            table.extend(chunk)
+        table._index = None
+        return table
+
+    def __repr__(self):
+        return 'ColumnarRows(%d rows x %d, %d distinct strings)' % (len(self), self.width, len(self._strings))
+
+    def __len__(self):
+        return len(self._columns[0]) if self._columns else 0
+
+    def __getstate__(self):
+        return self.width, self._strings, self._columns
+
+    def __setstate__(self, state):
+        self.width, self._strings, self._columns = state
+        self._index = None
+        self._digest = None
+
+    def _intern(self, value):
+        if not isinstance(value, str):
+            value = str(value)
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self._strings)
+            self._strings.append(value)
+        return index
+
+    def append(self, row):
+        if len(row) > self.width:
+            raise IndexError('row has %d values but the table has %d columns' % (len(row), self.width))
+        if self._index is None:
+            self._index = {value: i for i, value in enumerate(self._strings)}
+        intern = self._intern
+        for column, value in zip(self._columns, row):
+            column.append(intern(value))
+        for column in self._columns[len(row):]:
+            column.append(0)
+        self._digest = None
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def __getitem__(self, index):
+        strings = self._strings
+        return tuple(strings[column[index]] for column in self._columns)
+
+    def __iter__(self):
+        strings = self._strings
+        for indices in zip(*self._columns):
+            yield tuple([strings[i] for i in indices])
+
+    def column(self, index):
+        """Every value of one column, in row order"""
+        strings = self._strings
+        return (strings[i] for i in self._columns[index])
+
+    @property
+    def distinct(self):
+        """Number of distinct strings in the pool"""
+        return len(self._strings)
+
+    def nbytes(self):
+        """Approximate memory held by the index arrays and the string pool"""
+        import sys
+
+        return (sum(column.itemsize * len(column) for column in self._columns)
+                + sum(sys.getsizeof(value) for value in self._strings))
+
+    def digest(self):
+        if self._digest is None:
+            self._digest = rows_digest(self)
+        return self._digest
+
+
+class LazyRows:
+    """Rows produced on demand by `source(*args)`, a function returning a fresh iterator
+
+    No rows are stored; each iteration runs the source again, so it must
+    give the same rows every time. `key` stands in for the content in the
+    section key when the caller knows it (a file digest, say). Without
+    one, the rows are hashed in a streaming pass of their own, once per
+    instance: a section that is rebuilt then reads its source twice.
+    """
+
+    __slots__ = ('source', 'args', 'key', '_digest', '_last')
+
+    def __init__(self, source, *args, key=None):
+        self.source = source
+        self.args = args
+        self.key = key
+        self._digest = None
+        self._last = None
+
+    def __repr__(self):
+        return 'LazyRows(%s)' % getattr(self.source, '__name__', self.source)
+
+    def __iter__(self):
+        rows = self.source(*self.args)
+        if rows is self._last and iter(rows) is rows:
+            # A generator handed back twice would silently give an empty table
+            raise TypeError('%r: source returned the same iterator twice; it must return a fresh one' % self)
+        self._last = rows
+        return iter(rows)
+
+    def chunks(self, size=CHUNK_ROWS):
+        return chunked(self, size)
+
+    def digest(self):
+        if self._digest is None:
+            if self.key is not None:
+                self._digest = hashlib.sha256(str(self.key).encode()).hexdigest()
+            else:
+                self._digest = rows_digest(self)
+        return self._digest
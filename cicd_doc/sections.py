@@ -0,0 +1,431 @@
+"""Named section builders with an on-disk fragment cache
+
+Each `Section` pairs a builder function with the data it renders. The
+section key is a content hash of the builder's source and its inputs; the
+body XML a builder produces is stored under that key, so later runs splice
+unchanged sections back in instead of rebuilding them.
+
+python-docx and lxml are only imported once something is actually
+rendered, so listing sections or computing their keys stays cheap.
+"""
+
+import functools
+import hashlib
+import itertools
+import json
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+# Bump when a shared helper changes the XML it emits, to invalidate every fragment
+FORMAT_VERSION = 3
+
+DEFAULT_CACHE_DIR = '.cicd_doc_cache'
+
+# Bytes of a cached fragment read at a time when it is spliced into a streaming document
+FRAGMENT_CHUNK = 1 << 16
+
+
+@functools.lru_cache(maxsize=None)
+def _docx_version():
+    """Installed python-docx version, read without importing the package"""
+    from importlib import metadata
+
+    try:
+        return metadata.version('python-docx')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def _input_json(value):
+    """JSON stand-in for section inputs json cannot encode"""
+    if hasattr(value, 'digest'):
+        # ColumnarRows / LazyRows: hashed without building a list of rows
+        return '%s:%s' % (type(value).__name__, value.digest())
+    if isinstance(value, Iterator):
+        raise TypeError('section input %r can only be read once; wrap it in rows.LazyRows' % (value,))
+    return str(value)
+
+
+class Section:
+    """A named part of the document: `builder(model, **inputs)`
+
+    Builders write into a `DocumentModel`; `build` records the section and
+    emits it into a python-docx document.
+
+    Sections that add package parts (pictures) are not `cacheable`: their
+    body XML refers to relationships a spliced fragment would not have.
+    """
+
+    def __init__(self, name, builder, inputs=None, cacheable=True):
+        self.name = name
+        self.builder = builder
+        self.inputs = inputs or {}
+        self.cacheable = cacheable
+
+    def __repr__(self):
+        return 'Section(%r)' % self.name
+
+    @property
+    def title(self):
+        """First line of the builder's docstring"""
+        return (self.builder.__doc__ or self.name).strip().splitlines()[0]
+
+    @property
+    def key(self):
+        """Content hash of everything that determines the section's XML"""
+        import inspect
+
+        digest = hashlib.sha256()
+        digest.update(('%s\0%s\0%s\0' % (FORMAT_VERSION, _docx_version(), self.name)).encode())
+        digest.update(inspect.getsource(self.builder).encode())
+        digest.update(json.dumps(self.inputs, sort_keys=True, default=_input_json).encode())
+        return digest.hexdigest()
+
+    def record(self, model=None):
+        """Record the section into `model` (a new DocumentModel by default) and return it"""
+        if model is None:
+            from .model import DocumentModel
+
+            model = DocumentModel()
+        self.builder(model, **self.inputs)
+        return model
+
+    def build(self, doc):
+        from .docx_writer import write_blocks
+
+        write_blocks(doc, self.record().blocks)
+
+
+def fragment_key(section, redactor=None):
+    """Key a section's fragment is cached under: fragments are stored redacted by `redactor`"""
+    if redactor is None:
+        return section.key
+    return hashlib.sha256(('%s\0%s' % (section.key, redactor.fingerprint)).encode()).hexdigest()
+
+
+class FragmentCache:
+    """Rendered section XML stored as `<dir>/<name>.<key>.xml`
+
+    The number of strings redaction changed in a fragment, when there were
+    any, is kept beside it in `<name>.<key>.redacted`, so a build that
+    splices the fragment still reports them.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, prune=True):
+        self.directory = directory
+        # Drop older fragments of a section when a new one is stored; off when
+        # several variants share the directory, which call `retain` afterwards
+        self.prune = prune
+
+    def _path(self, name, key, suffix='xml'):
+        return os.path.join(self.directory, '%s.%s.%s' % (name, key[:32], suffix))
+
+    def has(self, name, key):
+        return os.path.exists(self._path(name, key))
+
+    def get(self, name, key):
+        try:
+            with open(self._path(name, key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def open(self, name, key):
+        """The stored fragment as a binary file, or None"""
+        try:
+            return open(self._path(name, key), 'rb')
+        except FileNotFoundError:
+            return None
+
+    def put(self, name, key, xml, redacted=0):
+        with self.writer(name, key) as f:
+            f.write(xml)
+        self.put_redacted(name, key, redacted)
+
+    def redacted(self, name, key):
+        """Strings redacted in a stored fragment"""
+        try:
+            with open(self._path(name, key, 'redacted'), encoding='ascii') as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def put_redacted(self, name, key, count):
+        if count:
+            path = self._path(name, key, 'redacted')
+            tmp = '%s.%d.tmp' % (path, os.getpid())
+            with open(tmp, 'w', encoding='ascii') as f:
+                f.write('%d\n' % count)
+            os.replace(tmp, path)
+
+    @contextmanager
+    def writer(self, name, key):
+        """Binary file for a fragment written piece by piece; stored only if the block completes"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name, key)
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            with open(tmp, 'wb') as f:
+                yield f
+        except BaseException:
+            os.remove(tmp)
+            raise
+        if self.prune:
+            self._prune({name}, {self._stem(name, key)})
+        os.replace(tmp, path)
+
+    def retain(self, sections, redactor=None):
+        """Delete the stored fragments of these sections other than their current ones"""
+        if os.path.isdir(self.directory):
+            self._prune({section.name for section in sections},
+                        {self._stem(section.name, fragment_key(section, redactor)) for section in sections})
+
+    @staticmethod
+    def _stem(name, key):
+        return '%s.%s' % (name, key[:32])
+
+    def _prune(self, names, keep):
+        """Delete the fragments (and their counts) of `names` whose `<name>.<key>` is not in `keep`"""
+        for entry in os.listdir(self.directory):
+            if entry.count('.') == 2 and entry.split('.', 1)[0] in names and entry.rsplit('.', 1)[0] not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, entry))
+                except FileNotFoundError:
+                    pass
+
+
+def serialize_blocks(blocks, nsmap=None):
+    """Block XML, leaving out the declarations of `nsmap` that `_body_tags` will supply
+
+    Those are what lxml repeats on every block serialized on its own; the
+    fragment then matches one captured from a streaming document.
+    """
+    from lxml import etree
+
+    declarations = [(' xmlns:%s="%s"' % (prefix, uri)).encode() for prefix, uri in (nsmap or {}).items() if prefix]
+    parts = []
+    for block in blocks:
+        xml = etree.tostring(block, encoding='UTF-8')
+        start = xml.index(b'>')
+        tag = xml[:start]
+        for declaration in declarations:
+            tag = tag.replace(declaration, b'', 1)
+        parts.append(tag + xml[start:])
+    return b''.join(parts)
+
+
+def _body_tags(doc):
+    """Start and end tags of a body declaring the document element's namespaces
+
+    Fragments captured from a streaming document rely on those declarations.
+    """
+    declarations = ' '.join('xmlns:%s="%s"' % (prefix, uri)
+                            for prefix, uri in doc.element.nsmap.items() if prefix)
+    return ('<w:body %s>' % declarations).encode(), b'</w:body>'
+
+
+def splice_blocks(doc, xml):
+    """Insert cached block XML at the end of the document body; returns the new blocks"""
+    from docx.oxml import parse_xml
+
+    start, end = _body_tags(doc)
+    blocks = list(parse_xml(start + xml + end))
+    sectPr = doc.element.body.sectPr
+    for block in blocks:
+        sectPr.addprevious(block)
+    return blocks
+
+
+def _fragment_blocks(chunks, start, end):
+    """Top-level blocks of fragment XML read in chunks, each dropped once it has been yielded
+
+    Rows of top-level tables are yielded (and dropped) on their own as
+    soon as they are parsed, so even a fragment holding one very large
+    table is read in bounded memory.
+    """
+    from lxml import etree
+
+    from .toc import W_NS
+
+    row = '{%s}tr' % W_NS
+    parser = etree.XMLPullParser(events=('end',))
+    parser.feed(start)
+    for chunk in itertools.chain(chunks, [end]):
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            parent = element.getparent()
+            if parent is None:
+                continue
+            grandparent = parent.getparent()
+            if grandparent is None or (element.tag == row and grandparent.getparent() is None):
+                yield element
+                parent.remove(element)
+    parser.close()
+
+
+def render_section(doc, section, cache=None, redactor=None, collect=None):
+    """Build or splice one section; returns (rebuilt, strings redacted)
+
+    A rebuilt section is redacted and its headings marked for bookmarks
+    (`toc.mark_headings`) before it is stored, so the cache only ever holds
+    redacted XML; spliced fragments were redacted and marked when stored.
+    Blocks are handed to `collect` once they are final. A streaming
+    document redacts, collects and writes out each block as it is
+    flushed, and splices fragments without parsing them into the body, so
+    it never holds a whole section.
+    """
+    from .redact import redact_blocks
+    from .streaming import StreamingDocument
+    from .toc import mark_headings
+
+    if not section.cacheable:
+        cache = None
+    key = fragment_key(section, redactor) if cache is not None else None
+    streaming = isinstance(doc, StreamingDocument)
+    fragment = cache.open(section.name, key) if cache is not None else None
+    if fragment is not None:
+        with fragment:
+            if not streaming:
+                blocks = splice_blocks(doc, fragment.read())
+                if collect is not None:
+                    collect(blocks)
+                return False, cache.redacted(section.name, key)
+            chunks = iter(functools.partial(fragment.read, FRAGMENT_CHUNK), b'')
+            if collect is not None:
+                chunks = _copied(chunks, doc.write_xml)
+                for block in _fragment_blocks(chunks, *_body_tags(doc)):
+                    collect([block])
+            else:
+                for chunk in chunks:
+                    doc.write_xml(chunk)
+        return False, cache.redacted(section.name, key)
+
+    redacted = 0
+
+    def finish(blocks):
+        nonlocal redacted
+        if redactor is not None:
+            redacted += redact_blocks(blocks, redactor)
+        mark_headings(blocks)
+        if collect is not None:
+            collect(blocks)
+
+    if not streaming:
+        body = doc.element.body
+        start = len(body) - 1
+        section.build(doc)
+        blocks = body[start:len(body) - 1]
+        if redactor is not None:
+            redacted = redact_blocks(blocks, redactor)
+        mark_headings(blocks)
+        if cache is not None:
+            cache.put(section.name, key, serialize_blocks(blocks, doc.element.nsmap), redacted)
+        if collect is not None:
+            collect(blocks)
+        return True, redacted
+
+    # Blocks added before the section are not this section's to redact or store
+    doc.flush()
+    with doc.before_write(finish):
+        if cache is None:
+            section.build(doc)
+            doc.flush()
+        else:
+            with cache.writer(section.name, key) as f, doc.capture(f):
+                section.build(doc)
+            cache.put_redacted(section.name, key, redacted)
+    return True, redacted
+
+
+def _copied(chunks, write):
+    """`chunks`, each passed to `write` as it is read"""
+    for chunk in chunks:
+        write(chunk)
+        yield chunk
+
+
+class BuildReport:
+    """Which sections were rebuilt or spliced from the cache, with timings and headings"""
+
+    def __init__(self):
+        from .toc import Outline
+
+        self.entries = []
+        self.outline = Outline()
+        # PatchResult when the output was updated in place
+        self.patch = None
+        # SHA-256 of a deterministic build's output file
+        self.digest = None
+        # Strings changed by secret redaction, when it ran
+        self.redacted = None
+
+    def add(self, name, rebuilt, seconds):
+        self.entries.append((name, rebuilt, seconds))
+
+    @property
+    def rebuilt(self):
+        return [name for name, rebuilt, _ in self.entries if rebuilt]
+
+    @property
+    def cached(self):
+        return [name for name, rebuilt, _ in self.entries if not rebuilt]
+
+    def summary(self):
+        total = sum(seconds for _, _, seconds in self.entries)
+        lines = ['%d sections rebuilt, %d from cache (%.3fs)'
+                 % (len(self.rebuilt), len(self.cached), total)]
+        for name, rebuilt, seconds in self.entries:
+            lines.append('  %-28s %-8s %.4fs' % (name, 'rebuilt' if rebuilt else 'cached', seconds))
+        if self.redacted is not None:
+            lines.append('%d strings redacted' % self.redacted)
+        if self.patch is not None:
+            lines.append(self.patch.summary())
+        if self.digest is not None:
+            lines.append('sha256 %s' % self.digest)
+        return '\n'.join(lines)
+
+
+def render_sections(doc, sections, cache=None, estimate_pages=True, redactor=None):
+    """Render `sections` in order into `doc`, then fill in its table of contents
+
+    With a `redact.Redactor`, each section's text is redacted once it is
+    built, before it is cached or a streaming document writes it out.
+    """
+    from . import trace
+    from .streaming import StreamingDocument
+
+    from .tables import add_table_style
+    from .toc import PageEstimator
+
+    report = BuildReport()
+    if redactor is not None:
+        report.redacted = 0
+    streaming = isinstance(doc, StreamingDocument)
+    elements = 0
+
+    def collect(blocks):
+        nonlocal elements
+        if trace.active() is not None:
+            elements += trace.count_elements(blocks)
+        report.outline.collect(blocks)
+
+    # Spliced fragments reference the table style without adding it
+    add_table_style(doc)
+    if streaming and estimate_pages:
+        # Its blocks are gone by the time the TOC is filled, so their pages are counted as they are collected
+        report.outline.pages = PageEstimator(doc)
+    for section in sections:
+        start = time.perf_counter()
+        elements = 0
+        with trace.span(section.name, 'section', memory=True) as event:
+            rebuilt, redacted = render_section(doc, section, cache, redactor, collect)
+            if redactor is not None:
+                report.redacted += redacted
+            if event is not None:
+                event['args'].update(elements=elements, rebuilt=rebuilt)
+        report.add(section.name, rebuilt, time.perf_counter() - start)
+    with trace.span('fill_toc', 'toc'):
+        report.outline.fill_toc(doc, estimate_pages)
+    return report
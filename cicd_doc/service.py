@@ -0,0 +1,323 @@
+"""On-demand document service: a small asyncio HTTP server
+
+    POST /render   JSON variant config -> rendered document bytes
+    GET  /stats    request counts, cache usage, latency percentiles, throughput
+    GET  /health   "ok"
+
+A render request is `{"format": "docx" | "html" | "md", "data": {...},
+"options": {...}}`: `data` overrides section data as in batch variants, and
+`options` may set `estimate_pages`, `deterministic`, `compresslevel` or
+`ingest`. Data is checked against the server's defaults: known keys only,
+values shaped like the defaults, and nothing that names files on the
+server (`image_paths`). Builds run in a bounded process pool. Requests are keyed by a
+hash of their config plus a fingerprint of the project sources; concurrent
+requests for the same key share one build, and finished results are kept
+in an LRU cache bounded by total bytes.
+"""
+
+import asyncio
+import hashlib
+import json
+import signal
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+CONTENT_TYPES = {
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'html': 'text/html; charset=utf-8',
+    'md': 'text/markdown; charset=utf-8',
+}
+# Build options a request may set; paths, caching and streaming stay under the server's control
+REQUEST_OPTIONS = ('estimate_pages', 'deterministic', 'compresslevel', 'ingest')
+# Section data naming files on the server, which a request must not be able to read
+PATH_DATA = ('image_paths',)
+DATA_CHOICES = {'diagram_format': ('text', 'png')}
+
+DEFAULT_CACHE_BYTES = 64 << 20
+MAX_BODY = 1 << 20
+LATENCY_WINDOW = 2048
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _check_options(options):
+    for name, value in options.items():
+        if name == 'compresslevel':
+            if value is not None and (type(value) is not int or not 0 <= value <= 9):
+                raise RequestError(400, 'options.compresslevel must be an integer from 0 to 9')
+        elif not isinstance(value, bool):
+            raise RequestError(400, 'options.%s must be true or false' % name)
+
+
+def _check_data(data, defaults):
+    for key, value in data.items():
+        if key in PATH_DATA:
+            raise RequestError(400, 'data.%s names files on the server and cannot be set' % key)
+        if defaults is None:
+            continue
+        if key not in defaults:
+            raise RequestError(400, 'unknown data key %r' % (key,))
+        default = defaults[key]
+        if isinstance(default, str):
+            if not isinstance(value, str) or value not in DATA_CHOICES.get(key, (value,)):
+                raise RequestError(400, 'data.%s must be %s' % (
+                    key, ' or '.join(map(repr, DATA_CHOICES[key])) if key in DATA_CHOICES else 'a string'))
+            continue
+        # Table rows: a list of lists of strings or numbers, no wider than the defaults when known
+        width = max((len(row) for row in default), default=None)
+        if not isinstance(value, list) or not all(
+                isinstance(row, list) and all(isinstance(cell, (str, int, float)) for cell in row) for row in value):
+            raise RequestError(400, 'data.%s must be a list of rows of strings or numbers' % key)
+        if width is not None and any(len(row) > width for row in value):
+            raise RequestError(400, 'data.%s rows have at most %d values' % (key, width))
+
+
+def parse_request(body, defaults=None):
+    """(format, data, options) from a render request body, checking data against `defaults`"""
+    try:
+        request = json.loads(body or b'{}')
+    except ValueError as exc:
+        raise RequestError(400, 'invalid JSON: %s' % exc) from None
+    if not isinstance(request, dict):
+        raise RequestError(400, 'request must be a JSON object')
+    output_format = request.get('format', 'docx')
+    if output_format not in CONTENT_TYPES:
+        raise RequestError(400, 'unknown format %r' % (output_format,))
+    data = request.get('data') or {}
+    options = request.get('options') or {}
+    if not isinstance(data, dict) or not isinstance(options, dict):
+        raise RequestError(400, 'data and options must be objects')
+    unknown = sorted(set(options) - set(REQUEST_OPTIONS))
+    if unknown:
+        raise RequestError(400, 'unknown options: %s' % ', '.join(unknown))
+    _check_options(options)
+    _check_data(data, defaults)
+    return output_format, data, options
+
+
+def request_key(output_format, data, options, fingerprint=''):
+    canonical = json.dumps([output_format, data, options, fingerprint], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResultCache:
+    """Rendered documents by request key, evicting the least recently used past `max_bytes`"""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old)
+        self._entries[key] = body
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+
+class Stats:
+    """Counters plus a sliding window of request latencies"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counts = {'requests': 0, 'builds': 0, 'cache_hits': 0, 'coalesced': 0, 'errors': 0}
+        self.build_seconds = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, seconds):
+        self._latencies.append(seconds)
+
+    def snapshot(self):
+        uptime = time.monotonic() - self.started
+        latencies = sorted(self._latencies)
+
+        def percentile(q):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 3)
+
+        builds = self.counts['builds']
+        return dict(self.counts, uptime_seconds=round(uptime, 3),
+                    requests_per_second=round(self.counts['requests'] / uptime, 3) if uptime else None,
+                    mean_build_ms=round(self.build_seconds / builds * 1000, 3) if builds else None,
+                    latency_ms={'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99),
+                                'max': percentile(1.0), 'window': len(latencies)})
+
+
+class DocumentService:
+    """Coalesces identical renders and serves repeats from the result cache
+
+    `render(output_format, data, options)` runs in a worker process and
+    returns the document's bytes; it must be picklable (a module-level
+    function). `fingerprint()` identifies the current state of the sources,
+    so results are not served after the project changes. Request data is
+    checked against `data_defaults`, the section data it overrides.
+    """
+
+    def __init__(self, render, workers=None, cache_bytes=DEFAULT_CACHE_BYTES, fingerprint=None,
+                 initializer=None, data_defaults=None):
+        self._render = render
+        self._data_defaults = data_defaults
+        self._fingerprint = fingerprint or (lambda: '')
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=initializer)
+        self._inflight = {}
+        self.cache = ResultCache(cache_bytes)
+        self.stats = Stats()
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+
+    async def render(self, output_format, data, options):
+        """(body, outcome) where outcome is 'hit', 'coalesced' or 'built'"""
+        key = request_key(output_format, data, options, self._fingerprint())
+        body = self.cache.get(key)
+        if body is not None:
+            self.stats.counts['cache_hits'] += 1
+            return body, 'hit'
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats.counts['coalesced'] += 1
+            return await asyncio.shield(pending), 'coalesced'
+
+        loop = asyncio.get_running_loop()
+        pending = self._inflight[key] = loop.create_future()
+        start = time.perf_counter()
+        try:
+            body = await loop.run_in_executor(self._pool, self._render, output_format, data, options)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as exc:
+            pending.set_exception(exc)
+            # Retrieved here so a build nobody else waited on does not log a warning
+            pending.exception()
+            raise
+        else:
+            self.stats.counts['builds'] += 1
+            self.stats.build_seconds += time.perf_counter() - start
+            self.cache.put(key, body)
+            pending.set_result(body)
+            return body, 'built'
+        finally:
+            del self._inflight[key]
+
+    def stats_document(self):
+        return dict(self.stats.snapshot(), cache={'entries': len(self.cache), 'bytes': self.cache.bytes,
+                                                  'max_bytes': self.cache.max_bytes,
+                                                  'evictions': self.cache.evictions},
+                    in_flight=len(self._inflight))
+
+    async def respond(self, method, path, body):
+        """(status, headers, body) for one request"""
+        if path == '/health':
+            return 200, {'Content-Type': 'text/plain'}, b'ok\n'
+        if path == '/stats':
+            return 200, {'Content-Type': 'application/json'}, json.dumps(
+                self.stats_document(), indent=2).encode() + b'\n'
+        if path != '/render':
+            raise RequestError(404, 'no such endpoint: %s' % path)
+        if method != 'POST':
+            raise RequestError(405, 'use POST /render')
+        output_format, data, options = parse_request(body, self._data_defaults)
+        try:
+            document, outcome = await self.render(output_format, data, options)
+        except ValueError as exc:
+            raise RequestError(400, str(exc)) from None
+        return 200, {'Content-Type': CONTENT_TYPES[output_format], 'X-Cache': outcome}, document
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                start = time.perf_counter()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                declared = headers.get('content-length') or '0'
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                self.stats.counts['requests'] += 1
+                try:
+                    # Digits only: int() would also take a sign, spaces and underscores
+                    if not (declared.isascii() and declared.isdigit()):
+                        # The body cannot be skipped without its length, so the connection ends here
+                        keep_alive = False
+                        raise RequestError(400, 'invalid Content-Length: %r' % declared)
+                    length = int(declared)
+                    if length > MAX_BODY:
+                        keep_alive = False
+                        raise RequestError(413, 'request body over %d bytes' % MAX_BODY)
+                    body = await reader.readexactly(length) if length else b''
+                    status, response_headers, payload = await self.respond(method, target.split('?')[0], body)
+                except RequestError as exc:
+                    status, response_headers, payload = exc.status, {'Content-Type': 'text/plain'}, \
+                        ('%s\n' % exc).encode()
+                except Exception as exc:
+                    status, response_headers, payload = 500, {'Content-Type': 'text/plain'}, \
+                        ('%s: %s\n' % (type(exc).__name__, exc)).encode()
+                if status >= 400:
+                    self.stats.counts['errors'] += 1
+
+                response_headers['Content-Length'] = str(len(payload))
+                response_headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+                head = 'HTTP/1.1 %d %s\r\n%s\r\n' % (status, _REASONS.get(status, ''), ''.join(
+                    '%s: %s\r\n' % item for item in response_headers.items()))
+                writer.write(head.encode('latin-1') + payload)
+                await writer.drain()
+                if target.startswith('/render'):
+                    self.stats.record(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service, host='127.0.0.1', port=8080, ready=None):
+    """Run `service` until cancelled or sent SIGTERM; `ready(port)` is called once it is listening"""
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    server = await asyncio.start_server(service.handle, host, port)
+    async with server:
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
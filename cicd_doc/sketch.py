@@ -0,0 +1,154 @@
+"""Mergeable quantile sketches for duration distributions
+
+A `QuantileSketch` keeps counts in logarithmic buckets, so its memory is
+bounded by the range of the values rather than their number, and two
+sketches of the same accuracy merge exactly. Batches of values are
+bucketed with NumPy when it is installed, one value at a time otherwise.
+"""
+
+import math
+from collections import Counter
+
+SKETCH_ACCURACY = 0.01
+SKETCH_BINS = 2048
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class QuantileSketch:
+    """Approximate quantiles of positive values in bounded memory
+
+    Values go into logarithmic buckets, as in DDSketch: bucket i holds
+    (gamma**(i-1), gamma**i], and a quantile is read back from its
+    bucket to within `accuracy` of the true value. Past `max_bins`
+    buckets the lowest two are merged, which only coarsens the lowest
+    quantiles. Sketches with the same accuracy merge without loss.
+    """
+
+    __slots__ = ('accuracy', 'max_bins', '_gamma', '_log_gamma', 'bins', 'zeros', 'count', 'min', 'max')
+
+    # Values at or below this count as zero (1 ms for seconds, 1 us for milliseconds)
+    MIN_VALUE = 1e-3
+
+    def __init__(self, accuracy=SKETCH_ACCURACY, max_bins=SKETCH_BINS):
+        self.accuracy = accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __repr__(self):
+        return 'QuantileSketch(%d values, %d bins)' % (self.count, len(self.bins))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value):
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= self.MIN_VALUE:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def add_many(self, values):
+        """Add a batch of values; bucketed in one vectorized pass when NumPy is installed"""
+        np = _numpy()
+        if np is None:
+            self._add_all(values)
+            return
+        values = np.asarray(values, dtype=float)
+        if not values.size:
+            return
+        self.count += int(values.size)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        positive = values[values > self.MIN_VALUE]
+        self.zeros += int(values.size - positive.size)
+        if not positive.size:
+            return
+        indexes = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+        low = int(indexes.min())
+        counts = np.bincount(indexes - low)
+        for offset in np.flatnonzero(counts).tolist():
+            index = low + offset
+            self.bins[index] = self.bins.get(index, 0) + int(counts[offset])
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _add_all(self, values):
+        values = values if isinstance(values, list) else list(values)
+        if not values:
+            return
+        self.count += len(values)
+        self.min = min(self.min, min(values))
+        self.max = max(self.max, max(values))
+        log, ceil, log_gamma, floor = math.log, math.ceil, self._log_gamma, self.MIN_VALUE
+        counts = Counter(ceil(log(value) / log_gamma) for value in values if value > floor)
+        self.zeros += len(values) - sum(counts.values())
+        bins = self.bins
+        for index, count in counts.items():
+            bins[index] = bins.get(index, 0) + count
+        while len(bins) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other):
+        if other.accuracy != self.accuracy:
+            raise ValueError('cannot merge sketches of different accuracy')
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        lowest, second = sorted(self.bins)[:2]
+        self.bins[second] += self.bins.pop(lowest)
+
+    def quantile(self, q):
+        """Value at quantile `q` (0 to 1); None when the sketch is empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return max(self.min, 0.0)
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                value = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_json(self):
+        """JSON-compatible state, for caches"""
+        return {'accuracy': self.accuracy, 'max_bins': self.max_bins, 'zeros': self.zeros,
+                'min': self.min if self.count else None, 'max': self.max if self.count else None,
+                'bins': sorted(self.bins.items())}
+
+    @classmethod
+    def from_json(cls, state):
+        sketch = cls(state['accuracy'], state['max_bins'])
+        sketch.bins = {index: count for index, count in state['bins']}
+        sketch.zeros = state['zeros']
+        sketch.count = sketch.zeros + sum(sketch.bins.values())
+        if sketch.count:
+            sketch.min, sketch.max = state['min'], state['max']
+        return sketch
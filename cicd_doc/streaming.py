@@ -0,0 +1,337 @@
+"""Streaming DOCX output
+
+`StreamingDocument` wraps a regular python-docx `Document` and writes
+finished body blocks out to a temporary file as it goes, dropping them
+from the in-memory tree; on close the body is copied from there into
+`word/document.xml` inside the output zip. The usual `doc.add_*` calls and
+the generator's helpers work unchanged; peak memory is bounded by the
+number of blocks that have not been flushed yet rather than by the size of
+the whole document, or of any one section. A table being filled in bulk
+(`tables.build_table`) has its rows written out chunk by chunk with
+`write_rows`, so a long table is not held whole either.
+
+Work that needs finished blocks (redaction, collecting headings) hooks in
+with `before_write`, which sees every block (or streamed table row) just
+before it is written;
+`capture` copies the written XML to a file, which is how a section is
+stored in the fragment cache while it streams out. What can only be
+written once the whole body is known (the table of contents) is put in on
+the copy into the package, with `rewrite_body`.
+"""
+
+import tempfile
+from contextlib import contextmanager
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+from docx import Document
+from docx.opc.oxml import serialize_part_xml
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+from lxml import etree
+
+# Blocks kept in memory after an automatic flush, so callers can keep
+# editing the paragraph or table they have just added
+OPEN_BLOCKS = 32
+# Bytes of body XML copied into the package at a time
+COPY_CHUNK = 1 << 20
+
+_MARKER_TEXT = 'docx-stream-body'
+_MARKER = b'<!--%s-->' % _MARKER_TEXT.encode()
+
+
+class StreamingDocument:
+    """Document that streams its body into the output package as it grows"""
+
+    def __init__(self, target, template=None, open_blocks=OPEN_BLOCKS, compresslevel=None, date_time=None):
+        self._doc = Document(template)
+        self._target = target
+        self._open_blocks = open_blocks
+        self._body = self._doc.element.body
+        self._sectPr = self._body.sectPr
+        # A fixed `date_time` makes every member's metadata reproducible (see patch.zip_entry)
+        self._date_time = date_time
+        self._zip = ZipFile(target, 'w', compression=ZIP_DEFLATED, compresslevel=compresslevel)
+        entry = self._entry(self._doc.part.partname.membername)
+        if isinstance(entry, ZipInfo):
+            # ZipFile.open takes no compresslevel argument
+            entry._compresslevel = compresslevel
+        self._stream = self._zip.open(entry, 'w')
+        head, self._tail = self._document_shell()
+        self._stream.write(head)
+        self._spool = tempfile.TemporaryFile(prefix='docx-body-')
+        self._rewrite = None
+        self._auto = True
+        self._closed = False
+        self._hooks = []
+        self._copies = []
+        # The table `write_rows` has started writing, and its end tag
+        self._open_table = None
+        self._open_end = None
+
+    def __getattr__(self, name):
+        return getattr(self._doc, name)
+
+    def _entry(self, name):
+        if self._date_time is None:
+            return name
+        from .patch import zip_entry
+
+        return zip_entry(name, self._date_time)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _document_shell(self):
+        """Serialize the document element around an empty body"""
+        body = self._body
+        children = list(body)
+        for child in children:
+            body.remove(child)
+        body.append(etree.Comment(_MARKER_TEXT))
+        try:
+            xml = serialize_part_xml(self._doc.element)
+        finally:
+            body.remove(body[0])
+            body.extend(children)
+        head, tail = xml.split(_MARKER)
+        return head, tail
+
+    def _pending(self):
+        return len(self._body) - 1
+
+    def _write_blocks(self, count):
+        """Serialize the first `count` body blocks in one go and release them"""
+        body = self._body
+        if self._open_table is not None and body[0] is self._open_table:
+            self._close_table()
+            count -= 1
+            if not count:
+                return
+        held = list(body)[count:]
+        for child in held:
+            body.remove(child)
+        for hook in self._hooks:
+            hook(list(body))
+        xml = etree.tostring(body, encoding='UTF-8')
+        for child in list(body):
+            # Emptied first: lxml detaches a large subtree (a long table) in quadratic time
+            child.clear()
+            body.remove(child)
+        body.extend(held)
+        start = xml.index(b'>') + 1
+        self._write(xml[start:xml.rindex(b'</')])
+
+    def _write(self, xml):
+        self._spool.write(xml)
+        for f in self._copies:
+            f.write(xml)
+
+    @staticmethod
+    def _release(tbl, rows):
+        for row in rows:
+            row.clear()
+            tbl.remove(row)
+
+    def _write_open_rows(self):
+        """Write and release the rows added to the open table since its last write"""
+        tbl = self._open_table
+        rows = tbl.tr_lst
+        if not rows:
+            return
+        for hook in self._hooks:
+            hook(rows)
+        # Serialized without the properties and grid, which went out with the table's start
+        props = [child for child in tbl if child.tag != rows[0].tag]
+        for child in props:
+            tbl.remove(child)
+        xml = etree.tostring(tbl, encoding='UTF-8')
+        for i, child in enumerate(props):
+            tbl.insert(i, child)
+        self._release(tbl, rows)
+        self._write(xml[xml.index(b'>') + 1:xml.rindex(b'</')])
+
+    def _close_table(self):
+        self._write_open_rows()
+        self._write(self._open_end)
+        tbl, self._open_table = self._open_table, None
+        tbl.clear()
+        self._body.remove(tbl)
+
+    def _auto_flush(self):
+        pending = self._pending()
+        if self._auto and pending >= 2 * self._open_blocks:
+            self._write_blocks(pending - self._open_blocks)
+
+    @contextmanager
+    def paused(self):
+        """Keep every new block in memory until the block exits"""
+        auto, self._auto = self._auto, False
+        try:
+            yield self
+        finally:
+            self._auto = auto
+
+    @contextmanager
+    def before_write(self, hook):
+        """Call `hook(blocks)` with the blocks about to be written out, until the block exits
+
+        The blocks are final by then, so the hook may edit them in place.
+        Rows of a table streamed with `write_rows` are passed on their own.
+        """
+        self._hooks.append(hook)
+        try:
+            yield self
+        finally:
+            self._hooks.remove(hook)
+
+    @contextmanager
+    def capture(self, f):
+        """Also write the XML of the blocks added inside the block to the binary file `f`
+
+        Pending blocks are written out first, and new ones when the block
+        exits. Like the body it is copied from, the XML relies on the
+        namespace declarations of the document element.
+        """
+        self.flush()
+        self._copies.append(f)
+        try:
+            yield f
+            self.flush()
+        finally:
+            self._copies.remove(f)
+
+    def write_rows(self, table):
+        """Write out the rows added so far to `table`, the last body block, while it is being filled
+
+        The table's start goes out with its first rows and its end tag when
+        the table itself is written. Rows are final once passed here; a
+        paused document keeps them.
+        """
+        body = self._body
+        tbl = table._tbl
+        if not self._auto or len(body) < 2 or body[len(body) - 2] is not tbl:
+            return
+        if tbl is self._open_table:
+            self._write_open_rows()
+            return
+        if self._pending() > 1:
+            self._write_blocks(self._pending() - 1)
+        rows = tbl.tr_lst
+        if not rows:
+            return
+        for hook in self._hooks:
+            hook(rows)
+        body.remove(self._sectPr)
+        xml = etree.tostring(body, encoding='UTF-8')
+        body.append(self._sectPr)
+        xml = xml[xml.index(b'>') + 1:xml.rindex(b'</')]
+        end = xml.rindex(b'</')
+        self._open_table, self._open_end = tbl, xml[end:]
+        self._release(tbl, rows)
+        self._write(xml[:end])
+
+    def flush(self):
+        """Write every pending block; call at section boundaries"""
+        pending = self._pending()
+        if pending:
+            self._write_blocks(pending)
+
+    def write_xml(self, xml):
+        """Write serialized body blocks (a cached fragment) after the pending ones, without hooks"""
+        self.flush()
+        self._write(xml)
+
+    def rewrite_body(self, edit):
+        """Edit the body XML on its way into the package, on close
+
+        `edit(body)` reads the whole written body from the binary file
+        `body` and returns a list of `(start, end, xml)` replacements of its
+        byte ranges, in order.
+        """
+        self._rewrite = edit
+
+    def add_heading(self, text='', level=1):
+        heading = self._doc.add_heading(text, level)
+        self._auto_flush()
+        return heading
+
+    def add_paragraph(self, text='', style=None):
+        paragraph = self._doc.add_paragraph(text, style)
+        self._auto_flush()
+        return paragraph
+
+    def add_page_break(self):
+        paragraph = self._doc.add_page_break()
+        self._auto_flush()
+        return paragraph
+
+    def add_table(self, rows, cols, style=None):
+        table = self._doc.add_table(rows, cols, style)
+        self._auto_flush()
+        return table
+
+    def add_picture(self, image_path_or_stream, width=None, height=None):
+        picture = self._doc.add_picture(image_path_or_stream, width, height)
+        self._auto_flush()
+        return picture
+
+    def save(self, target=None):
+        """Finish the package; `target` must be the one given at construction"""
+        if target is not None and target != self._target:
+            raise ValueError('a streaming document can only be saved to %r' % (self._target,))
+        self.close()
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._copy_body()
+        self._stream.write(etree.tostring(self._sectPr, encoding='UTF-8') + self._tail)
+        self._stream.close()
+        self._write_package_parts()
+        self._zip.close()
+        self._closed = True
+
+    def _copy_body(self):
+        """Copy the spooled body into the package, through the `rewrite_body` edits"""
+        spool, self._spool = self._spool, None
+        with spool:
+            spool.flush()
+            edits = self._rewrite(spool) if self._rewrite is not None else []
+            spool.seek(0)
+            for start, end, xml in edits:
+                self._copy(spool, start - spool.tell())
+                self._stream.write(xml)
+                spool.seek(end)
+            self._copy(spool)
+
+    def _copy(self, spool, length=None):
+        while length is None or length > 0:
+            data = spool.read(COPY_CHUNK if length is None else min(length, COPY_CHUNK))
+            if not data:
+                break
+            self._stream.write(data)
+            if length is not None:
+                length -= len(data)
+
+    def _write_package_parts(self):
+        """Write every part except the streamed document body, as PackageWriter does"""
+        package = self._doc.part.package
+        parts = package.parts
+        for part in parts:
+            part.before_marshal()
+        main_part = self._doc.part
+        level = self._zip.compresslevel
+        entry = self._entry
+        self._zip.writestr(entry(CONTENT_TYPES_URI.membername), _ContentTypesItem.from_parts(parts).blob,
+                           compresslevel=level)
+        self._zip.writestr(entry(PACKAGE_URI.rels_uri.membername), package.rels.xml, compresslevel=level)
+        for part in parts:
+            if part is not main_part:
+                self._zip.writestr(entry(part.partname.membername), part.blob, compresslevel=level)
+            if len(part.rels):
+                self._zip.writestr(entry(part.partname.rels_uri.membername), part.rels.xml,
+                                   compresslevel=level)
@@ -0,0 +1,126 @@
+"""Bulk table construction
+
+Tables are emitted as `w:tr` XML strings parsed in chunks, instead of
+growing the table one python-docx row and one cell at a time. Cell text is
+rendered the way `cell.text = ...` does.
+
+On a `StreamingDocument` each chunk of rows is written out as soon as it
+is parsed (`write_rows`), so a long table never sits whole in the tree.
+
+The header row's fill and white bold text come from the `TABLE_STYLE`
+table style's first-row conditional formatting, registered once per
+document by `add_table_style`, so cells carry no properties of their own:
+column widths come from the table grid.
+"""
+
+import functools
+import re
+from xml.sax.saxutils import escape
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+TABLE_STYLE = 'SoundPlus Table'
+HEADER_FILL = '2E86AB'
+HEADER_COLOR = 'FFFFFF'
+
+# Rows are parsed in chunks so the intermediate XML string stays small
+CHUNK_ROWS = 512
+# Distinct cell values whose XML is kept while one table is built
+CELL_CACHE = 4096
+
+_RUN_BREAKS = re.compile(r'([\t\r\n])')
+
+
+def _t_xml(text):
+    """Render a `w:t` element, preserving leading/trailing whitespace"""
+    if len(text.strip()) < len(text):
+        return '<w:t xml:space="preserve">%s</w:t>' % escape(text)
+    return '<w:t>%s</w:t>' % escape(text)
+
+
+def run_content_xml(text):
+    """Render run content the same way python-docx's `run.text` setter does"""
+    if '\t' not in text and '\r' not in text and '\n' not in text:
+        return _t_xml(text) if text else ''
+    parts = []
+    for piece in _RUN_BREAKS.split(text):
+        if piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece == '\r' or piece == '\n':
+            parts.append('<w:br/>')
+        elif piece:
+            parts.append(_t_xml(piece))
+    return ''.join(parts)
+
+
+# Every cell, header included, is bare: formatting comes from the table style
+_CELL_OPEN = '<w:tc><w:p><w:r>'
+_CELL_CLOSE = '</w:r></w:p></w:tc>'
+_EMPTY_CELL = '<w:tc><w:p/></w:tc>'
+
+
+def add_table_style(doc, name=TABLE_STYLE, header_fill=HEADER_FILL, header_color=HEADER_COLOR):
+    """Register the header-row table style unless `doc` already has it; returns its style id"""
+    style_id = name.replace(' ', '')
+    styles = doc.styles.element
+    if styles.get_by_id(style_id) is None:
+        styles.append(parse_xml(
+            '<w:style %s w:type="table" w:customStyle="1" w:styleId="%s">'
+            '<w:name w:val="%s"/><w:basedOn w:val="TableGrid"/><w:uiPriority w:val="59"/>'
+            '<w:tblStylePr w:type="firstRow">'
+            '<w:rPr><w:b/><w:color w:val="%s"/></w:rPr>'
+            '<w:tcPr><w:shd w:val="clear" w:color="auto" w:fill="%s"/></w:tcPr>'
+            '</w:tblStylePr></w:style>'
+            % (nsdecls('w'), style_id, escape(name), header_color, header_fill)))
+    return style_id
+
+
+def _cell_xml(value):
+    return _CELL_OPEN + run_content_xml(value if isinstance(value, str) else str(value)) + _CELL_CLOSE
+
+
+def _row_xml(values, cols, cell=_cell_xml):
+    if len(values) > cols:
+        raise IndexError('row has %d values but the table has %d columns' % (len(values), cols))
+    cells = [cell(value) for value in values]
+    cells.extend([_EMPTY_CELL] * (cols - len(values)))
+    return '<w:tr>%s</w:tr>' % ''.join(cells)
+
+
+def _append_rows(tbl, row_xml):
+    fragment = parse_xml('<w:tbl %s>%s</w:tbl>' % (nsdecls('w'), ''.join(row_xml)))
+    tbl.extend(list(fragment))
+
+
+def build_table(doc, headers, rows, style=TABLE_STYLE, chunk_rows=CHUNK_ROWS):
+    """Create a table with a shaded header row from any iterable of row sequences
+
+    Rows are read once, in order, so a generator or `rows.LazyRows` is
+    streamed into the table a chunk at a time, and on to the output file
+    when `doc` is a streaming document.
+    """
+    from .streaming import StreamingDocument
+
+    if style == TABLE_STYLE:
+        add_table_style(doc)
+    cols = len(headers)
+    table = doc.add_table(rows=0, cols=cols)
+    table.style = style
+    tbl = table._tbl
+    # Versions, purposes and other repeated values are rendered once
+    cell = functools.lru_cache(maxsize=CELL_CACHE)(_cell_xml)
+    streaming = isinstance(doc, StreamingDocument)
+
+    pending = [_row_xml(headers, cols)]
+    for row_data in rows:
+        pending.append(_row_xml(row_data, cols, cell))
+        if len(pending) >= chunk_rows:
+            _append_rows(tbl, pending)
+            pending = []
+            if streaming:
+                doc.write_rows(table)
+    if pending:
+        _append_rows(tbl, pending)
+
+    return table
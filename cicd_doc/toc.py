@@ -0,0 +1,476 @@
+"""Table of contents built from the headings as they are emitted
+
+`add_toc` puts an empty Word TOC field in the document. While sections
+render, `mark_headings` marks where the bookmark of each heading the TOC
+lists will go, and `Outline.collect` records every heading among the new
+body blocks; once the body is complete, `Outline.fill_toc` names the
+bookmarks in document order and writes the field result (one hyperlinked
+entry per heading) in place of the placeholder. Page numbers come from
+`estimate_pages`, a single pass over the body that adds up approximate
+block heights, and Word is asked to refresh the fields on open.
+
+The marks are XML comments, so a cached fragment holds them rather than
+bookmark names that depend on the rest of the document. A streaming
+document has written its blocks out by the time the TOC is filled: its
+pages are counted by a `PageEstimator` as the blocks are collected, and
+the marks and placeholder are replaced as the body is copied into the
+package (`StreamingDocument.rewrite_body`).
+"""
+
+import functools
+import math
+import re
+from xml.sax.saxutils import escape
+
+from lxml import etree
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+TOC_LEVELS = (1, 2)
+PLACEHOLDER_TEXT = 'Right-click and choose Update Field to build the table of contents.'
+
+# Right-aligned page number tab at the edge of the 6" text column, and the
+# indent per TOC level, in twips
+TAB_POS = 8640
+LEVEL_INDENT = 360
+
+_HEADING_STYLE = re.compile(r'Heading([1-9])$')
+
+# Comments standing in for a heading's bookmark until it is named
+_START_MARK = 'toc-bookmark-start'
+_END_MARK = 'toc-bookmark-end'
+_MARKS = re.compile(rb'<!--(%s|%s)-->' % (_START_MARK.encode(), _END_MARK.encode()))
+_BOOKMARK_START = '<w:bookmarkStart w:id="%d" w:name="_Toc%08d"/>'
+_BOOKMARK_END = '<w:bookmarkEnd w:id="%d"/>'
+# Serialized start of the TOC field's instruction; text cannot contain a raw `<`
+_TOC_INSTR = b'<w:instrText xml:space="preserve"> TOC '
+# Streamed body XML is scanned for those in chunks, overlapping by more than either is long
+_SCAN_CHUNK = 1 << 20
+_SCAN_OVERLAP = 64
+# Bytes either side of the instruction searched for the placeholder paragraph's tags
+_PLACEHOLDER_WINDOW = 4096
+
+
+def _w(tag):
+    return '{%s}%s' % (W_NS, tag)
+
+
+def _instr_xml(instr):
+    return ('<w:r><w:fldChar w:fldCharType="begin"/></w:r>'
+            '<w:r><w:instrText xml:space="preserve"> %s </w:instrText></w:r>'
+            '<w:r><w:fldChar w:fldCharType="separate"/></w:r>' % escape(instr))
+
+
+_FIELD_END = '<w:r><w:fldChar w:fldCharType="end"/></w:r>'
+
+
+def _toc_instr(levels):
+    return 'TOC \\o "%d-%d" \\h \\z \\u' % (min(levels), max(levels))
+
+
+def _parse_blocks(xml):
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+
+    return list(parse_xml('<w:body %s>%s</w:body>' % (nsdecls('w'), xml)))
+
+
+def add_toc(doc, levels=TOC_LEVELS):
+    """Add an empty TOC field; `Outline.fill_toc` writes its entries once the body is complete"""
+    paragraph = doc.add_paragraph()
+    field = _parse_blocks('<w:p>%s<w:r><w:t>%s</w:t></w:r>%s</w:p>'
+                          % (_instr_xml(_toc_instr(levels)), escape(PLACEHOLDER_TEXT), _FIELD_END))[0]
+    paragraph._p.extend(list(field))
+    return paragraph
+
+
+def enable_field_update(doc):
+    """Ask Word to refresh fields (TOC, page references) when the document is opened"""
+    settings = doc.settings.element
+    update = settings.find(_w('updateFields'))
+    if update is None:
+        from docx.oxml import OxmlElement
+
+        update = OxmlElement('w:updateFields')
+        settings.append(update)
+    update.set(_w('val'), 'true')
+
+
+def _is_toc_field(block):
+    return any(instr.text and instr.text.strip().startswith('TOC ')
+               for instr in block.iter(_w('instrText')))
+
+
+def heading_level(block):
+    """Outline level of a `Heading N` paragraph, else None"""
+    style = block.find('%s/%s' % (_w('pPr'), _w('pStyle')))
+    if style is None:
+        return None
+    match = _HEADING_STYLE.match(style.get(_w('val'), ''))
+    return int(match.group(1)) if match else None
+
+
+def _marked(block):
+    return len(block) > 0 and block[-1].tag is etree.Comment and block[-1].text == _END_MARK
+
+
+def mark_headings(blocks, levels=TOC_LEVELS):
+    """Mark where the bookmark of each heading the TOC lists goes, among top-level body blocks"""
+    for block in blocks:
+        if block.tag == _w('p') and heading_level(block) in levels and not _marked(block):
+            pPr = block.find(_w('pPr'))
+            block.insert(0 if pPr is None else block.index(pPr) + 1, etree.Comment(_START_MARK))
+            block.append(etree.Comment(_END_MARK))
+
+
+def _bookmark_edits(body, toc=None):
+    """`(start, end, xml)` edits of streamed body XML read from the file `body`
+
+    Each mark becomes its numbered bookmark and, given `toc`, the TOC
+    placeholder paragraph becomes `toc`. The body is read in chunks; a
+    match may straddle two of them.
+    """
+    edits = []
+    number = 0
+    field = None
+    carry, offset = b'', 0
+    body.seek(0)
+    for chunk in iter(functools.partial(body.read, _SCAN_CHUNK), b''):
+        data, base = carry + chunk, offset - len(carry)
+        # Matches within the carried bytes were found in the previous chunk
+        for match in _MARKS.finditer(data):
+            if match.end() <= len(carry):
+                continue
+            if match.group(1) == _START_MARK.encode():
+                number += 1
+                xml = _BOOKMARK_START % (number, number)
+            else:
+                xml = _BOOKMARK_END % number
+            edits.append((base + match.start(), base + match.end(), xml.encode()))
+        if toc is not None and field is None:
+            found = data.find(_TOC_INSTR)
+            if found >= 0:
+                field = base + found
+        carry, offset = data[-_SCAN_OVERLAP:], offset + len(chunk)
+    if field is not None:
+        # The placeholder is one short paragraph around the instruction
+        start = max(0, field - _PLACEHOLDER_WINDOW)
+        body.seek(start)
+        window = body.read(2 * _PLACEHOLDER_WINDOW)
+        at = field - start
+        begin = max(window.rfind(b'<w:p>', 0, at), window.rfind(b'<w:p ', 0, at))
+        end = window.find(b'</w:p>', at)
+        if begin >= 0 and end >= 0:
+            edits.append((start + begin, start + end + len(b'</w:p>'), toc))
+            edits.sort()
+    return edits
+
+
+class Heading:
+    def __init__(self, level, text, element, bookmark=None, page=None):
+        self.level = level
+        self.text = text
+        self.element = element
+        self.bookmark = bookmark
+        # Estimated as the heading was collected, for a streaming document
+        self.page = page
+
+    def __repr__(self):
+        return 'Heading(%d, %r)' % (self.level, self.text)
+
+
+class Outline:
+    """Headings in document order, collected as sections are rendered"""
+
+    def __init__(self, levels=TOC_LEVELS):
+        self.levels = levels
+        self.headings = []
+        self.toc = None
+        # PageEstimator fed with the collected blocks, for a document that does not keep them
+        self.pages = None
+        self._bookmarks = 0
+
+    def collect(self, blocks):
+        """Record the headings among newly emitted body blocks, numbering the bookmarks of marked ones"""
+        for block in blocks:
+            page = self.pages.add(block) if self.pages is not None else None
+            if block.tag != _w('p'):
+                continue
+            if self.toc is None and _is_toc_field(block):
+                self.toc = block
+                continue
+            level = heading_level(block)
+            if level is None:
+                continue
+            text = ''.join(t.text or '' for t in block.iter(_w('t')))
+            heading = Heading(level, text, block, page=page)
+            if _marked(block):
+                self._bookmarks += 1
+                heading.bookmark = '_Toc%08d' % self._bookmarks
+            self.headings.append(heading)
+
+    def _name_bookmarks(self):
+        number = 0
+        for heading in self.headings:
+            if heading.bookmark is None:
+                continue
+            number += 1
+            start, end = _parse_blocks((_BOOKMARK_START + _BOOKMARK_END) % (number, number, number))
+            for mark in list(heading.element.iterchildren(etree.Comment)):
+                heading.element.replace(mark, start if mark.text == _START_MARK else end)
+
+    def fill_toc(self, doc, estimate=True):
+        """Name the bookmarks and replace the TOC placeholder with entries; returns False when it could not be filled"""
+        from .streaming import StreamingDocument
+
+        enable_field_update(doc)
+        streaming = isinstance(doc, StreamingDocument)
+        entries = [heading for heading in self.headings if heading.bookmark and heading.level in self.levels]
+        filled = self.toc is not None and bool(entries) and (streaming or self.toc.getparent() is not None)
+        if not streaming:
+            self._name_bookmarks()
+            if not filled:
+                return False
+            pages = estimate_pages(doc, [heading.element for heading in entries]) if estimate else {}
+            for block in _parse_blocks(self._entries_xml(entries, pages)):
+                self.toc.addprevious(block)
+            self.toc.getparent().remove(self.toc)
+        else:
+            from .sections import serialize_blocks
+
+            pages = {heading.element: heading.page for heading in entries if heading.page is not None}
+            toc = serialize_blocks(_parse_blocks(self._entries_xml(entries, pages)), {'w': W_NS}) if filled else None
+            doc.rewrite_body(lambda body: _bookmark_edits(body, toc))
+        self.toc = None
+        return filled
+
+    def _entries_xml(self, entries, pages):
+        top = min(self.levels)
+        paragraphs = []
+        for i, heading in enumerate(entries):
+            page = pages.get(heading.element)
+            paragraphs.append(
+                '<w:p><w:pPr><w:tabs><w:tab w:val="right" w:leader="dot" w:pos="%d"/></w:tabs>'
+                '<w:ind w:left="%d"/></w:pPr>%s<w:hyperlink w:anchor="%s" w:history="1">'
+                '<w:r><w:t xml:space="preserve">%s</w:t></w:r><w:r><w:tab/></w:r>%s%s%s'
+                '</w:hyperlink>%s</w:p>'
+                % (TAB_POS, (heading.level - top) * LEVEL_INDENT,
+                   _instr_xml(_toc_instr(self.levels)) if i == 0 else '',
+                   heading.bookmark, escape(heading.text),
+                   _instr_xml('PAGEREF %s \\h' % heading.bookmark),
+                   '' if page is None else '<w:r><w:t>%d</w:t></w:r>' % page,
+                   _FIELD_END, _FIELD_END if i == len(entries) - 1 else ''))
+        return ''.join(paragraphs)
+
+
+# Page estimation
+
+_EMU_PER_PT = 12700
+_TWIPS_PER_PT = 20
+# Single line height as a multiple of the font size (Courier New, the theme fonts)
+_MONO_LINE = 1.133
+_TEXT_LINE = 1.22
+
+
+class _StyleMetrics:
+    """Font size and spacing per style id, resolved through `basedOn` chains"""
+
+    def __init__(self, doc):
+        styles = doc.styles.element
+        self._styles = {style.get(_w('styleId')): style for style in styles.iter(_w('style'))}
+        self._resolved = {}
+        defaults = {'size': 11.0, 'before': 0.0, 'after': 0.0, 'line': 1.0}
+        doc_defaults = styles.find(_w('docDefaults'))
+        if doc_defaults is not None:
+            defaults.update(self._own(doc_defaults.find('%s/%s' % (_w('rPrDefault'), _w('rPr'))),
+                                      doc_defaults.find('%s/%s' % (_w('pPrDefault'), _w('pPr')))))
+        self.defaults = defaults
+
+    @staticmethod
+    def _own(rPr, pPr):
+        values = {}
+        if rPr is not None:
+            size = rPr.find(_w('sz'))
+            if size is not None:
+                values['size'] = int(size.get(_w('val'))) / 2
+        spacing = pPr.find(_w('spacing')) if pPr is not None else None
+        if spacing is not None:
+            for key in ('before', 'after'):
+                if spacing.get(_w(key)) is not None:
+                    values[key] = int(spacing.get(_w(key))) / _TWIPS_PER_PT
+            if spacing.get(_w('line')) is not None and spacing.get(_w('lineRule'), 'auto') == 'auto':
+                values['line'] = int(spacing.get(_w('line'))) / 240
+        return values
+
+    def own(self, style_id):
+        """Values set by `style_id` and its ancestors only (no document defaults)"""
+        if style_id not in self._resolved:
+            style = self._styles.get(style_id)
+            values = {}
+            if style is not None:
+                self._resolved[style_id] = values  # guards against basedOn cycles
+                based_on = style.find(_w('basedOn'))
+                if based_on is not None:
+                    values.update(self.own(based_on.get(_w('val'))))
+                values.update(self._own(style.find(_w('rPr')), style.find(_w('pPr'))))
+            self._resolved[style_id] = values
+        return self._resolved[style_id]
+
+    def paragraph(self, style_id, table_style=None):
+        values = dict(self.defaults, **self.own('Normal'))
+        if table_style is not None:
+            values.update(self.own(table_style))
+        if style_id is not None:
+            values.update(self.own(style_id))
+        return values
+
+
+def _paragraph_lines(p, width, size):
+    """Text lines, picture heights (pt), whether there is a page break, and whether the text is monospaced"""
+    lines = []
+    chars = 0
+    pictures = 0.0
+    page_break = False
+    char_width = size * 0.5
+    monospace = False
+    for element in p.iter(_w('t'), _w('tab'), _w('br'), _w('cr'), _w('rFonts'),
+                          '{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}extent'):
+        tag = element.tag
+        if tag == _w('t'):
+            chars += len(element.text or '')
+        elif tag == _w('tab'):
+            if element.getparent().tag == _w('r'):
+                chars += 4
+        elif tag == _w('rFonts'):
+            if element.get(_w('ascii')) == 'Courier New':
+                char_width, monospace = size * 0.6, True
+        elif tag in (_w('br'), _w('cr')):
+            if element.get(_w('type')) == 'page':
+                page_break = True
+            else:
+                lines.append(chars)
+                chars = 0
+        else:
+            pictures += int(element.get('cy', 0)) / _EMU_PER_PT
+    lines.append(chars)
+    per_line = max(1, int(width / char_width))
+    count = sum(max(1, math.ceil(n / per_line)) for n in lines)
+    if page_break and not any(lines) and not pictures:
+        count = 0
+    return count, pictures, page_break, monospace
+
+
+def _run_size(p, default):
+    size = p.find('.//%s/%s' % (_w('rPr'), _w('sz')))
+    return int(size.get(_w('val'))) / 2 if size is not None else default
+
+
+def _paragraph_height(p, metrics, width, table_style=None):
+    style = p.find('%s/%s' % (_w('pPr'), _w('pStyle')))
+    values = metrics.paragraph(None if style is None else style.get(_w('val')), table_style)
+    size = _run_size(p, values['size'])
+    count, pictures, page_break, monospace = _paragraph_lines(p, width, size)
+    line = size * (_MONO_LINE if monospace else _TEXT_LINE) * values['line']
+    height = values['before'] + values['after'] + count * line + pictures
+    return height, page_break
+
+
+def _plain_length(p, r_tag, t_tag):
+    """Text length of a paragraph made of at most one bare run holding one `w:t`, else None"""
+    if len(p) == 0:
+        return 0
+    if len(p) != 1:
+        return None
+    r = p[0]
+    if r.tag != r_tag or len(r) != 1 or r[0].tag != t_tag:
+        return None
+    return len(r[0].text or '')
+
+
+def _table_rows(tbl, metrics, width, rows=None):
+    """Estimated height of each row of a table (or of those of its `rows`), in points"""
+    style = tbl.find('%s/%s' % (_w('tblPr'), _w('tblStyle')))
+    table_style = None if style is None else style.get(_w('val'))
+    columns = max(1, len(tbl.findall('%s/%s' % (_w('tblGrid'), _w('gridCol')))))
+    tc_tag, p_tag, r_tag, t_tag = _w('tc'), _w('p'), _w('r'), _w('t')
+    tcw_path = '%s/%s' % (_w('tcPr'), _w('tcW'))
+    type_attr, w_attr = _w('type'), _w('w')
+    # Bulk-built cells are one unformatted run of plain text, so their height
+    # depends only on the text length and the column width
+    plain_heights = {}
+    heights = []
+    for tr in tbl.iter(_w('tr')) if rows is None else rows:
+        row = 0.0
+        for tc in tr.iterchildren(tc_tag):
+            cell_width = tc.find(tcw_path)
+            if cell_width is not None and cell_width.get(type_attr) == 'dxa':
+                text_width = int(cell_width.get(w_attr)) / _TWIPS_PER_PT - 10.8
+            else:
+                text_width = width / columns - 10.8
+            cell = 0.0
+            for p in tc.iterchildren(p_tag):
+                length = _plain_length(p, r_tag, t_tag)
+                if length is None:
+                    cell += _paragraph_height(p, metrics, text_width, table_style)[0]
+                    continue
+                key = (length, text_width)
+                height = plain_heights.get(key)
+                if height is None:
+                    height = plain_heights[key] = _paragraph_height(p, metrics, text_width, table_style)[0]
+                cell += height
+            if cell > row:
+                row = cell
+        heights.append(row + 1)
+    return heights
+
+
+class PageEstimator:
+    """Running page count over top-level body blocks (or streamed table rows) added in document order
+
+    Paragraphs and table rows are measured from their style's font size
+    and spacing, and a block that does not fit on the current page starts
+    the next one.
+    """
+
+    def __init__(self, doc):
+        section = doc.sections[0]
+        self.width = (section.page_width - section.left_margin - section.right_margin) / _EMU_PER_PT
+        self.height = (section.page_height - section.top_margin - section.bottom_margin) / _EMU_PER_PT
+        self.metrics = _StyleMetrics(doc)
+        self.page, self.used = 1, 0.0
+
+    def add(self, block):
+        """Count `block` in; returns the page a paragraph is estimated to start on"""
+        if block.tag == _w('p'):
+            block_height, page_break = _paragraph_height(block, self.metrics, self.width)
+            if self.used and self.used + block_height > self.height:
+                self.page, self.used = self.page + 1, 0.0
+            page = self.page
+            self.used += block_height
+            if page_break:
+                self.page, self.used = self.page + 1, 0.0
+            return page
+        if block.tag == _w('tbl'):
+            rows = _table_rows(block, self.metrics, self.width)
+        elif block.tag == _w('tr'):
+            # A row streamed on its own, still in its table (with its style and grid)
+            rows = _table_rows(block.getparent(), self.metrics, self.width, block.iter(_w('tr')))
+        else:
+            return None
+        for row in rows:
+            if self.used and self.used + row > self.height:
+                self.page, self.used = self.page + 1, 0.0
+            self.used += row
+        return None
+
+
+def estimate_pages(doc, targets=()):
+    """Estimated page number of each of `targets` (top-level body blocks), in one pass over the body"""
+    estimator = PageEstimator(doc)
+    wanted = set(targets)
+    pages = {}
+    for block in doc.element.body:
+        page = estimator.add(block)
+        if block in wanted:
+            pages[block] = page
+    return pages
@@ -0,0 +1,168 @@
+"""Per-section profiling: wall time, XML element counts and tracemalloc peaks
+
+Tracing is off unless `enable()` is called. While it is off, `span()`
+returns a shared no-op context and `traced` helpers make one global lookup
+before calling straight through, so the instrumentation can stay in place.
+
+    tracer = trace.enable()
+    ... build ...
+    trace.disable()
+    tracer.write_json('profile.json')
+    tracer.write_chrome_trace('trace.json')   # chrome://tracing, Perfetto
+"""
+
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+_NULL = nullcontext()
+_tracer = None
+
+
+def active():
+    """The running Tracer, or None"""
+    return _tracer
+
+
+def enable(memory=True):
+    """Start recording; `memory` also tracks tracemalloc peaks for section spans"""
+    global _tracer
+    _tracer = Tracer(memory)
+    return _tracer
+
+
+def disable():
+    """Stop recording; returns the tracer that was running"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+    return tracer
+
+
+def span(name, category, memory=False):
+    """Context for a timed span; yields its event dict, or None when tracing is off"""
+    if _tracer is None:
+        return _NULL
+    return _tracer.span(name, category, memory)
+
+
+def traced(category):
+    """Decorator recording every call of a helper as a span"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.span(func.__name__, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count_elements(blocks):
+    return sum(1 for block in blocks for _ in block.iter())
+
+
+class Tracer:
+    """Completed spans, in the order they finished"""
+
+    def __init__(self, memory=True):
+        import tracemalloc
+
+        self._tracemalloc = tracemalloc
+        self.events = []
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self._stack = []
+        self._owns_tracemalloc = memory and not tracemalloc.is_tracing()
+        self.memory = memory
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+
+    def close(self):
+        if self._owns_tracemalloc:
+            self._tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    @contextmanager
+    def span(self, name, category, memory=False):
+        tracemalloc = self._tracemalloc
+        memory = memory and self.memory and tracemalloc.is_tracing()
+        section = next((outer['name'] for outer in reversed(self._stack) if outer['cat'] == 'section'), None)
+        event = {'name': name, 'cat': category, 'args': {}, 'section': section}
+        if memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        self._stack.append(event)
+        start = time.perf_counter()
+        try:
+            yield event
+        finally:
+            end = time.perf_counter()
+            self._stack.pop()
+            event['ts'] = start - self.origin
+            event['dur'] = end - start
+            if memory:
+                event['args']['tracemalloc_peak_bytes'] = tracemalloc.get_traced_memory()[1] - base
+            self.events.append(event)
+
+    def summary(self):
+        """Per-section totals with a breakdown of the helper calls made inside each section"""
+        sections = {}
+        for event in self.events:
+            if event['cat'] == 'section':
+                sections[event['name']] = dict(event['args'], seconds=event['dur'], helpers={})
+        other = {}
+        for event in self.events:
+            if event['cat'] == 'section':
+                continue
+            owner = sections.get(event['section'], {}).get('helpers', other)
+            totals = owner.setdefault(event['name'], {'calls': 0, 'seconds': 0.0})
+            totals['calls'] += 1
+            totals['seconds'] += event['dur']
+        for section in sections.values():
+            # Time not spent in helpers: headings, paragraphs, cache splicing
+            section['self_seconds'] = section['seconds'] - sum(
+                helper['seconds'] for helper in section['helpers'].values())
+        return {'sections': sections, 'other': other,
+                'total_seconds': sum(section['seconds'] for section in sections.values())
+                + sum(helper['seconds'] for helper in other.values())}
+
+    def chrome_trace(self):
+        """Trace Event Format: one complete ('X') event per span"""
+        events = [{
+            'name': event['name'],
+            'cat': event['cat'],
+            'ph': 'X',
+            'ts': round(event['ts'] * 1e6, 3),
+            'dur': round(event['dur'] * 1e6, 3),
+            'pid': self.pid,
+            'tid': 1,
+            'args': event['args'],
+        } for event in sorted(self.events, key=lambda event: event['ts'])]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def report(self):
+        lines = ['%-28s %9s %9s %9s %10s' % ('section', 'seconds', 'self', 'elements', 'peak KiB')]
+        summary = self.summary()
+        for name, section in summary['sections'].items():
+            peak = section.get('tracemalloc_peak_bytes')
+            lines.append('%-28s %9.4f %9.4f %9s %10s' % (
+                name, section['seconds'], section['self_seconds'], section.get('elements', ''),
+                '' if peak is None else '%.0f' % (peak / 1024)))
+            for helper, totals in sorted(section['helpers'].items()):
+                lines.append('  %-26s %9.4f %9s %9s' % (helper, totals['seconds'], '', '%d calls' % totals['calls']))
+        for helper, totals in sorted(summary['other'].items()):
+            lines.append('%-28s %9.4f' % (helper, totals['seconds']))
+        return '\n'.join(lines)
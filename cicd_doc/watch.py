@@ -0,0 +1,79 @@
+"""Watch the project sources and rebuild when they change
+
+Polls the mtime and size of every ingested source (the manifests, the
+Jenkinsfile, the workflow, the backend's JavaScript, the uploaded images
+and the `.env` files the redactor takes its secrets from) instead of depending on a file-notification package. A burst of
+saves is debounced: the rebuild starts once the files have stayed
+unchanged for `debounce` seconds. The process stays warm between rebuilds, so python-docx, the
+parse cache and the unchanged sections' fragments are all reused.
+"""
+
+import os
+import threading
+
+from . import express
+from .images import image_files
+from .ingest import IMAGE_DIRS, SOURCES
+from .redact import ENV_FILES
+
+POLL_INTERVAL = 0.1
+DEBOUNCE = 0.2
+
+
+def watched_files(root):
+    """Every file ingestion reads under `root`; directories are expanded to their sources"""
+    paths = []
+    for relative in SOURCES.values():
+        path = os.path.join(root, relative)
+        if os.path.isdir(path):
+            paths.extend(express.source_files(path))
+        else:
+            paths.append(path)
+    for directory in IMAGE_DIRS:
+        paths.extend(image_files(os.path.join(root, directory)))
+    # Their values are part of every fragment key; a missing one is watched for being created
+    paths.extend(os.path.join(root, relative) for relative in ENV_FILES)
+    return paths
+
+
+def snapshot(paths):
+    """{path: (mtime_ns, size)}; missing files map to None"""
+    state = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            state[path] = None
+        else:
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def changed_paths(before, after):
+    return sorted(path for path in set(before) | set(after) if before.get(path) != after.get(path))
+
+
+def watch(rebuild, paths, interval=POLL_INTERVAL, debounce=DEBOUNCE, stop=None):
+    """Call `rebuild(changed)` after each settled burst of changes until `stop` is set
+
+    `paths` is called on every poll, so files added to a watched directory
+    are picked up. Errors raised by `rebuild` propagate; callers that want
+    to keep watching catch them.
+    """
+    stop = stop or threading.Event()
+    current = snapshot(paths())
+    while not stop.wait(interval):
+        latest = snapshot(paths())
+        if latest == current:
+            continue
+        while not stop.wait(debounce):
+            settled = snapshot(paths())
+            if settled == latest:
+                break
+            latest = settled
+        else:
+            return
+        changed = changed_paths(current, latest)
+        # Saves made while rebuilding differ from `current` and trigger the next rebuild
+        current = latest
+        rebuild(changed)
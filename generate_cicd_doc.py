@@ -1,13 +1,36 @@
-from docx import Document
-from docx.shared import Inches, Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.enum.style import WD_STYLE_TYPE
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-
+"""Generate the SoundPlus++ CI/CD documentation (.docx, HTML or Markdown)
+
+python-docx is imported lazily: --list-sections, --check and the HTML and
+Markdown formats never load it.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections.abc import Iterator
+
+from cicd_doc.config import BuildConfig
+from cicd_doc import diagrams, images, trace
+from cicd_doc.diagrams import load_diagram
+from cicd_doc.filecache import ParseCache
+from cicd_doc.ingest import SOURCES, ingest
+from cicd_doc.model import CENTER, build_model
+from cicd_doc.sections import DEFAULT_CACHE_DIR, FragmentCache, Section, fragment_key, render_sections
+from cicd_doc.trace import traced
+
+DEFAULT_OUTPUT = 'SoundPlus_CICD_Documentation.docx'
+# Output format by file extension; anything else is a .docx
+FORMATS = {'.html': 'html', '.htm': 'html', '.md': 'md', '.markdown': 'md'}
+EXTENSIONS = {'docx': '.docx', 'html': '.html', 'md': '.md'}
+SOURCE_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+@traced('table')
 def set_cell_shading(cell, color):
     """Set cell background color"""
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
     shading_elm = OxmlElement('w:shd')
     shading_elm.set(qn('w:fill'), color)
     cell._tc.get_or_add_tcPr().append(shading_elm)
@@ -19,104 +42,18 @@ def add_heading_with_style(doc, text, level):
 
 def create_table_with_header(doc, headers, rows, col_widths=None):
     """Create a formatted table"""
-    table = doc.add_table(rows=1, cols=len(headers))
-    table.style = 'Table Grid'
-
-    # Header row
-    header_cells = table.rows[0].cells
-    for i, header in enumerate(headers):
-        header_cells[i].text = header
-        set_cell_shading(header_cells[i], '2E86AB')
-        for paragraph in header_cells[i].paragraphs:
-            for run in paragraph.runs:
-                run.font.bold = True
-                run.font.color.rgb = RGBColor(255, 255, 255)
-
-    # Data rows
-    for row_data in rows:
-        row = table.add_row().cells
-        for i, cell_data in enumerate(row_data):
-            row[i].text = str(cell_data)
-
-    return table
-
-# Create document
-doc = Document()
-
-# Title
-title = doc.add_heading('SoundPlus++ Project', 0)
-title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-subtitle = doc.add_paragraph('CI/CD Pipeline Design and Automation Documentation')
-subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
-for run in subtitle.runs:
-    run.font.size = Pt(14)
-    run.font.italic = True
-
-# Project info
-info = doc.add_paragraph()
-info.alignment = WD_ALIGN_PARAGRAPH.CENTER
-info.add_run('Premium Audio Equipment E-commerce Platform\n').bold = True
-info.add_run('MERN Stack Application with Docker Containerization\n')
-info.add_run('Version 1.0 | January 2026')
-
-doc.add_page_break()
-
-# Table of Contents
-doc.add_heading('Table of Contents', 1)
-
-toc_items = [
-    ('1. Introduction', '3'),
-    ('   1.1 Project Overview', '3'),
-    ('   1.2 Technology Stack Summary', '3'),
-    ('2. Part 1: CI/CD Design Diagram', '4'),
-    ('   2.1 Architecture Overview Diagram', '4'),
-    ('   2.2 CI/CD Pipeline Flow Diagram', '5'),
-    ('   2.3 Container Architecture Diagram', '6'),
-    ('   2.4 Component Connectivity Diagram', '7'),
-    ('   2.5 Diagram Explanation', '8'),
-    ('3. Part 2: Automation Approach', '10'),
-    ('   3.1 DevOps Tools and Versions', '10'),
-    ('   3.2 Application Tools and Dependencies', '11'),
-    ('   3.3 Jenkins Pipeline Stages', '13'),
-    ('   3.4 GitHub Actions Pipeline', '14'),
-    ('   3.5 Deployment Automation Flow', '15'),
-    ('4. Environment Configuration', '16'),
-    ('5. Security Considerations', '17'),
-    ('6. Conclusion', '18'),
-]
-
-for item, page in toc_items:
-    p = doc.add_paragraph()
-    p.add_run(item)
-    tab_stops = p.paragraph_format.tab_stops
-    tab_stops.add_tab_stop(Inches(6))
-    p.add_run('\t' + page)
-
-doc.add_page_break()
+    from cicd_doc.docx_writer import write_table
 
-# Section 1: Introduction
-doc.add_heading('1. Introduction', 1)
+    return write_table(doc, headers, rows)
 
-doc.add_heading('1.1 Project Overview', 2)
-doc.add_paragraph(
-    'SoundPlus++ is a premium audio equipment e-commerce platform built using the MERN stack '
-    '(MongoDB, Express.js, React, Node.js). The application provides a comprehensive online '
-    'shopping experience for audio enthusiasts, featuring product catalog management, user '
-    'authentication, shopping cart functionality, and order processing.'
-)
+def add_diagram(doc, text, diagram_format='text'):
+    """Add a centered Courier New diagram paragraph, or the diagram rasterized as a PNG"""
+    from cicd_doc.docx_writer import write_diagram
 
-doc.add_paragraph(
-    'This document outlines the CI/CD (Continuous Integration/Continuous Deployment) design '
-    'and automation approach implemented for the SoundPlus++ application, ensuring reliable '
-    'and efficient software delivery.'
-)
+    return write_diagram(doc, text, diagram_format)
 
-doc.add_heading('1.2 Technology Stack Summary', 2)
+# Document data
 
-stack_data = [
-    ('Layer', 'Technology', 'Version'),
-]
 stack_rows = [
     ('Frontend Framework', 'React', '18.3.1'),
     ('Build Tool', 'Vite', '6.0.5'),
@@ -130,346 +67,6 @@ stack_rows = [
     ('Version Control', 'Git/GitHub', 'Latest'),
 ]
 
-create_table_with_header(doc, ['Layer', 'Technology', 'Version'], stack_rows)
-
-doc.add_page_break()
-
-# Section 2: Part 1 - CI/CD Design Diagram
-doc.add_heading('2. Part 1: CI/CD Design Diagram', 1)
-
-doc.add_heading('2.1 Architecture Overview Diagram', 2)
-
-doc.add_paragraph(
-    'The following diagram illustrates the complete CI/CD architecture for the SoundPlus++ '
-    'application, showing all major components and their interconnections.'
-)
-
-# ASCII Diagram 1: Architecture Overview
-diagram1 = doc.add_paragraph()
-diagram1.alignment = WD_ALIGN_PARAGRAPH.CENTER
-diagram1_text = '''
-+============================================================================+
-|                    SOUNDPLUS++ CI/CD ARCHITECTURE                          |
-+============================================================================+
-
-    +---------------+          +------------------+          +---------------+
-    |   DEVELOPER   |  push    |     GITHUB       |  webhook |    JENKINS    |
-    |   Workstation |--------->|   Repository     |--------->|    Server     |
-    +---------------+          +------------------+          +---------------+
-          |                           |                            |
-          |                           | trigger                    | build
-          v                           v                            v
-    +---------------+          +------------------+          +---------------+
-    |   Local Dev   |          |  GitHub Actions  |          |   Docker      |
-    |   Environment |          |   CI Pipeline    |          |   Build       |
-    +---------------+          +------------------+          +---------------+
-                                      |                            |
-                                      | push                       | push
-                                      v                            v
-                               +------------------+          +---------------+
-                               |   DOCKER HUB     |<---------|   Docker      |
-                               |   Registry       |          |   Images      |
-                               +------------------+          +---------------+
-                                      |
-                                      | pull
-                                      v
-                   +------------------------------------------+
-                   |           DEPLOYMENT TARGET              |
-                   |  +----------------+  +----------------+  |
-                   |  |   AWS EC2      |  |   Local VMs    |  |
-                   |  |   Instance     |  |   (Docker)     |  |
-                   |  +----------------+  +----------------+  |
-                   +------------------------------------------+
-                                      |
-                                      v
-                   +------------------------------------------+
-                   |              DOCKER HOST                 |
-                   |  +----------------+  +----------------+  |
-                   |  |   Frontend     |  |   Backend      |  |
-                   |  |   Container    |  |   Container    |  |
-                   |  |   (Port 3000)  |  |   (Port 5000)  |  |
-                   |  +----------------+  +----------------+  |
-                   |             |              |             |
-                   |             +------+-------+             |
-                   |                    v                     |
-                   |           +----------------+             |
-                   |           | MongoDB Atlas  |             |
-                   |           |   (Cloud DB)   |             |
-                   |           +----------------+             |
-                   +------------------------------------------+
-'''
-for run in diagram1.runs:
-    run.font.name = 'Courier New'
-    run.font.size = Pt(8)
-diagram1.add_run(diagram1_text)
-for run in diagram1.runs:
-    run.font.name = 'Courier New'
-    run.font.size = Pt(8)
-
-doc.add_paragraph('Figure 2.1: SoundPlus++ CI/CD Architecture Overview')
-
-doc.add_page_break()
-
-doc.add_heading('2.2 CI/CD Pipeline Flow Diagram', 2)
-
-doc.add_paragraph(
-    'This diagram shows the detailed flow of the CI/CD pipeline from code commit to deployment.'
-)
-
-diagram2 = doc.add_paragraph()
-diagram2.alignment = WD_ALIGN_PARAGRAPH.CENTER
-diagram2_text = '''
-+============================================================================+
-|                      CI/CD PIPELINE FLOW DIAGRAM                           |
-+============================================================================+
-
-  [Developer]
-       |
-       | git push
-       v
-  +----------+     +----------+     +----------+     +----------+
-  |  COMMIT  |---->|  GITHUB  |---->| WEBHOOK  |---->| JENKINS  |
-  |   Code   |     |   Repo   |     | Trigger  |     |  Server  |
-  +----------+     +----------+     +----------+     +----------+
-                                                           |
-       +---------------------------------------------------+
-       |
-       v
-  +============================================================================+
-  |                         JENKINS PIPELINE STAGES                            |
-  +============================================================================+
-  |                                                                            |
-  |  Stage 1         Stage 2          Stage 3         Stage 4                  |
-  |  +---------+     +-----------+    +----------+    +------------+           |
-  |  |CHECKOUT |---->|PRE-FLIGHT |---->| SETUP   |---->|   BUILD   |           |
-  |  |  Code   |     |  Check    |    |   ENV    |    |  Images   |           |
-  |  +---------+     +-----------+    +----------+    +------------+           |
-  |                                                          |                 |
-  |                                                          v                 |
-  |  Stage 7         Stage 6          Stage 5                                  |
-  |  +---------+     +-----------+    +------------+                           |
-  |  | SUCCESS |<----|  VERIFY   |<---|   START    |                           |
-  |  | Report  |     | Services  |    |  Services  |                           |
-  |  +---------+     +-----------+    +------------+                           |
-  |                                                                            |
-  +============================================================================+
-       |
-       v
-  +----------+     +----------+     +----------+
-  | DOCKER   |---->| HEALTH   |---->| DEPLOY   |
-  | Registry |     |  Check   |     | Complete |
-  +----------+     +----------+     +----------+
-'''
-diagram2.add_run(diagram2_text)
-for run in diagram2.runs:
-    run.font.name = 'Courier New'
-    run.font.size = Pt(8)
-
-doc.add_paragraph('Figure 2.2: CI/CD Pipeline Flow')
-
-doc.add_page_break()
-
-doc.add_heading('2.3 Container Architecture Diagram', 2)
-
-doc.add_paragraph(
-    'The following diagram illustrates the Docker container architecture and internal '
-    'connectivity of the SoundPlus++ application.'
-)
-
-diagram3 = doc.add_paragraph()
-diagram3.alignment = WD_ALIGN_PARAGRAPH.CENTER
-diagram3_text = '''
-+============================================================================+
-|                   CONTAINER ARCHITECTURE DIAGRAM                           |
-+============================================================================+
-
-                            DOCKER HOST
-+------------------------------------------------------------------------+
-|                                                                        |
-|   soundplus-network (bridge)                                           |
-|   +----------------------------------------------------------------+   |
-|   |                                                                |   |
-|   |  +------------------------+      +------------------------+    |   |
-|   |  |  soundplus-frontend    |      |  soundplus-backend     |    |   |
-|   |  |  Container             |      |  Container             |    |   |
-|   |  +------------------------+      +------------------------+    |   |
-|   |  |                        |      |                        |    |   |
-|   |  |  +------------------+  |      |  +------------------+  |    |   |
-|   |  |  |   React App      |  |      |  |   Express.js     |  |    |   |
-|   |  |  |   (Vite Dev)     |  | HTTP |  |   REST API       |  |    |   |
-|   |  |  |                  |<-|------|->|                  |  |    |   |
-|   |  |  |   Port: 3000     |  |      |  |   Port: 5000     |  |    |   |
-|   |  |  +------------------+  |      |  +------------------+  |    |   |
-|   |  |                        |      |         |              |    |   |
-|   |  |  Node.js 18-slim       |      |  Node.js 18-slim       |    |   |
-|   |  +------------------------+      +------------------------+    |   |
-|   |           |                               |                    |   |
-|   +-----------|-------------------------------|--------------------+   |
-|               |                               |                        |
-+---------------|-------------------------------|------------------------+
-                |                               |
-                v                               v
-        +---------------+              +-----------------+
-        |   User        |              |  MongoDB Atlas  |
-        |   Browser     |              |  Cloud Database |
-        |   :3000       |              |  (Sound_lk)     |
-        +---------------+              +-----------------+
-
-+------------------------------------------------------------------------+
-|   VOLUME MOUNTS                                                        |
-|   +------------------------+                                           |
-|   |  backend-uploads       | --> /app/uploads (Product Images)         |
-|   +------------------------+                                           |
-+------------------------------------------------------------------------+
-'''
-diagram3.add_run(diagram3_text)
-for run in diagram3.runs:
-    run.font.name = 'Courier New'
-    run.font.size = Pt(8)
-
-doc.add_paragraph('Figure 2.3: Docker Container Architecture')
-
-doc.add_page_break()
-
-doc.add_heading('2.4 Component Connectivity Diagram', 2)
-
-doc.add_paragraph(
-    'This diagram details the connectivity between all application components '
-    'including frontend, backend, database, and external services.'
-)
-
-diagram4 = doc.add_paragraph()
-diagram4.alignment = WD_ALIGN_PARAGRAPH.CENTER
-diagram4_text = '''
-+============================================================================+
-|                    COMPONENT CONNECTIVITY DIAGRAM                          |
-+============================================================================+
-
-   +------------------+                              +------------------+
-   |     CLIENT       |                              |   ADMIN PANEL    |
-   |     BROWSER      |                              |    (React)       |
-   +--------+---------+                              +--------+---------+
-            |                                                 |
-            |  HTTP (Port 3000)                              |
-            +---------------------+     +---------------------+
-                                  |     |
-                                  v     v
-                         +------------------+
-                         |    FRONTEND      |
-                         |    CONTAINER     |
-                         +------------------+
-                         |  React 18.3.1    |
-                         |  Vite 6.0.5      |
-                         |  react-router    |
-                         |  axios           |
-                         +--------+---------+
-                                  |
-                                  | REST API Calls
-                                  | (axios -> http://backend:5000)
-                                  |
-                                  v
-                         +------------------+
-                         |    BACKEND       |
-                         |    CONTAINER     |
-                         +------------------+
-                         |  Express 4.21.2  |
-                         |  JWT Auth        |
-                         |  Multer          |
-                         |  Mongoose 8.0.0  |
-                         +--------+---------+
-                                  |
-                +-----------------|------------------+
-                |                 |                  |
-                v                 v                  v
-      +-------------+    +---------------+    +-------------+
-      | /api/auth   |    | /api/products |    | /api/orders |
-      | Routes      |    | Routes        |    | Routes      |
-      +-------------+    +---------------+    +-------------+
-                |                 |                  |
-                +-----------------|------------------+
-                                  |
-                                  | MongoDB Driver
-                                  | (mongoose)
-                                  v
-                         +------------------+
-                         |  MONGODB ATLAS   |
-                         |  Cloud Database  |
-                         +------------------+
-                         |  Database:       |
-                         |  Sound_lk        |
-                         +------------------+
-                         |  Collections:    |
-                         |  - users         |
-                         |  - products      |
-                         |  - carts         |
-                         |  - orders        |
-                         +------------------+
-'''
-diagram4.add_run(diagram4_text)
-for run in diagram4.runs:
-    run.font.name = 'Courier New'
-    run.font.size = Pt(8)
-
-doc.add_paragraph('Figure 2.4: Application Component Connectivity')
-
-doc.add_page_break()
-
-doc.add_heading('2.5 Diagram Explanation', 2)
-
-doc.add_paragraph(
-    'The CI/CD architecture for SoundPlus++ consists of the following key components and their interactions:'
-)
-
-doc.add_heading('Git Tools - GitHub', 3)
-doc.add_paragraph(
-    'GitHub serves as the central version control system for the SoundPlus++ project. '
-    'The repository (https://github.com/Thiwankabanadara5400/Soundplus.git) hosts all source code, '
-    'Docker configurations, and CI/CD pipeline definitions. Developers push code changes to the '
-    'main branch, which triggers the automated CI/CD pipelines.'
-)
-
-doc.add_heading('CI Tool - Jenkins', 3)
-doc.add_paragraph(
-    'Jenkins is configured as the local CI/CD orchestrator. When code is pushed to GitHub, '
-    'a webhook triggers the Jenkins pipeline defined in the Jenkinsfile. Jenkins performs '
-    'code checkout, environment setup, Docker image building, and service deployment. '
-    'The pipeline includes health checks to verify successful deployment.'
-)
-
-doc.add_heading('Configuration Management - Environment Variables', 3)
-doc.add_paragraph(
-    'Environment configuration is managed through .env files for both frontend and backend services. '
-    'The Jenkins pipeline automatically creates these environment files during the Setup Environment stage, '
-    'ensuring consistent configuration across deployments.'
-)
-
-doc.add_heading('Containerization - Docker', 3)
-doc.add_paragraph(
-    'Docker provides containerization for both frontend and backend applications. Each service '
-    'has its own Dockerfile that defines the build process using Node.js 18-slim as the base image. '
-    'Docker Compose orchestrates the multi-container deployment, managing networking between containers '
-    'and volume mounts for persistent data storage.'
-)
-
-doc.add_heading('Container Connectivity', 3)
-doc.add_paragraph(
-    'The frontend and backend containers communicate over a Docker bridge network (soundplus-network). '
-    'The frontend container (port 3000) makes REST API calls to the backend container (port 5000) using axios. '
-    'The backend container connects to MongoDB Atlas for data persistence. All inter-service communication '
-    'is secured within the Docker network.'
-)
-
-doc.add_page_break()
-
-# Section 3: Part 2 - Automation Approach
-doc.add_heading('3. Part 2: Automation Approach', 1)
-
-doc.add_heading('3.1 DevOps Tools and Versions', 2)
-
-doc.add_paragraph(
-    'The following table describes all DevOps tools used in the SoundPlus++ deployment pipeline:'
-)
-
 devops_rows = [
     ('Git', '2.x', 'Version control system for source code management and collaboration'),
     ('GitHub', 'Cloud', 'Remote repository hosting, pull requests, and code review'),
@@ -483,14 +80,6 @@ devops_rows = [
     ('AWS EC2', 'Cloud', 'Cloud virtual machine instances for production deployment (optional)'),
 ]
 
-create_table_with_header(doc, ['Tool', 'Version', 'Purpose'], devops_rows)
-
-doc.add_page_break()
-
-doc.add_heading('3.2 Application Tools and Dependencies', 2)
-
-doc.add_heading('Frontend Dependencies', 3)
-
 frontend_rows = [
     ('react', '18.3.1', 'Core UI library for building component-based interfaces'),
     ('react-dom', '18.3.1', 'React DOM rendering engine'),
@@ -504,11 +93,6 @@ frontend_rows = [
     ('eslint', '9.17.0', 'JavaScript linter for code quality enforcement'),
 ]
 
-create_table_with_header(doc, ['Package', 'Version', 'Purpose'], frontend_rows)
-
-doc.add_paragraph()
-doc.add_heading('Backend Dependencies', 3)
-
 backend_rows = [
     ('express', '4.21.2', 'Web framework for building REST API server'),
     ('mongoose', '8.0.0', 'MongoDB ODM for database modeling and queries'),
@@ -522,39 +106,52 @@ backend_rows = [
     ('nodemon', '3.1.9', 'Development tool for auto-reloading on file changes'),
 ]
 
-create_table_with_header(doc, ['Package', 'Version', 'Purpose'], backend_rows)
-
-doc.add_page_break()
-
-doc.add_heading('Database Configuration', 3)
-
 db_rows = [
     ('MongoDB Atlas', 'Cloud', 'Cloud-hosted MongoDB database service'),
     ('Database Name', 'Sound_lk', 'Main application database'),
     ('Connection', 'MongoDB Driver', 'mongoose ODM for Node.js'),
 ]
 
-create_table_with_header(doc, ['Component', 'Value', 'Description'], db_rows)
-
-doc.add_paragraph()
-doc.add_heading('Database Collections', 3)
-
 collections_rows = [
     ('users', 'username, email, password, role, createdAt', 'User authentication and profiles'),
+    ('categories', 'name, description, image, isActive, order, createdAt', 'Product categories'),
     ('products', 'name, price, category, brand, features, etc.', 'Product catalog information'),
     ('carts', 'userId, productId, quantity', 'Shopping cart items'),
     ('orders', 'userId, items, totalAmount, status, shippingAddress', 'Order records'),
 ]
 
-create_table_with_header(doc, ['Collection', 'Fields', 'Purpose'], collections_rows)
-
-doc.add_page_break()
-
-doc.add_heading('3.3 Jenkins Pipeline Stages', 2)
-
-doc.add_paragraph(
-    'The Jenkins pipeline (Jenkinsfile) automates the deployment process through the following stages:'
-)
+endpoint_rows = [
+    ('POST', '/register', '-', ''),
+    ('POST', '/login', '-', ''),
+    ('POST', '/logout', '-', ''),
+    ('GET', '/payment-config', '-', ''),
+    ('POST', '/create-payment-intent', 'authenticateToken', ''),
+    ('POST', '/confirm-payment', 'authenticateToken', ''),
+    ('GET', '/categories', '-', ''),
+    ('GET', '/categories/:id', '-', ''),
+    ('POST', '/categories', 'authenticateToken, isAdmin', 'image (single)'),
+    ('PUT', '/categories/:id', 'authenticateToken, isAdmin', 'image (single)'),
+    ('DELETE', '/categories/:id', 'authenticateToken, isAdmin', ''),
+    ('GET', '/products', '-', ''),
+    ('GET', '/products/:id', '-', ''),
+    ('POST', '/add-product', 'authenticateToken, isAdmin', 'image (single)'),
+    ('PUT', '/update-product/:id', 'authenticateToken, isAdmin', 'image (single)'),
+    ('PUT', '/products/:id/visibility', 'authenticateToken, isAdmin', ''),
+    ('DELETE', '/delete-product/:id', 'authenticateToken, isAdmin', ''),
+    ('GET', '/cart/:userId', 'authenticateToken', ''),
+    ('POST', '/add-to-cart', 'authenticateToken', ''),
+    ('PUT', '/cart/:userId/:productId', 'authenticateToken', ''),
+    ('DELETE', '/cart/:userId/:productId', 'authenticateToken', ''),
+    ('DELETE', '/cart/:userId', 'authenticateToken', ''),
+    ('POST', '/orders', 'authenticateToken', ''),
+    ('GET', '/orders/:userId', 'authenticateToken', ''),
+    ('GET', '/orders', 'authenticateToken, isAdmin', ''),
+    ('PUT', '/orders/:orderId', 'authenticateToken, isAdmin', ''),
+    ('GET', '/admin/stats', 'authenticateToken, isAdmin', ''),
+    ('GET', '/admin/users', 'authenticateToken, isAdmin', ''),
+    ('GET', '/admin/carts', 'authenticateToken, isAdmin', ''),
+    ('GET', '/health', '-', ''),
+]
 
 pipeline_rows = [
     ('1', 'Checkout', 'Clones the source code from GitHub repository (main branch)'),
@@ -566,11 +163,6 @@ pipeline_rows = [
     ('7', 'Success', 'Displays deployment information and access URLs'),
 ]
 
-create_table_with_header(doc, ['Stage', 'Name', 'Description'], pipeline_rows)
-
-doc.add_paragraph()
-doc.add_heading('Jenkins Pipeline Configuration', 3)
-
 config_rows = [
     ('COMPOSE_PROJECT_NAME', 'soundplus', 'Docker Compose project identifier'),
     ('PROJECT_NAME', 'SoundPlus++', 'Display name for the project'),
@@ -578,16 +170,6 @@ config_rows = [
     ('Branch', 'main', 'Default branch for deployment'),
 ]
 
-create_table_with_header(doc, ['Parameter', 'Value', 'Description'], config_rows)
-
-doc.add_page_break()
-
-doc.add_heading('3.4 GitHub Actions Pipeline', 2)
-
-doc.add_paragraph(
-    'GitHub Actions provides cloud-based CI/CD with the following workflow configuration:'
-)
-
 ga_rows = [
     ('backend-build', 'Build', 'Builds backend with Node.js 18, installs dependencies'),
     ('frontend-build', 'Build', 'Builds frontend with Node.js 18, installs dependencies'),
@@ -595,18 +177,6 @@ ga_rows = [
     ('deploy', 'Deploy', 'Deploys to AWS EC2 instance via SSH'),
 ]
 
-create_table_with_header(doc, ['Job Name', 'Type', 'Description'], ga_rows)
-
-doc.add_paragraph()
-doc.add_heading('GitHub Actions Triggers', 3)
-doc.add_paragraph(
-    '- Push events to main/master branches\n'
-    '- Pull request events to main/master branches\n'
-    '- Docker push and deploy jobs only run on main/master branch pushes'
-)
-
-doc.add_heading('Required GitHub Secrets', 3)
-
 secrets_rows = [
     ('DOCKER_USERNAME', 'Docker Hub authentication username'),
     ('DOCKER_PASSWORD', 'Docker Hub authentication password/token'),
@@ -618,16 +188,6 @@ secrets_rows = [
     ('EC2_USER', 'SSH username for EC2 instance'),
 ]
 
-create_table_with_header(doc, ['Secret Name', 'Purpose'], secrets_rows)
-
-doc.add_page_break()
-
-doc.add_heading('3.5 Deployment Automation Flow', 2)
-
-doc.add_paragraph(
-    'The complete deployment automation follows this sequence:'
-)
-
 flow_steps = [
     ('1', 'Developer pushes code changes to GitHub repository'),
     ('2', 'GitHub webhook triggers Jenkins pipeline OR GitHub Actions workflow'),
@@ -641,11 +201,6 @@ flow_steps = [
     ('10', 'Application is accessible at configured ports'),
 ]
 
-create_table_with_header(doc, ['Step', 'Action'], flow_steps)
-
-doc.add_paragraph()
-doc.add_heading('Automation Scripts', 3)
-
 scripts_rows = [
     ('docker-rebuild.sh', 'Complete Docker rebuild with cache cleanup'),
     ('docker-push.sh', 'Push images to Docker Hub with proper tagging'),
@@ -653,15 +208,6 @@ scripts_rows = [
     ('scripts/setup-jenkins.sh', 'Automated Jenkins server configuration'),
 ]
 
-create_table_with_header(doc, ['Script', 'Purpose'], scripts_rows)
-
-doc.add_page_break()
-
-# Section 4: Environment Configuration
-doc.add_heading('4. Environment Configuration', 1)
-
-doc.add_heading('Backend Environment Variables', 2)
-
 backend_env_rows = [
     ('PORT', '5000', 'Backend server port'),
     ('NODE_ENV', 'development/production', 'Runtime environment mode'),
@@ -671,20 +217,10 @@ backend_env_rows = [
     ('CORS_ORIGIN', 'http://localhost:3000', 'Allowed CORS origin'),
 ]
 
-create_table_with_header(doc, ['Variable', 'Value', 'Description'], backend_env_rows)
-
-doc.add_paragraph()
-doc.add_heading('Frontend Environment Variables', 2)
-
 frontend_env_rows = [
     ('VITE_API_URL', 'http://localhost:5000', 'Backend API base URL'),
 ]
 
-create_table_with_header(doc, ['Variable', 'Value', 'Description'], frontend_env_rows)
-
-doc.add_paragraph()
-doc.add_heading('Docker Compose Configuration', 2)
-
 docker_rows = [
     ('Frontend Container', 'soundplus-frontend', 'Port 3000'),
     ('Backend Container', 'soundplus-backend', 'Port 5000'),
@@ -692,17 +228,6 @@ docker_rows = [
     ('Volume', 'backend-uploads', 'Product image storage'),
 ]
 
-create_table_with_header(doc, ['Component', 'Name', 'Configuration'], docker_rows)
-
-doc.add_page_break()
-
-# Section 5: Security Considerations
-doc.add_heading('5. Security Considerations', 1)
-
-doc.add_paragraph(
-    'The SoundPlus++ application implements several security measures:'
-)
-
 security_rows = [
     ('Authentication', 'JWT tokens with 7-day expiration, stored in httpOnly cookies'),
     ('Password Security', 'bcrypt hashing with 10 salt rounds'),
@@ -713,69 +238,1055 @@ security_rows = [
     ('Network', 'Docker bridge network isolates container communication'),
 ]
 
-create_table_with_header(doc, ['Security Feature', 'Implementation'], security_rows)
-
-doc.add_page_break()
-
-# Section 6: Conclusion
-doc.add_heading('6. Conclusion', 1)
-
-doc.add_paragraph(
-    'The SoundPlus++ project implements a comprehensive CI/CD pipeline that ensures '
-    'reliable and efficient software delivery. The architecture combines local Jenkins '
-    'pipelines with cloud-based GitHub Actions to provide flexibility in deployment options.'
-)
-
-doc.add_paragraph(
-    'Key highlights of the automation approach include:'
-)
-
-highlights = doc.add_paragraph()
-highlights.add_run('\n- Fully containerized application using Docker and Docker Compose')
-highlights.add_run('\n- Dual CI/CD options: Jenkins (local) and GitHub Actions (cloud)')
-highlights.add_run('\n- Automated environment configuration and health checks')
-highlights.add_run('\n- Secure container networking with isolated communication')
-highlights.add_run('\n- Scalable architecture supporting multiple deployment targets')
-highlights.add_run('\n- Comprehensive monitoring through health check endpoints')
-
-doc.add_paragraph()
-doc.add_paragraph(
-    'This documentation provides a complete overview of the CI/CD design and automation '
-    'approach for the SoundPlus++ e-commerce platform, enabling consistent and repeatable '
-    'deployments across development, staging, and production environments.'
-)
-
-# Appendix
-doc.add_page_break()
-doc.add_heading('Appendix A: Quick Reference', 1)
-
-doc.add_heading('Access URLs', 2)
 urls_rows = [
     ('Frontend', 'http://localhost:3000', 'User interface'),
     ('Backend API', 'http://localhost:5000', 'REST API endpoints'),
     ('Health Check', 'http://localhost:5000/health', 'Backend health status'),
 ]
-create_table_with_header(doc, ['Service', 'URL', 'Description'], urls_rows)
 
-doc.add_paragraph()
-doc.add_heading('Docker Commands', 2)
 commands_rows = [
     ('docker-compose up --build', 'Build and start all services'),
     ('docker-compose down', 'Stop and remove all containers'),
     ('docker-compose logs -f', 'View real-time logs'),
     ('docker-compose ps', 'List running containers'),
 ]
-create_table_with_header(doc, ['Command', 'Description'], commands_rows)
 
-doc.add_paragraph()
-doc.add_heading('Repository Information', 2)
 repo_rows = [
     ('GitHub URL', 'https://github.com/Thiwankabanadara5400/Soundplus.git'),
     ('Default Branch', 'main'),
     ('License', 'ISC'),
 ]
-create_table_with_header(doc, ['Item', 'Value'], repo_rows)
 
-# Save document
-doc.save('D:/Docker project/SoundPlus++/SoundPlus_CICD_Documentation.docx')
-print('Document created successfully: SoundPlus_CICD_Documentation.docx')
+# Purposes for packages that are not in the hand-written dependency tables
+package_purposes = {
+    'axios': 'HTTP client for making REST API requests',
+    'path': 'Node.js path utilities packaged for npm',
+    'stripe': 'Stripe API client for payment processing',
+    '@stripe/react-stripe-js': 'React components for Stripe Elements checkout',
+    '@stripe/stripe-js': 'Stripe.js loader for client-side payments',
+    'framer-motion': 'Animation library for React components',
+    '@eslint/js': 'ESLint recommended JavaScript rule set',
+    '@types/react': 'TypeScript type definitions for React',
+    '@types/react-dom': 'TypeScript type definitions for React DOM',
+    'eslint-plugin-react': 'React specific linting rules',
+    'eslint-plugin-react-hooks': 'Linting rules for the Rules of Hooks',
+    'eslint-plugin-react-refresh': 'Linting rules for Fast Refresh compatible components',
+    'globals': 'Global identifier definitions for ESLint environments',
+}
+
+DEFAULT_DATA = {
+    'stack_rows': stack_rows,
+    'diagram1_text': load_diagram('architecture'),
+    'diagram2_text': load_diagram('pipeline'),
+    'diagram3_text': load_diagram('container'),
+    'diagram4_text': load_diagram('connectivity'),
+    'diagram_format': 'text',
+    'devops_rows': devops_rows,
+    'frontend_rows': frontend_rows,
+    'backend_rows': backend_rows,
+    'db_rows': db_rows,
+    'collections_rows': collections_rows,
+    'endpoint_rows': endpoint_rows,
+    'pipeline_rows': pipeline_rows,
+    'config_rows': config_rows,
+    'ga_rows': ga_rows,
+    'secrets_rows': secrets_rows,
+    'flow_steps': flow_steps,
+    'scripts_rows': scripts_rows,
+    'backend_env_rows': backend_env_rows,
+    'frontend_env_rows': frontend_env_rows,
+    'docker_rows': docker_rows,
+    'security_rows': security_rows,
+    'urls_rows': urls_rows,
+    'commands_rows': commands_rows,
+    'repo_rows': repo_rows,
+    # Product images and screenshots; ingestion lists backend/uploads
+    'image_paths': [],
+    # Stage durations and weekly run times, measured from CI logs (--ci-logs)
+    'perf_stage_rows': [],
+    'perf_trend_rows': [],
+    # Backend latency and throughput per endpoint, from load-test results (--load-tests)
+    'latency_rows': [],
+    'throughput_rows': [],
+    'latency_baseline_rows': [],
+    'latency_chart': '',
+    # Dockerfile base images and steps (ingested), and image layers from docker save archives (--docker-images)
+    'dockerfile_rows': [],
+    'image_rows': [],
+    'image_layer_rows': [],
+    'image_file_rows': [],
+    # Dependency graph of the package-lock.json files; ingestion fills these in
+    'lock_summary_rows': [],
+    'lock_direct_rows': [],
+    'lock_duplicate_rows': [],
+    'lock_license_rows': [],
+}
+
+def build_title(doc):
+    """Title page"""
+    title = doc.add_heading('SoundPlus++ Project', 0)
+    title.alignment = CENTER
+
+    subtitle = doc.add_paragraph('CI/CD Pipeline Design and Automation Documentation')
+    subtitle.alignment = CENTER
+    for run in subtitle.runs:
+        run.size = 14
+        run.italic = True
+
+    # Project info
+    info = doc.add_paragraph()
+    info.alignment = CENTER
+    info.add_run('Premium Audio Equipment E-commerce Platform\n').bold = True
+    info.add_run('MERN Stack Application with Docker Containerization\n')
+    info.add_run('Version 1.0 | January 2026')
+
+    doc.add_page_break()
+
+def build_toc(doc):
+    """Table of contents"""
+    doc.add_toc('Table of Contents')
+
+    doc.add_page_break()
+
+def build_introduction(doc, stack_rows):
+    """Section 1: Introduction"""
+    doc.add_heading('1. Introduction', 1)
+
+    doc.add_heading('1.1 Project Overview', 2)
+    doc.add_paragraph(
+        'SoundPlus++ is a premium audio equipment e-commerce platform built using the MERN stack '
+        '(MongoDB, Express.js, React, Node.js). The application provides a comprehensive online '
+        'shopping experience for audio enthusiasts, featuring product catalog management, user '
+        'authentication, shopping cart functionality, and order processing.'
+    )
+
+    doc.add_paragraph(
+        'This document outlines the CI/CD (Continuous Integration/Continuous Deployment) design '
+        'and automation approach implemented for the SoundPlus++ application, ensuring reliable '
+        'and efficient software delivery.'
+    )
+
+    doc.add_heading('1.2 Technology Stack Summary', 2)
+
+    doc.add_table(['Layer', 'Technology', 'Version'], stack_rows)
+
+    doc.add_page_break()
+
+def build_architecture_diagram(doc, diagram1_text, diagram_format='text'):
+    """Section 2.1: Architecture overview diagram"""
+    doc.add_heading('2. Part 1: CI/CD Design Diagram', 1)
+
+    doc.add_heading('2.1 Architecture Overview Diagram', 2)
+
+    doc.add_paragraph(
+        'The following diagram illustrates the complete CI/CD architecture for the SoundPlus++ '
+        'application, showing all major components and their interconnections.'
+    )
+
+    # ASCII Diagram 1: Architecture Overview
+    doc.add_diagram(diagram1_text, diagram_format)
+
+    doc.add_paragraph('Figure 2.1: SoundPlus++ CI/CD Architecture Overview')
+
+    doc.add_page_break()
+
+def build_pipeline_diagram(doc, diagram2_text, diagram_format='text'):
+    """Section 2.2: CI/CD pipeline flow diagram"""
+    doc.add_heading('2.2 CI/CD Pipeline Flow Diagram', 2)
+
+    doc.add_paragraph(
+        'This diagram shows the detailed flow of the CI/CD pipeline from code commit to deployment.'
+    )
+
+    doc.add_diagram(diagram2_text, diagram_format)
+
+    doc.add_paragraph('Figure 2.2: CI/CD Pipeline Flow')
+
+    doc.add_page_break()
+
+def build_container_diagram(doc, diagram3_text, diagram_format='text'):
+    """Section 2.3: Container architecture diagram"""
+    doc.add_heading('2.3 Container Architecture Diagram', 2)
+
+    doc.add_paragraph(
+        'The following diagram illustrates the Docker container architecture and internal '
+        'connectivity of the SoundPlus++ application.'
+    )
+
+    doc.add_diagram(diagram3_text, diagram_format)
+
+    doc.add_paragraph('Figure 2.3: Docker Container Architecture')
+
+    doc.add_page_break()
+
+def build_connectivity_diagram(doc, diagram4_text, diagram_format='text'):
+    """Section 2.4: Component connectivity diagram"""
+    doc.add_heading('2.4 Component Connectivity Diagram', 2)
+
+    doc.add_paragraph(
+        'This diagram details the connectivity between all application components '
+        'including frontend, backend, database, and external services.'
+    )
+
+    doc.add_diagram(diagram4_text, diagram_format)
+
+    doc.add_paragraph('Figure 2.4: Application Component Connectivity')
+
+    doc.add_page_break()
+
+def build_diagram_explanation(doc):
+    """Section 2.5: Diagram explanation"""
+    doc.add_heading('2.5 Diagram Explanation', 2)
+
+    doc.add_paragraph(
+        'The CI/CD architecture for SoundPlus++ consists of the following key components and their interactions:'
+    )
+
+    doc.add_heading('Git Tools - GitHub', 3)
+    doc.add_paragraph(
+        'GitHub serves as the central version control system for the SoundPlus++ project. '
+        'The repository (https://github.com/Thiwankabanadara5400/Soundplus.git) hosts all source code, '
+        'Docker configurations, and CI/CD pipeline definitions. Developers push code changes to the '
+        'main branch, which triggers the automated CI/CD pipelines.'
+    )
+
+    doc.add_heading('CI Tool - Jenkins', 3)
+    doc.add_paragraph(
+        'Jenkins is configured as the local CI/CD orchestrator. When code is pushed to GitHub, '
+        'a webhook triggers the Jenkins pipeline defined in the Jenkinsfile. Jenkins performs '
+        'code checkout, environment setup, Docker image building, and service deployment. '
+        'The pipeline includes health checks to verify successful deployment.'
+    )
+
+    doc.add_heading('Configuration Management - Environment Variables', 3)
+    doc.add_paragraph(
+        'Environment configuration is managed through .env files for both frontend and backend services. '
+        'The Jenkins pipeline automatically creates these environment files during the Setup Environment stage, '
+        'ensuring consistent configuration across deployments.'
+    )
+
+    doc.add_heading('Containerization - Docker', 3)
+    doc.add_paragraph(
+        'Docker provides containerization for both frontend and backend applications. Each service '
+        'has its own Dockerfile that defines the build process using Node.js 18-slim as the base image. '
+        'Docker Compose orchestrates the multi-container deployment, managing networking between containers '
+        'and volume mounts for persistent data storage.'
+    )
+
+    doc.add_heading('Container Connectivity', 3)
+    doc.add_paragraph(
+        'The frontend and backend containers communicate over a Docker bridge network (soundplus-network). '
+        'The frontend container (port 3000) makes REST API calls to the backend container (port 5000) using axios. '
+        'The backend container connects to MongoDB Atlas for data persistence. All inter-service communication '
+        'is secured within the Docker network.'
+    )
+
+    doc.add_page_break()
+
+def build_devops_tools(doc, devops_rows):
+    """Section 3.1: DevOps tools and versions"""
+    doc.add_heading('3. Part 2: Automation Approach', 1)
+
+    doc.add_heading('3.1 DevOps Tools and Versions', 2)
+
+    doc.add_paragraph(
+        'The following table describes all DevOps tools used in the SoundPlus++ deployment pipeline:'
+    )
+
+    doc.add_table(['Tool', 'Version', 'Purpose'], devops_rows)
+
+    doc.add_page_break()
+
+def build_application_dependencies(doc, frontend_rows, backend_rows, db_rows, collections_rows,
+                                   endpoint_rows):
+    """Section 3.2: Application tools and dependencies"""
+    doc.add_heading('3.2 Application Tools and Dependencies', 2)
+
+    doc.add_heading('Frontend Dependencies', 3)
+
+    doc.add_table(['Package', 'Version', 'Purpose'], frontend_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('Backend Dependencies', 3)
+
+    doc.add_table(['Package', 'Version', 'Purpose'], backend_rows)
+
+    doc.add_page_break()
+
+    doc.add_heading('Database Configuration', 3)
+
+    doc.add_table(['Component', 'Value', 'Description'], db_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('Database Collections', 3)
+
+    doc.add_table(['Collection', 'Fields', 'Purpose'], collections_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('API Endpoints', 3)
+
+    doc.add_table(['Method', 'Path', 'Middleware', 'Upload'], endpoint_rows)
+
+    doc.add_page_break()
+
+def build_dependency_graph(doc, lock_summary_rows, lock_direct_rows, lock_duplicate_rows, lock_license_rows):
+    """Section 3.2: Dependency graph of the lockfiles"""
+    doc.add_heading('Dependency Graph', 3)
+
+    doc.add_paragraph(
+        'Every package the lockfiles install. Production packages are those the runtime dependencies need; '
+        'the rest are only installed for development. Install sizes are measured from an installed '
+        'node_modules directory, where there is one.'
+    )
+
+    doc.add_table(['Project', 'Packages', 'Direct', 'Production', 'Dev Only', 'Duplicated', 'Install Size'],
+                  lock_summary_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('Direct Dependencies', 3)
+    doc.add_table(['Project', 'Package', 'Version', 'Type', 'Transitive', 'Install Size', 'License'],
+                  lock_direct_rows)
+
+    if lock_duplicate_rows:
+        doc.add_paragraph()
+        doc.add_heading('Duplicate Versions', 3)
+        doc.add_paragraph('Packages installed in more than one version, most versions first.')
+        doc.add_table(['Project', 'Package', 'Versions', 'Copies'], lock_duplicate_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('Licenses', 3)
+    doc.add_table(['Project', 'License', 'Packages', 'Share'], lock_license_rows)
+
+    doc.add_page_break()
+
+def build_jenkins_pipeline(doc, pipeline_rows, config_rows):
+    """Section 3.3: Jenkins pipeline stages"""
+    doc.add_heading('3.3 Jenkins Pipeline Stages', 2)
+
+    doc.add_paragraph(
+        'The Jenkins pipeline (Jenkinsfile) automates the deployment process through the following stages:'
+    )
+
+    doc.add_table(['Stage', 'Name', 'Description'], pipeline_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('Jenkins Pipeline Configuration', 3)
+
+    doc.add_table(['Parameter', 'Value', 'Description'], config_rows)
+
+    doc.add_page_break()
+
+def build_github_actions(doc, ga_rows, secrets_rows):
+    """Section 3.4: GitHub Actions pipeline"""
+    doc.add_heading('3.4 GitHub Actions Pipeline', 2)
+
+    doc.add_paragraph(
+        'GitHub Actions provides cloud-based CI/CD with the following workflow configuration:'
+    )
+
+    doc.add_table(['Job Name', 'Type', 'Description'], ga_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('GitHub Actions Triggers', 3)
+    doc.add_paragraph(
+        '- Push events to main/master branches\n'
+        '- Pull request events to main/master branches\n'
+        '- Docker push and deploy jobs only run on main/master branch pushes'
+    )
+
+    doc.add_heading('Required GitHub Secrets', 3)
+
+    doc.add_table(['Secret Name', 'Purpose'], secrets_rows)
+
+    doc.add_page_break()
+
+def build_deployment_flow(doc, flow_steps, scripts_rows):
+    """Section 3.5: Deployment automation flow"""
+    doc.add_heading('3.5 Deployment Automation Flow', 2)
+
+    doc.add_paragraph(
+        'The complete deployment automation follows this sequence:'
+    )
+
+    doc.add_table(['Step', 'Action'], flow_steps)
+
+    doc.add_paragraph()
+    doc.add_heading('Automation Scripts', 3)
+
+    doc.add_table(['Script', 'Purpose'], scripts_rows)
+
+    doc.add_page_break()
+
+def build_pipeline_performance(doc, perf_stage_rows, perf_trend_rows):
+    """Section 3.6: Pipeline performance measured from CI logs"""
+    doc.add_heading('3.6 Pipeline Performance', 2)
+
+    doc.add_paragraph(
+        'Stage and job durations measured from the Jenkins console logs and GitHub Actions log archives. '
+        'Percentiles are estimated from bounded-memory sketches and are accurate to within 1%.'
+    )
+
+    doc.add_table(['Pipeline', 'Stage / Job', 'Runs', 'p50', 'p95', 'p99'], perf_stage_rows)
+
+    if perf_trend_rows:
+        doc.add_paragraph()
+        doc.add_heading('Weekly Run Times', 3)
+        doc.add_table(['Week', 'Pipeline', 'Runs', 'Failed', 'p50', 'p95'], perf_trend_rows)
+
+    doc.add_page_break()
+
+def build_backend_latency(doc, number, latency_rows, throughput_rows, latency_baseline_rows, latency_chart,
+                          diagram_format='text'):
+    """Section 3.6/3.7: Backend latency and throughput measured by load tests"""
+    doc.add_heading('%s Backend Latency' % number, 2)
+
+    doc.add_paragraph(
+        'Response times and request rates per API endpoint under load, in milliseconds. For k6 runs the '
+        'response time is http_req_duration, from sending the request to receiving the last byte of the '
+        'response; every sample goes into a logarithmic sketch, so p50, p90 and p99 are within 1% of the '
+        'exact percentile and Max is exact. For autocannon runs the figures are the ones autocannon reported.'
+    )
+
+    doc.add_table(['Method', 'Endpoint', 'p50', 'p90', 'p99', 'Max'], latency_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('Throughput', 3)
+    doc.add_table(['Method', 'Endpoint', 'Requests', 'Req/s', 'Errors'], throughput_rows)
+
+    if latency_baseline_rows:
+        doc.add_paragraph()
+        doc.add_heading('Against the Baseline', 3)
+        doc.add_paragraph(
+            'A p99 more than 10% higher, or a request rate more than 10% lower, than the baseline run '
+            'is a regression.'
+        )
+        doc.add_table(['Method', 'Endpoint', 'Baseline p99', 'p99', 'p99 Change', 'Req/s Change', 'Verdict'],
+                      latency_baseline_rows)
+
+    if latency_chart:
+        doc.add_paragraph()
+        doc.add_diagram(latency_chart, diagram_format)
+
+    doc.add_page_break()
+
+def build_environment(doc, backend_env_rows, frontend_env_rows, docker_rows):
+    """Section 4: Environment configuration"""
+    doc.add_heading('4. Environment Configuration', 1)
+
+    doc.add_heading('Backend Environment Variables', 2)
+
+    doc.add_table(['Variable', 'Value', 'Description'], backend_env_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('Frontend Environment Variables', 2)
+
+    doc.add_table(['Variable', 'Value', 'Description'], frontend_env_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('Docker Compose Configuration', 2)
+
+    doc.add_table(['Component', 'Name', 'Configuration'], docker_rows)
+
+    doc.add_page_break()
+
+def build_docker_images(doc, dockerfile_rows, image_rows, image_layer_rows, image_file_rows):
+    """Section 4: Docker images, from the Dockerfiles and saved image archives"""
+    doc.add_heading('Docker Images', 2)
+
+    if dockerfile_rows:
+        doc.add_paragraph('Base images and layer-creating steps of the service Dockerfiles.')
+        doc.add_table(['Service', 'Base Image', 'Layer Steps', 'Ports', 'Command'], dockerfile_rows)
+
+    if image_rows:
+        doc.add_paragraph()
+        doc.add_heading('Image Sizes', 3)
+        doc.add_paragraph(
+            'Uncompressed layer sizes measured from docker save archives. Layers below the Dockerfile\'s '
+            'own steps come from the base image.'
+        )
+        doc.add_table(['Image', 'Base Image', 'Layers', 'Size', 'Base Layers', 'Added'], image_rows)
+
+        doc.add_paragraph()
+        doc.add_heading('Layers', 3)
+        doc.add_table(['Image', 'Layer', 'Origin', 'Created By', 'Size', 'Files'], image_layer_rows)
+
+        if image_file_rows:
+            doc.add_paragraph()
+            doc.add_heading('Largest Files', 3)
+            doc.add_table(['Image', 'Path', 'Size', 'Layer'], image_file_rows)
+
+    doc.add_page_break()
+
+def build_security(doc, security_rows):
+    """Section 5: Security considerations"""
+    doc.add_heading('5. Security Considerations', 1)
+
+    doc.add_paragraph(
+        'The SoundPlus++ application implements several security measures:'
+    )
+
+    doc.add_table(['Security Feature', 'Implementation'], security_rows)
+
+    doc.add_page_break()
+
+def build_conclusion(doc):
+    """Section 6: Conclusion"""
+    doc.add_heading('6. Conclusion', 1)
+
+    doc.add_paragraph(
+        'The SoundPlus++ project implements a comprehensive CI/CD pipeline that ensures '
+        'reliable and efficient software delivery. The architecture combines local Jenkins '
+        'pipelines with cloud-based GitHub Actions to provide flexibility in deployment options.'
+    )
+
+    doc.add_paragraph(
+        'Key highlights of the automation approach include:'
+    )
+
+    highlights = doc.add_paragraph()
+    highlights.add_run('\n- Fully containerized application using Docker and Docker Compose')
+    highlights.add_run('\n- Dual CI/CD options: Jenkins (local) and GitHub Actions (cloud)')
+    highlights.add_run('\n- Automated environment configuration and health checks')
+    highlights.add_run('\n- Secure container networking with isolated communication')
+    highlights.add_run('\n- Scalable architecture supporting multiple deployment targets')
+    highlights.add_run('\n- Comprehensive monitoring through health check endpoints')
+
+    doc.add_paragraph()
+    doc.add_paragraph(
+        'This documentation provides a complete overview of the CI/CD design and automation '
+        'approach for the SoundPlus++ e-commerce platform, enabling consistent and repeatable '
+        'deployments across development, staging, and production environments.'
+    )
+
+    doc.add_page_break()
+
+def build_appendix(doc, urls_rows, commands_rows, repo_rows):
+    """Appendix A: Quick reference"""
+    doc.add_heading('Appendix A: Quick Reference', 1)
+
+    doc.add_heading('Access URLs', 2)
+    doc.add_table(['Service', 'URL', 'Description'], urls_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('Docker Commands', 2)
+    doc.add_table(['Command', 'Description'], commands_rows)
+
+    doc.add_paragraph()
+    doc.add_heading('Repository Information', 2)
+    doc.add_table(['Item', 'Value'], repo_rows)
+
+def build_images(doc, image_paths):
+    """Appendix B: Product and screenshot images"""
+    doc.add_heading('Appendix B: Images', 1)
+    for path in image_paths:
+        doc.add_picture(path, os.path.splitext(os.path.basename(path))[0])
+
+def make_sections(data):
+    """The document's sections, in order, bound to `data`"""
+    # Pictures live in their own package parts, which a cached fragment cannot carry
+    diagrams_cacheable = data['diagram_format'] != 'png'
+    sections = [
+        Section('title', build_title),
+        Section('toc', build_toc),
+        Section('introduction', build_introduction, {'stack_rows': data['stack_rows']}),
+        Section('architecture_diagram', build_architecture_diagram, {
+            'diagram1_text': data['diagram1_text'],
+            'diagram_format': data['diagram_format'],
+        }, cacheable=diagrams_cacheable),
+        Section('pipeline_diagram', build_pipeline_diagram, {
+            'diagram2_text': data['diagram2_text'],
+            'diagram_format': data['diagram_format'],
+        }, cacheable=diagrams_cacheable),
+        Section('container_diagram', build_container_diagram, {
+            'diagram3_text': data['diagram3_text'],
+            'diagram_format': data['diagram_format'],
+        }, cacheable=diagrams_cacheable),
+        Section('connectivity_diagram', build_connectivity_diagram, {
+            'diagram4_text': data['diagram4_text'],
+            'diagram_format': data['diagram_format'],
+        }, cacheable=diagrams_cacheable),
+        Section('diagram_explanation', build_diagram_explanation),
+        Section('devops_tools', build_devops_tools, {'devops_rows': data['devops_rows']}),
+        Section('application_dependencies', build_application_dependencies, {
+            'frontend_rows': data['frontend_rows'],
+            'backend_rows': data['backend_rows'],
+            'db_rows': data['db_rows'],
+            'collections_rows': data['collections_rows'],
+            'endpoint_rows': data['endpoint_rows'],
+        }),
+        Section('jenkins_pipeline', build_jenkins_pipeline, {
+            'pipeline_rows': data['pipeline_rows'],
+            'config_rows': data['config_rows'],
+        }),
+        Section('github_actions', build_github_actions, {
+            'ga_rows': data['ga_rows'],
+            'secrets_rows': data['secrets_rows'],
+        }),
+        Section('deployment_flow', build_deployment_flow, {
+            'flow_steps': data['flow_steps'],
+            'scripts_rows': data['scripts_rows'],
+        }),
+        Section('environment', build_environment, {
+            'backend_env_rows': data['backend_env_rows'],
+            'frontend_env_rows': data['frontend_env_rows'],
+            'docker_rows': data['docker_rows'],
+        }),
+        Section('security', build_security, {'security_rows': data['security_rows']}),
+        Section('conclusion', build_conclusion),
+        Section('appendix', build_appendix, {
+            'urls_rows': data['urls_rows'],
+            'commands_rows': data['commands_rows'],
+            'repo_rows': data['repo_rows'],
+        }),
+    ]
+    if data['lock_summary_rows']:
+        at = [section.name for section in sections].index('application_dependencies') + 1
+        sections.insert(at, Section('dependency_graph', build_dependency_graph, {
+            'lock_summary_rows': data['lock_summary_rows'],
+            'lock_direct_rows': data['lock_direct_rows'],
+            'lock_duplicate_rows': data['lock_duplicate_rows'],
+            'lock_license_rows': data['lock_license_rows'],
+        }))
+    if data['perf_stage_rows'] or data['perf_trend_rows']:
+        at = [section.name for section in sections].index('deployment_flow') + 1
+        sections.insert(at, Section('pipeline_performance', build_pipeline_performance, {
+            'perf_stage_rows': data['perf_stage_rows'],
+            'perf_trend_rows': data['perf_trend_rows'],
+        }))
+    if data['latency_rows']:
+        names = [section.name for section in sections]
+        performance = 'pipeline_performance' in names
+        at = names.index('pipeline_performance' if performance else 'deployment_flow') + 1
+        sections.insert(at, Section('backend_latency', build_backend_latency, {
+            'number': '3.7' if performance else '3.6',
+            'latency_rows': data['latency_rows'],
+            'throughput_rows': data['throughput_rows'],
+            'latency_baseline_rows': data['latency_baseline_rows'],
+            'latency_chart': data['latency_chart'],
+            'diagram_format': data['diagram_format'],
+        }, cacheable=diagrams_cacheable))
+    if data['dockerfile_rows'] or data['image_rows']:
+        at = [section.name for section in sections].index('environment') + 1
+        sections.insert(at, Section('docker_images', build_docker_images, {
+            'dockerfile_rows': data['dockerfile_rows'],
+            'image_rows': data['image_rows'],
+            'image_layer_rows': data['image_layer_rows'],
+            'image_file_rows': data['image_file_rows'],
+        }))
+    if data['image_paths']:
+        sections.append(Section('images', build_images, {'image_paths': data['image_paths']}, cacheable=False))
+    return sections
+
+_parse_caches = {}
+
+def _parse_cache(cache_dir):
+    """ParseCache per directory, kept for the life of the process"""
+    if cache_dir is None:
+        return None
+    if cache_dir not in _parse_caches:
+        _parse_caches[cache_dir] = ParseCache(cache_dir)
+    return _parse_caches[cache_dir]
+
+def _document_data(config):
+    sources = None
+    data = DEFAULT_DATA
+    if config.ingest:
+        data, sources = ingest(data, config.source_root or SOURCE_ROOT, _parse_cache(config.cache_dir),
+                               package_purposes)
+    if config.ci_logs:
+        from cicd_doc.cilogs import pipeline_performance
+
+        data = dict(data, **pipeline_performance(config.ci_logs, _parse_cache(config.cache_dir)))
+    if config.load_tests:
+        from cicd_doc.loadtest import latency_data
+
+        data = dict(data, **latency_data(config.load_tests, _parse_cache(config.cache_dir),
+                                         config.latency_baseline))
+    if config.docker_images:
+        from cicd_doc.dockerimage import image_data
+
+        data = dict(data, **image_data(config.docker_images, sources.dockerfiles() if sources else {},
+                                       config.cache_dir))
+    unknown = sorted(set(config.data) - set(DEFAULT_DATA))
+    if unknown:
+        raise ValueError('unknown document data: %s' % ', '.join(unknown))
+    return dict(data, **config.data), sources
+
+def document_data(config):
+    """Section data for `config`: project sources ingested, then its overrides applied"""
+    return _document_data(config)[0]
+
+def redactor_for(config, data, sources=None, extra_data=()):
+    """Redactor for every secret the project's .env files, pipeline and env tables hold; None when off
+
+    `extra_data` are further data overrides (batch variants) whose env tables count too.
+    """
+    if not config.redact:
+        return None
+    from cicd_doc.redact import Redactor, project_secrets
+
+    jenkins = sources.get('jenkinsfile') if sources is not None else None
+    rows = [row for values in (data, *extra_data) for key in ('backend_env_rows', 'frontend_env_rows')
+            for row in values.get(key, ())]
+    return Redactor(project_secrets(config.source_root or SOURCE_ROOT,
+                                    jenkins['env_writes'] if jenkins else (), rows))
+
+def _render(doc, config):
+    diagrams.png_cache_dir = images.cache_dir = config.cache_dir
+    cache = None if config.cache_dir is None else FragmentCache(config.cache_dir)
+    data, sources = _document_data(config)
+    return render_sections(doc, make_sections(data), cache, config.estimate_pages,
+                           redactor_for(config, data, sources))
+
+def check(config=None):
+    """Dry run: ingest and validate everything a build needs; returns a list of problems"""
+    config = config or BuildConfig()
+    try:
+        data, sources = _document_data(config)
+    except ValueError as exc:
+        return [str(exc)]
+    problems = ['source not readable: %s' % SOURCES[name] for name in (sources.missing if sources else [])]
+    problems.extend('CI log not found: %s' % path for path in config.ci_logs if not os.path.exists(path))
+    problems.extend('load-test result not found: %s' % path for path in config.load_tests
+                    if not os.path.exists(path))
+    problems.extend('image archive not found: %s' % path for path in config.docker_images
+                    if not os.path.exists(path))
+
+    cache = None if config.cache_dir is None else FragmentCache(config.cache_dir)
+    redactor = redactor_for(config, data, sources)
+    sections = make_sections(data)
+    stale = []
+    for section in sections:
+        one_shot = [key for key, value in section.inputs.items() if isinstance(value, Iterator)]
+        for key in one_shot:
+            problems.append('%s: %s can only be read once; use rows.LazyRows' % (section.name, key))
+        for key, value in section.inputs.items():
+            if key.endswith(('_rows', '_items', '_steps')) and key not in one_shot and not all(
+                    isinstance(row, (list, tuple)) for row in value):
+                problems.append('%s: %s must be a list of rows' % (section.name, key))
+        if section.name == 'images':
+            problems.extend('images: not a file: %s' % path
+                            for path in section.inputs['image_paths'] if not os.path.isfile(path))
+        cached = cache is not None and section.cacheable and not one_shot
+        if not cached or not cache.has(section.name, fragment_key(section, redactor)):
+            stale.append(section.name)
+    print('%d sections, %d would be rebuilt: %s' % (len(sections), len(stale), ', '.join(stale) or 'none'))
+    return problems
+
+def build_document(config=None):
+    """Build the documentation as an in-memory python-docx Document"""
+    from docx import Document
+
+    doc = Document()
+    _render(doc, config or BuildConfig())
+    return doc
+
+def document_model(config=None):
+    """Build the documentation's intermediate model (headings, paragraphs, tables, diagrams)"""
+    config = config or BuildConfig()
+    diagrams.png_cache_dir = images.cache_dir = config.cache_dir
+    data, sources = _document_data(config)
+    model = build_model(make_sections(data))
+    redactor = redactor_for(config, data, sources)
+    if redactor is not None:
+        from cicd_doc.redact import redact_model
+
+        redact_model(model, redactor)
+    return model
+
+def render_text(stream, config=None, output_format='html'):
+    """Write the documentation as HTML or Markdown to a text stream; returns the model"""
+    if output_format == 'html':
+        from cicd_doc.html_writer import write_html as write
+    elif output_format == 'md':
+        from cicd_doc.markdown_writer import write_markdown as write
+    else:
+        raise ValueError('unknown text format: %r' % (output_format,))
+    model = document_model(config)
+    with trace.span('save', 'save'):
+        write(model, stream)
+    return model
+
+def render_to(stream, config=None):
+    """Write the documentation to a path or binary file object; returns the BuildReport"""
+    from cicd_doc.docx_writer import new_document, save_document
+
+    config = config or BuildConfig()
+    doc, date_time = new_document(stream, config)
+    report = _render(doc, config)
+    with trace.span('save', 'save'):
+        report.patch = save_document(doc, stream, config, date_time)
+    if config.deterministic and isinstance(stream, (str, os.PathLike)):
+        from cicd_doc.reproducible import write_digest
+
+        report.digest = write_digest(stream)
+    return report
+
+def _write(output, config, output_format):
+    """Render to a file path in `output_format`; returns a one-line description of the build"""
+    if output_format == 'docx':
+        report = render_to(output, config)
+        return 'rebuilt %s' % (', '.join(report.rebuilt) or 'nothing')
+    with open(output, 'w', encoding='utf-8', newline='\n') as f:
+        model = render_text(f, config, output_format)
+    if config.deterministic:
+        from cicd_doc.reproducible import write_digest
+
+        return '%d blocks, sha256 %s' % (len(model.blocks), write_digest(output))
+    return '%d blocks' % len(model.blocks)
+
+def watch_and_rebuild(config, output, output_format='docx'):
+    """Rebuild `output` whenever an ingested source changes, until interrupted"""
+    import tempfile
+    import traceback
+
+    from cicd_doc import watch
+    from cicd_doc.cilogs import log_files
+    from cicd_doc.dockerimage import archive_files
+    from cicd_doc.loadtest import result_files
+
+    scratch = None
+    if config.cache_dir is None:
+        # Unchanged sections are spliced back from their fragments, so watching needs a cache
+        scratch = tempfile.TemporaryDirectory(prefix='cicd_doc_watch_')
+        config = config.replace(cache_dir=scratch.name)
+    if output_format == 'docx':
+        import docx  # noqa: F401  loaded once, before the first save
+    root = config.source_root or SOURCE_ROOT
+
+    def rebuild(changed):
+        start = time.perf_counter()
+        try:
+            detail = _write(output, config, output_format)
+        except Exception:
+            traceback.print_exc()
+            return
+        trigger = ', '.join(os.path.relpath(path, root) for path in changed) or 'initial build'
+        print('[%s] %s: %s in %.0f ms' % (time.strftime('%H:%M:%S'), trigger, detail,
+                                          (time.perf_counter() - start) * 1000), flush=True)
+
+    def watched():
+        return (watch.watched_files(root) + log_files(config.ci_logs) + result_files(config.load_tests)
+                + archive_files(config.docker_images))
+
+    rebuild([])
+    print('Watching %d files under %s (Ctrl-C to stop)' % (len(watched()), root), flush=True)
+    try:
+        watch.watch(rebuild, watched)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+    return 0
+
+def render_bytes(base_config, output_format, data, options):
+    """Render one service request; `base_config` is the server's BuildConfig as a dict"""
+    import io
+
+    config = BuildConfig.from_dict(dict(base_config, data=dict(base_config['data'], **data), **options))
+    if output_format == 'docx':
+        out = io.BytesIO()
+        render_to(out, config)
+        return out.getvalue()
+    out = io.StringIO()
+    render_text(out, config, output_format)
+    return out.getvalue().encode('utf-8')
+
+def _warm_worker():
+    import docx  # noqa: F401
+
+def serve_documents(config, host, port, workers=None, cache_mb=64):
+    """Run the document service until interrupted"""
+    import asyncio
+    import functools
+    import hashlib
+
+    from cicd_doc import service, watch
+    from cicd_doc.cilogs import log_files
+    from cicd_doc.dockerimage import archive_files
+    from cicd_doc.loadtest import result_files
+    from cicd_doc.redact import ENV_FILES
+
+    root = config.source_root or SOURCE_ROOT
+
+    def fingerprint():
+        state = watch.snapshot(watch.watched_files(root)) if config.ingest else {}
+        if config.redact and not config.ingest:
+            # The redactor reads the .env files with or without ingestion
+            state.update(watch.snapshot([os.path.join(root, relative) for relative in ENV_FILES]))
+        state.update(watch.snapshot(log_files(config.ci_logs) + result_files(config.load_tests)
+                                    + archive_files(config.docker_images)))
+        return hashlib.sha256(repr(sorted(state.items())).encode()).hexdigest()
+
+    docs = service.DocumentService(functools.partial(render_bytes, config.to_dict()), workers,
+                                   cache_mb << 20, fingerprint, initializer=_warm_worker,
+                                   data_defaults=dict(DEFAULT_DATA, **config.data))
+
+    def ready(bound):
+        print('Serving on http://%s:%d (POST /render, GET /stats)' % (host, bound), flush=True)
+
+    try:
+        asyncio.run(service.serve(docs, host, port, ready))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        docs.close()
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate the SoundPlus++ CI/CD documentation')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help="output path, or '-' for stdout (default: %(default)s)")
+    parser.add_argument('--format', choices=('docx', 'html', 'md'),
+                        help='output format (default: from the output extension, else docx)')
+    parser.add_argument('--stream', action='store_true',
+                        help='write word/document.xml incrementally to keep memory bounded')
+    parser.add_argument('--update', action='store_true',
+                        help='patch the existing output, recompressing only the parts that changed')
+    parser.add_argument('--deterministic', action='store_true',
+                        help='byte-identical output for identical inputs (fixed zip metadata and core '
+                             'properties, SOURCE_DATE_EPOCH honoured), with its SHA-256 in <output>.sha256')
+    parser.add_argument('--no-redact', action='store_true',
+                        help='keep secret values (.env values, credentials in URIs, tokens) in the output')
+    parser.add_argument('--ci-logs', action='append', default=[], metavar='PATH',
+                        help='Jenkins console log, GitHub Actions log archive (.zip) or a directory of them, '
+                             'measured for a pipeline performance section; repeatable')
+    parser.add_argument('--load-tests', action='append', default=[], metavar='PATH',
+                        help='k6 JSON/CSV or autocannon JSON result (optionally gzipped) or a directory of them, '
+                             'measured for a backend latency section; repeatable')
+    parser.add_argument('--latency-baseline', metavar='JSON',
+                        help='earlier run\'s latencies (see --save-latency-baseline) to compare the load tests against')
+    parser.add_argument('--save-latency-baseline', metavar='JSON',
+                        help='write the load tests\' per-endpoint latencies and request rates to JSON')
+    parser.add_argument('--docker-images', action='append', default=[], metavar='PATH',
+                        help='docker save archive (.tar) or a directory of them, measured layer by layer '
+                             'for the Docker images section; repeatable')
+    parser.add_argument('--compress-level', type=int, choices=range(10), metavar='0-9',
+                        help='deflate level for the .docx parts (default: zlib default)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help='directory for cached section XML (default: %(default)s)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='rebuild every section and leave the cache untouched')
+    parser.add_argument('--source-root', default=SOURCE_ROOT,
+                        help='project checkout to read manifests from (default: %(default)s)')
+    parser.add_argument('--no-ingest', action='store_true',
+                        help='use the hand-written tables instead of reading the project sources')
+    parser.add_argument('--no-page-estimate', action='store_true',
+                        help='leave table of contents page numbers to Word instead of estimating them')
+    parser.add_argument('--diagrams', choices=('text', 'png'), default='text',
+                        help='render diagrams as Courier New text or as PNG pictures (default: %(default)s)')
+    parser.add_argument('--batch', metavar='VARIANTS_JSON',
+                        help='render every variant in a JSON config, one .docx each, in parallel')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='worker processes for --batch, --serve and image processing (default: CPU count)')
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help='run the HTTP document service on PORT (0 picks a free port)')
+    parser.add_argument('--host', default='127.0.0.1', help='address for --serve (default: %(default)s)')
+    parser.add_argument('--result-cache-mb', type=int, default=64,
+                        help='size bound of the service\'s rendered-document cache (default: %(default)s)')
+    parser.add_argument('--profile', metavar='JSON',
+                        help='record per-section time, element counts and memory peaks to a JSON file')
+    parser.add_argument('--trace', metavar='JSON',
+                        help='record the same spans in Chrome trace-event format (chrome://tracing)')
+    parser.add_argument('--watch', action='store_true',
+                        help='stay running and rebuild the changed sections whenever a source file changes')
+    parser.add_argument('--list-sections', action='store_true',
+                        help='print the section names and exit')
+    parser.add_argument('--check', action='store_true',
+                        help='validate sources and data and report which sections would be rebuilt')
+    args = parser.parse_args(argv)
+
+    config = BuildConfig(data={'diagram_format': args.diagrams},
+                         source_root=args.source_root, ingest=not args.no_ingest,
+                         cache_dir=None if args.no_cache else args.cache_dir, stream=args.stream,
+                         estimate_pages=not args.no_page_estimate, update=args.update,
+                         deterministic=args.deterministic, compresslevel=args.compress_level,
+                         redact=not args.no_redact, ci_logs=args.ci_logs, load_tests=args.load_tests,
+                         latency_baseline=args.latency_baseline, docker_images=args.docker_images)
+    if args.update and args.stream:
+        parser.error('--update cannot be combined with --stream')
+    if args.save_latency_baseline and not args.load_tests:
+        parser.error('--save-latency-baseline needs --load-tests')
+
+    if args.list_sections:
+        # The same data a build uses: some sections only exist once their sources are ingested
+        try:
+            data, _ = _document_data(config)
+        except ValueError as exc:
+            print(exc, file=sys.stderr)
+            return 1
+        for section in make_sections(data):
+            print('%-28s %s' % (section.name, section.title))
+        return 0
+
+    if args.check:
+        problems = check(config)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 1 if problems else 0
+
+    if args.serve is not None:
+        images.workers = 1
+        return serve_documents(config, args.host, args.serve, args.jobs, args.result_cache_mb)
+
+    if args.batch:
+        from cicd_doc.batch import load_variants, run_batch, summary as batch_summary
+
+        start = time.perf_counter()
+        diagrams.png_cache_dir = images.cache_dir = config.cache_dir
+        # Variants already run in parallel; each processes its images in-process
+        images.workers = 1
+        variants = load_variants(args.batch, DEFAULT_DATA)
+        data, sources = _document_data(config)
+        redactor = redactor_for(config, data, sources, [variant.data for variant in variants])
+        results = run_batch(variants, data, make_sections, config, args.jobs, redactor)
+        print(batch_summary(results, time.perf_counter() - start))
+        return 0
+
+    images.workers = args.jobs
+    output_format = args.format or FORMATS.get(os.path.splitext(args.output)[1].lower(), 'docx')
+    if args.output == DEFAULT_OUTPUT and output_format != 'docx':
+        args.output = os.path.splitext(DEFAULT_OUTPUT)[0] + EXTENSIONS[output_format]
+
+    if args.watch:
+        if args.output == '-':
+            parser.error('--watch needs an output file')
+        return watch_and_rebuild(config, args.output, output_format)
+
+    tracer = trace.enable() if args.profile or args.trace else None
+
+    if output_format != 'docx':
+        start = time.perf_counter()
+        if args.output == '-':
+            render_text(sys.stdout, config, output_format)
+        else:
+            detail = _write(args.output, config, output_format)
+            print('%s written in %.1f ms' % (detail, (time.perf_counter() - start) * 1000))
+            print('Document created successfully: %s' % args.output)
+    elif args.output == '-':
+        render_to(sys.stdout.buffer, config)
+    else:
+        report = render_to(args.output, config)
+        print(report.summary())
+        print('Document created successfully: %s' % args.output)
+
+    if args.save_latency_baseline:
+        from cicd_doc import loadtest
+
+        endpoints = loadtest.collect(config.load_tests, _parse_cache(config.cache_dir))
+        loadtest.save_baseline(args.save_latency_baseline, endpoints)
+        print('Latency baseline of %d endpoints written to %s' % (len(endpoints), args.save_latency_baseline),
+              file=sys.stderr)
+
+    if tracer is not None:
+        trace.disable()
+        if args.profile:
+            tracer.write_json(args.profile)
+        if args.trace:
+            tracer.write_chrome_trace(args.trace)
+        print(tracer.report(), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())